@@ -128,6 +128,7 @@ export interface VoiceBiometrics {
   detected_anomalies?: string[];
   requires_clinical_review?: boolean;
   recording_duration_seconds?: number;
+  analysis_profile?: Record<string, unknown>;
   created_at: string;
 }
 
@@ -8,6 +8,7 @@ import bcrypt from 'bcryptjs';
 import { v4 as uuidv4 } from 'uuid';
 import { z } from 'zod';
 import CryptoJS from 'crypto-js';
+import axios from 'axios';
 import {
   getUserById,
   insertDoctorConnection,
@@ -24,6 +25,10 @@ const router = Router();
 // Environment variables
 const SESSION_CODE_EXPIRY_HOURS = parseInt(process.env.SESSION_CODE_EXPIRY_HOURS || '24');
 const ENCRYPTION_KEY = process.env.DOCTOR_BRIDGE_KEY || 'doctor-bridge-encryption-key';
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
+const POPULATION_CONTEXT_TIMEOUT_MS = 2000;
+// Recent recordings averaged into voice scores, the same window as the ml-service cohort index
+const VOICE_AVERAGE_RECORDINGS = 10;
 
 // Validation schemas
 const registerDoctorSchema = z.object({
@@ -528,6 +533,26 @@ router.get('/patients/:patientId/summary', async (req: Request, res: Response, n
       .order('created_at', { ascending: false })
       .limit(5);
 
+    // Voice-derived scores only when the patient shares voice analysis
+    let voiceAnalyses: any[] | null = null;
+    if (connection.permissions.view_voice_analysis) {
+      const { data } = await supabase
+        .from(TABLES.VOICE_BIOMETRICS)
+        .select('flat_affect_score, agitated_speech_score, overall_vocal_health_score')
+        .eq('user_id', patientId)
+        .order('created_at', { ascending: false })
+        .limit(VOICE_AVERAGE_RECORDINGS);
+      voiceAnalyses = data || [];
+    }
+
+    // Unrounded averages of the latest recordings, as aggregated by the cohort index
+    const populationContext = await getPopulationContext(patientId, {
+      burnoutRisk: recentInsights?.[0]?.burnout_risk_score ?? null,
+      mentalHealthIndex: user?.mental_health_index ?? null,
+      flatAffect: voiceAnalyses ? average(voiceAnalyses.map((v: any) => v.flat_affect_score)) : null,
+      agitation: voiceAnalyses ? average(voiceAnalyses.map((v: any) => v.agitated_speech_score)) : null,
+    });
+
     res.json({
       patient: {
         id: user?.id,
@@ -540,6 +565,7 @@ router.get('/patients/:patientId/summary', async (req: Request, res: Response, n
         moodTrends: calculateMoodTrends(moodLogs || []),
         recentInsights: recentInsights || [],
         alerts: recentInsights?.filter((i: any) => i.alert_triggered) || [],
+        populationContext,
       },
       permissions: connection.permissions,
     });
@@ -573,6 +599,30 @@ function calculateMoodTrends(logs: any[]): any {
   return { trend, averageMood: Math.round(avgMood * 10) / 10, averageAnxiety: avgAnxiety };
 }
 
+function average(values: Array<number | null>): number | null {
+  const present = values.filter((v): v is number => v !== null && v !== undefined);
+  return present.length > 0 ? present.reduce((a, b) => a + b, 0) / present.length : null;
+}
+
+// Patient percentiles within the population, from the ML service cohort index
+// (null when the ML service is slow or unavailable, so the patient view still loads)
+async function getPopulationContext(
+  patientId: string,
+  scores: Record<string, number | null>
+): Promise<Record<string, number | null> | null> {
+  try {
+    const response = await axios.post(`${ML_SERVICE_URL}/cohorts/percentiles`, {
+      patients: [{ patientId, scores }],
+    }, {
+      timeout: POPULATION_CONTEXT_TIMEOUT_MS,
+    });
+    return response.data.results[0]?.percentiles || null;
+  } catch (error) {
+    console.error('Population context unavailable:', error);
+    return null;
+  }
+}
+
 async function getLatestMHI(userId: string): Promise<number | null> {
   const user = await getUserById(userId);
   return user?.mental_health_index || null;
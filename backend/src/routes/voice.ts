@@ -66,11 +66,13 @@ router.post('/analyze', upload.single('audio'), async (req: Request, res: Respon
       contentType: req.file.mimetype,
     });
 
-    // Send to ML service for analysis
+    // Send to ML service for analysis (profile: fast | standard | clinical)
+    const profile = typeof req.body?.profile === 'string' ? req.body.profile : undefined;
     const response = await axios.post(`${ML_SERVICE_URL}/analyze/voice`, formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
+      params: { userId: decoded.userId, ...(profile ? { profile } : {}) },
       timeout: 60000, // 60 seconds timeout
     });
 
@@ -91,6 +93,7 @@ router.post('/analyze', upload.single('audio'), async (req: Request, res: Respon
       detected_anomalies: analysisResult.anomalies,
       requires_clinical_review: analysisResult.flatAffectScore > 0.7 || analysisResult.agitatedSpeechScore > 0.7,
       recording_duration_seconds: analysisResult.durationSeconds,
+      analysis_profile: analysisResult.analysisProfile,
     });
 
     if (!biometrics) {
@@ -213,6 +213,9 @@ CREATE TABLE voice_biometrics (
     -- Duration
     recording_duration_seconds INTEGER,
     
+    -- Analysis profile (version, sample rate, framing, extractors)
+    analysis_profile JSONB,
+    
     created_at TIMESTAMP DEFAULT NOW()
 );
 
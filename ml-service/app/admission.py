@@ -0,0 +1,298 @@
+"""
+Admission Control
+Per-class concurrency limits, bounded priority queues and fast rejection under overload
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Priority classes, highest first, with (concurrency, queue size, max wait seconds)
+DEFAULT_CLASS_LIMITS: Dict[str, Tuple[int, int, float]] = {
+    "realtime": (16, 64, 0.5),
+    "text": (4, 32, 5.0),
+    "voice": (2, 8, 10.0),
+    "batch": (1, 4, 10.0),
+}
+
+# Endpoint -> priority class; other routes are not admission controlled
+ROUTE_CLASSES = {
+    "/analyze/realtime": "realtime",
+    "/analyze/text": "text",
+    "/predict": "text",
+    "/predict/incremental": "text",
+    "/analyze/voice": "voice",
+    "/analyze/batch": "batch",
+    "/predict/batch": "batch",
+}
+
+# Bounds of the Retry-After estimate (seconds)
+RETRY_AFTER_RANGE = (1, 30)
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control"""
+    
+    def __init__(self, priority_class: str, reason: str, retry_after: int):
+        super().__init__(f"{priority_class} {reason}")
+        self.priority_class = priority_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PriorityClass:
+    """Limits and live counters of one priority class"""
+    
+    def __init__(self, name: str, rank: int, concurrency: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.rank = rank
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        
+        self.active = 0
+        self.waiting: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+        # Exponentially weighted service time, for Retry-After estimates
+        self.service_time = 1.0
+
+
+def default_slots(reserve: int = 1, class_count: int = len(DEFAULT_CLASS_LIMITS)) -> int:
+    """
+    Shared slots for one worker process
+    
+    The worker's share of the CPU budget (cores in this process's affinity
+    mask, capped by ML_CPUS, split across the ML_WORKERS forked by
+    app.serving), plus the headroom `reserve` slots per class reserved
+    for the classes above it.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+    budget = min(int(os.getenv("ML_CPUS") or cores), cores)
+    workers = int(os.getenv("ML_WORKERS") or 1)
+    return max(1, budget // workers) + reserve * (class_count - 1)
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Tuple[int, int, float]]:
+    """
+    Class limits from "realtime=16:64:0.5,batch=1:4:10" (concurrency:queue:max wait)
+    
+    Classes missing from the spec keep their defaults; omitted fields too.
+    """
+    limits = dict(DEFAULT_CLASS_LIMITS)
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, values = item.partition("=")
+        name = name.strip()
+        if name not in limits:
+            raise ValueError(f"Unknown priority class '{name}'. Allowed: {', '.join(limits)}")
+        fields = values.split(":")
+        concurrency, queue_size, max_wait = limits[name]
+        if len(fields) > 0 and fields[0]:
+            concurrency = int(fields[0])
+        if len(fields) > 1 and fields[1]:
+            queue_size = int(fields[1])
+        if len(fields) > 2 and fields[2]:
+            max_wait = float(fields[2])
+        limits[name] = (concurrency, queue_size, max_wait)
+    return limits
+
+
+class AdmissionController:
+    """
+    Priority scheduler in front of the analyzers
+    
+    At most `slots` requests run at once across all classes, and each class
+    is further capped at its own concurrency. The last `reserve` slots per
+    rank are held back for higher classes: the class at rank r only starts
+    while fewer than slots - reserve * r requests run, so voice and batch
+    work can never occupy the slots realtime and text calls need. When a
+    slot frees up it goes to the oldest waiter of the highest-priority
+    class under its caps, so a burst of batch or voice work queues behind
+    realtime calls instead of in front of them. A request finding its class queue full, or waiting longer
+    than the class allows, is rejected with Overloaded right away.
+    
+    All methods run on the event loop; no locking is needed.
+    """
+    
+    def __init__(
+        self,
+        slots: int,
+        limits: Optional[Dict[str, Tuple[int, int, float]]] = None,
+        reserve: int = 1
+    ):
+        self.slots = slots
+        self.reserve = reserve
+        self.active = 0
+        self.classes: Dict[str, PriorityClass] = {
+            name: PriorityClass(name, rank, *values)
+            for rank, (name, values) in enumerate((limits or DEFAULT_CLASS_LIMITS).items())
+        }
+        self._by_priority: List[PriorityClass] = sorted(self.classes.values(), key=lambda c: c.rank)
+    
+    async def acquire(self, name: str) -> None:
+        """
+        Wait for a slot in a priority class
+        
+        Raises:
+            Overloaded: The class queue is full or the wait exceeded its limit
+        """
+        priority_class = self.classes[name]
+        if self._can_start(priority_class) and not self._waiters_ahead(priority_class):
+            self._start(priority_class)
+            return
+        
+        if len(priority_class.waiting) >= priority_class.queue_size:
+            raise self._reject(priority_class, "queue_full")
+        
+        granted = asyncio.get_running_loop().create_future()
+        priority_class.waiting.append(granted)
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), priority_class.max_wait)
+        except asyncio.TimeoutError:
+            if granted.done():
+                return
+            self._abandon(priority_class, granted)
+            raise self._reject(priority_class, "timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued (or just after being granted)
+            if granted.done():
+                self.release(name)
+            else:
+                self._abandon(priority_class, granted)
+            raise
+    
+    def release(self, name: str, seconds: Optional[float] = None) -> None:
+        """Free a slot, recording how long the request held it"""
+        priority_class = self.classes[name]
+        priority_class.active -= 1
+        self.active -= 1
+        if seconds is not None:
+            priority_class.service_time += 0.2 * (seconds - priority_class.service_time)
+        self._dispatch()
+    
+    def retry_after(self, priority_class: PriorityClass) -> int:
+        """Seconds until the class queue has likely drained"""
+        backlog = len(priority_class.waiting) + priority_class.active
+        seconds = backlog * priority_class.service_time / max(1, priority_class.concurrency)
+        low, high = RETRY_AFTER_RANGE
+        return int(min(high, max(low, math.ceil(seconds))))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "reserve": self.reserve,
+            "active": self.active,
+            "classes": {
+                c.name: {
+                    "priority": c.rank,
+                    "concurrency": c.concurrency,
+                    "sharedLimit": self.shared_limit(c),
+                    "queueSize": c.queue_size,
+                    "maxWaitSeconds": c.max_wait,
+                    "active": c.active,
+                    "queued": len(c.waiting),
+                    "admitted": c.admitted,
+                    "rejected": dict(c.rejected),
+                    "serviceSeconds": round(c.service_time, 4),
+                }
+                for c in self._by_priority
+            },
+        }
+    
+    def _can_start(self, priority_class: PriorityClass) -> bool:
+        return (
+            self.active < self.shared_limit(priority_class)
+            and priority_class.active < priority_class.concurrency
+        )
+    
+    def shared_limit(self, priority_class: PriorityClass) -> int:
+        """Running requests below which this class may start (headroom kept for higher classes)"""
+        return max(1, self.slots - self.reserve * priority_class.rank)
+    
+    def _waiters_ahead(self, priority_class: PriorityClass) -> bool:
+        """Queued requests of this or a higher class that may run first"""
+        return any(
+            c.waiting and c.active < c.concurrency
+            for c in self._by_priority[:priority_class.rank + 1]
+        )
+    
+    def _start(self, priority_class: PriorityClass) -> None:
+        priority_class.active += 1
+        priority_class.admitted += 1
+        self.active += 1
+    
+    def _dispatch(self) -> None:
+        """Hand free slots to the highest-priority waiters"""
+        for priority_class in self._by_priority:
+            while priority_class.waiting and self._can_start(priority_class):
+                granted = priority_class.waiting.popleft()
+                if granted.done():
+                    continue
+                self._start(priority_class)
+                granted.set_result(None)
+            if self.active >= self.slots:
+                return
+    
+    def _abandon(self, priority_class: PriorityClass, granted: asyncio.Future) -> None:
+        granted.cancel()
+        try:
+            priority_class.waiting.remove(granted)
+        except ValueError:
+            pass
+    
+    def _reject(self, priority_class: PriorityClass, reason: str) -> Overloaded:
+        priority_class.rejected[reason] += 1
+        return Overloaded(priority_class.name, reason, self.retry_after(priority_class))
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests to controlled routes, 503 + Retry-After when overloaded"""
+    
+    def __init__(self, app: Any, controller: AdmissionController, routes: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.controller = controller
+        self.routes = routes or ROUTE_CLASSES
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        name = self.routes.get(scope.get("path")) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        
+        try:
+            await self.controller.acquire(name)
+        except Overloaded as e:
+            await _send_overloaded(send, e)
+            return
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.perf_counter() - start)
+
+
+async def _send_overloaded(send: Callable, error: Overloaded) -> None:
+    body = (
+        f'{{"detail":"Service overloaded, retry later","class":"{error.priority_class}",'
+        f'"reason":"{error.reason}"}}'
+    ).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(error.retry_after).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
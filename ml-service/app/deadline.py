@@ -0,0 +1,81 @@
+"""
+Request Deadlines
+Latency budgets from clients and service-time estimates used to meet them
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException, Request
+
+
+# Latency budget in milliseconds, counted from when the request was received
+DEADLINE_HEADER = "x-deadline-ms"
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """
+    Absolute deadline (time.perf_counter() value) of a request, None without a budget
+    
+    The budget starts when MetricsMiddleware received the request, so time
+    spent queued for admission counts against it.
+    """
+    value = request.headers.get(DEADLINE_HEADER)
+    if not value:
+        return None
+    try:
+        budget = float(value) / 1000
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER} header: {value}")
+    received_at = request.scope.get("state", {}).get("received_at")
+    return (received_at or time.perf_counter()) + budget
+
+
+def fits(deadline: Optional[float], expected_seconds: float) -> bool:
+    """Whether work expected to take this long finishes before the deadline"""
+    return deadline is None or time.perf_counter() + expected_seconds <= deadline
+
+
+class ServiceTimeEstimate:
+    """
+    Exponentially weighted service time of one stage and the calls running it
+    
+    Concurrent calls share the CPU (and the model), so a new call is expected
+    to take the mean time multiplied by the number of calls running with it.
+    """
+    
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.mean: Optional[float] = None
+        self.in_flight = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        with self._lock:
+            if self.mean is None:
+                self.mean = value
+            else:
+                self.mean += self.alpha * (value - self.mean)
+    
+    def expected(self, units: float = 1.0) -> float:
+        """Expected seconds for a call of `units` (0 until a first observation)"""
+        if self.mean is None:
+            return 0.0
+        return self.mean * units * (self.in_flight + 1)
+    
+    @contextmanager
+    def running(self, units: float = 1.0) -> Iterator[None]:
+        """Count a call as in flight and observe its time per unit"""
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+            if units > 0:
+                self.observe(elapsed / units)
@@ -0,0 +1,58 @@
+"""
+Prepare Models Job
+Pinned offline snapshots of the transformer models for MODEL_SNAPSHOT_DIR
+
+Downloads each model once, at a branch, tag or commit, and stores it with
+safetensors weights so the service loads it offline and memory-mapped.
+Run it at image build time or on the host before starting the service.
+
+Usage:
+    python -m app.jobs.prepare_models --output models/snapshots
+    python -m app.jobs.prepare_models --output models/snapshots \\
+        --model cardiffnlp/twitter-roberta-base-sentiment-latest@<commit>
+    python -m app.jobs.prepare_models --output models/snapshots --verify
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional, Tuple
+
+from app.services.model_snapshots import ModelSnapshotStore
+from app.services.sentiment_analysis import SentimentAnalyzer
+
+
+# Models the service loads
+DEFAULT_MODELS = [SentimentAnalyzer.SENTIMENT_MODEL, SentimentAnalyzer.EMOTION_MODEL]
+
+
+def parse_model(spec: str) -> Tuple[str, Optional[str]]:
+    """Model id and revision from <id> or <id>@<revision>"""
+    model_id, _, revision = spec.partition("@")
+    return model_id, revision or None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prepare offline model snapshots")
+    parser.add_argument("--output", default=os.getenv("MODEL_SNAPSHOT_DIR") or "models/snapshots", help="Snapshot directory (MODEL_SNAPSHOT_DIR)")
+    parser.add_argument("--model", action="append", help="Model id, optionally @revision (repeatable; default: the service's models)")
+    parser.add_argument("--verify", action="store_true", help="Check existing snapshots against their checksums instead of preparing")
+    args = parser.parse_args(argv)
+    
+    store = ModelSnapshotStore(args.output)
+    models = [parse_model(spec) for spec in (args.model or DEFAULT_MODELS)]
+    
+    if args.verify:
+        problems = {model_id: store.verify(model_id) for model_id, _ in models}
+        print(json.dumps(problems))
+        return 1 if any(problems.values()) else 0
+    
+    for model_id, revision in models:
+        entry = store.prepare(model_id, revision)
+        print(json.dumps({"model": model_id, "revision": entry["revision"], "path": entry["path"]}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""
+Risk Scan Job
+Population-wide burnout risk and proactive insights from exported data
+
+Reads mood_logs (and optionally voice_biometrics) sorted by user, runs
+PredictiveAnalyzer.predict_batch per chunk of users and bulk-writes
+predictive_insights rows. Progress is checkpointed after every chunk, so
+an interrupted scan resumes after the last completed user.
+
+Usage:
+    python -m app.jobs.risk_scan --mood-logs mood_logs.csv \\
+        --voice-biometrics voice_biometrics.csv --output insights.csv
+    python -m app.jobs.risk_scan --mood-logs mindfulme.db --output mindfulme.db
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+from datetime import date, datetime
+from itertools import groupby
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Tuple
+
+from app.services.predictive_analysis import PredictiveAnalyzer
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+
+# Columns read from the exports (names as in database/schema.sql)
+MOOD_LOG_COLUMNS = ["user_id", "mood_score", "mental_health_index", "anxiety_level", "sleep_quality", "created_at"]
+VOICE_COLUMNS = ["user_id", "flat_affect_score", "created_at"]
+
+INSIGHT_COLUMNS = [
+    "id", "user_id", "burnout_risk_score", "anxiety_trend_prediction", "mood_trend_prediction",
+    "proactive_wellness_insight", "alert_triggered", "alert_trigger_reason", "model_version",
+    "prediction_confidence", "analysis_date", "created_at",
+]
+
+# SQLite stand-ins for the Postgres tables the job writes
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictive_insights (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    burnout_risk_score REAL,
+    anxiety_trend_prediction TEXT,
+    mood_trend_prediction TEXT,
+    proactive_wellness_insight TEXT,
+    alert_triggered INTEGER DEFAULT 0,
+    alert_trigger_reason TEXT,
+    model_version TEXT,
+    prediction_confidence REAL,
+    analysis_date TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictive_insights_user ON predictive_insights(user_id);
+CREATE TABLE IF NOT EXISTS risk_scan_runs (
+    run_id TEXT PRIMARY KEY,
+    last_user_id TEXT,
+    users_scanned INTEGER,
+    updated_at TEXT
+);
+"""
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+# ============================================
+# Readers
+# ============================================
+
+def read_rows(
+    path: str,
+    table: str,
+    columns: List[str],
+    after_user: Optional[str] = None,
+    chunk_rows: int = 10000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows of an export sorted by user_id, created_at
+    
+    Args:
+        path: CSV, Parquet or SQLite file
+        table: Table name (SQLite only)
+        columns: Columns to read
+        after_user: Skip users up to and including this id (resume)
+        chunk_rows: Rows read per I/O call
+    
+    Yields:
+        Row dictionaries with empty values as None
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        rows = _read_sqlite(path, table, columns, after_user, chunk_rows)
+    elif extension == ".parquet":
+        rows = _read_parquet(path, columns, chunk_rows)
+    elif extension == ".csv":
+        rows = _read_csv(path, columns)
+    else:
+        raise ValueError(f"Unsupported export format '{extension}'. Use CSV, Parquet or SQLite")
+    
+    for row in rows:
+        if after_user is not None and str(row["user_id"]) <= after_user:
+            continue
+        yield row
+
+
+def _read_csv(path: str, columns: List[str]) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            values = {column: row.get(column) or None for column in columns}
+            # CSV has no types: everything except ids and timestamps is numeric
+            for column in columns:
+                if values[column] is not None and column not in ("user_id", "created_at"):
+                    values[column] = float(values[column])
+            yield values
+
+
+def _read_parquet(path: str, columns: List[str], chunk_rows: int) -> Iterator[Dict[str, Any]]:
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Reading Parquet exports requires pyarrow")
+    parquet = pq.ParquetFile(path)
+    present = [c for c in columns if c in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=present):
+        for row in batch.to_pylist():
+            yield {column: row.get(column) for column in columns}
+
+
+def _read_sqlite(
+    path: str,
+    table: str,
+    columns: List[str],
+    after_user: Optional[str],
+    chunk_rows: int
+) -> Iterator[Dict[str, Any]]:
+    """
+    Page through a table by user id
+    
+    Each page is fetched completely before rows are yielded, so no read
+    lock is held while results are written to the same database.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        last_user = after_user or ""
+        while True:
+            bounds = connection.execute(
+                f"SELECT MAX(user_id) FROM (SELECT DISTINCT user_id FROM {table} "
+                f"WHERE user_id > ? ORDER BY user_id LIMIT ?)",
+                (last_user, max(1, chunk_rows // 100)),
+            ).fetchone()
+            if bounds is None or bounds[0] is None:
+                return
+            page = connection.execute(
+                f"SELECT {', '.join(columns)} FROM {table} "
+                f"WHERE user_id > ? AND user_id <= ? ORDER BY user_id, created_at",
+                (last_user, bounds[0]),
+            ).fetchall()
+            for values in page:
+                yield dict(zip(columns, values))
+            last_user = bounds[0]
+    finally:
+        connection.close()
+
+
+def count_users(path: str, table: str, after_user: Optional[str] = None) -> Optional[int]:
+    """Number of users left to scan, when the source can tell cheaply"""
+    if os.path.splitext(path)[1].lower() not in SQLITE_EXTENSIONS:
+        return None
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(
+            f"SELECT COUNT(DISTINCT user_id) FROM {table} WHERE user_id > ?", (after_user or "",)
+        ).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def group_by_user(rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Group consecutive rows per user, checking the export is user-sorted"""
+    previous = None
+    for user_id, user_rows in groupby(rows, key=lambda row: str(row["user_id"])):
+        if previous is not None and user_id <= previous:
+            raise ValueError(
+                f"Export is not sorted by user_id ('{user_id}' after '{previous}')"
+            )
+        previous = user_id
+        yield user_id, list(user_rows)
+
+
+def user_chunks(
+    mood_groups: Iterator[Tuple[str, List[Dict[str, Any]]]],
+    voice_groups: Optional[Iterator[Tuple[str, List[Dict[str, Any]]]]],
+    chunk_users: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Merge-join mood logs and voice biometrics per user into chunks
+    
+    Both inputs are sorted by user, so one forward pass pairs them up.
+    Users with voice biometrics but no mood logs are skipped.
+    """
+    voice_user, voice_rows = next(voice_groups, (None, None)) if voice_groups else (None, None)
+    chunk = []
+    
+    for user_id, mood_rows in mood_groups:
+        while voice_user is not None and voice_user < user_id:
+            voice_user, voice_rows = next(voice_groups, (None, None))
+        
+        chunk.append({
+            "user_id": user_id,
+            "mood_logs": mood_rows,
+            "voice_biometrics": voice_rows if voice_user == user_id else None,
+        })
+        if len(chunk) >= chunk_users:
+            yield chunk
+            chunk = []
+    
+    if chunk:
+        yield chunk
+
+
+# ============================================
+# Writers
+# ============================================
+
+def insight_row(
+    user_id: str,
+    prediction: Dict[str, Any],
+    analysis_date: str,
+    model_version: str
+) -> Dict[str, Any]:
+    """Map a prediction onto a predictive_insights row"""
+    alerts = [i for i in prediction["proactiveInsights"] if i.get("severity") == "high"]
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "burnout_risk_score": prediction["burnoutRiskScore"],
+        "anxiety_trend_prediction": json.dumps(prediction["anxietyTrendPrediction"]),
+        "mood_trend_prediction": json.dumps(prediction["moodTrendPrediction"]),
+        "proactive_wellness_insight": json.dumps(prediction["proactiveInsights"]),
+        "alert_triggered": bool(alerts),
+        "alert_trigger_reason": alerts[0]["message"] if alerts else None,
+        "model_version": model_version,
+        "prediction_confidence": prediction["confidence"],
+        "analysis_date": analysis_date,
+        "created_at": datetime.now().isoformat(),
+    }
+
+
+class CsvInsightWriter:
+    """
+    predictive_insights rows appended to a CSV file
+    
+    A sidecar checkpoint records the last user and the file size after
+    each chunk. Resuming truncates the file to that size, so rows of a
+    chunk that was interrupted mid-write are never duplicated.
+    """
+    
+    def __init__(self, path: str, run_id: str, restart: bool = False):
+        self.path = path
+        self.run_id = run_id
+        self.checkpoint_path = f"{path}.checkpoint.json"
+        
+        checkpoint = None if restart else self._read_checkpoint()
+        if checkpoint and checkpoint.get("runId") == run_id and os.path.exists(path):
+            self.last_user_id = checkpoint["lastUserId"]
+            self.users_scanned = checkpoint["usersScanned"]
+            self._file = open(path, "r+", newline="", encoding="utf-8")
+            self._file.truncate(checkpoint["outputBytes"])
+            self._file.seek(checkpoint["outputBytes"])
+        else:
+            self.last_user_id = None
+            self.users_scanned = 0
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            csv.writer(self._file).writerow(INSIGHT_COLUMNS)
+        self._writer = csv.DictWriter(self._file, fieldnames=INSIGHT_COLUMNS)
+    
+    def write(self, rows: List[Dict[str, Any]], last_user_id: str, users: int) -> None:
+        """Append a chunk of rows, then checkpoint"""
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        
+        self.last_user_id = last_user_id
+        self.users_scanned += users
+        self._write_checkpoint({
+            "runId": self.run_id,
+            "lastUserId": last_user_id,
+            "usersScanned": self.users_scanned,
+            "outputBytes": self._file.tell(),
+        })
+    
+    def close(self) -> None:
+        self._file.close()
+    
+    def _read_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+
+class SqliteInsightWriter:
+    """
+    predictive_insights rows inserted into a SQLite database
+    
+    Rows and the run checkpoint are committed in one transaction per chunk.
+    """
+    
+    def __init__(self, path: str, run_id: str, restart: bool = False):
+        self.run_id = run_id
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.executescript(SQLITE_SCHEMA)
+        
+        if restart:
+            with self._connection:
+                self._connection.execute("DELETE FROM risk_scan_runs WHERE run_id = ?", (run_id,))
+        
+        checkpoint = self._connection.execute(
+            "SELECT last_user_id, users_scanned FROM risk_scan_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        self.last_user_id, self.users_scanned = checkpoint if checkpoint else (None, 0)
+    
+    def write(self, rows: List[Dict[str, Any]], last_user_id: str, users: int) -> None:
+        """Insert a chunk of rows and checkpoint atomically"""
+        self.last_user_id = last_user_id
+        self.users_scanned += users
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO predictive_insights ({', '.join(INSIGHT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in INSIGHT_COLUMNS)})",
+                [tuple(row[column] for column in INSIGHT_COLUMNS) for row in rows],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO risk_scan_runs (run_id, last_user_id, users_scanned, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.run_id, last_user_id, self.users_scanned, datetime.now().isoformat()),
+            )
+    
+    def close(self) -> None:
+        self._connection.close()
+
+
+def open_writer(path: str, run_id: str, restart: bool = False):
+    """Pick the insight writer for an output path"""
+    if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+        return SqliteInsightWriter(path, run_id, restart)
+    return CsvInsightWriter(path, run_id, restart)
+
+
+# ============================================
+# Job
+# ============================================
+
+def run_scan(
+    mood_logs_path: str,
+    output_path: str,
+    voice_biometrics_path: Optional[str] = None,
+    chunk_users: int = 1000,
+    run_id: Optional[str] = None,
+    restart: bool = False,
+    analyzer: Optional[PredictiveAnalyzer] = None,
+    progress: bool = True
+) -> Dict[str, Any]:
+    """
+    Scan every user in an export and write their predictive insights
+    
+    Args:
+        mood_logs_path: mood_logs export (CSV, Parquet or SQLite)
+        output_path: CSV file or SQLite database for predictive_insights
+        voice_biometrics_path: Optional voice_biometrics export; defaults to
+            the mood logs database when that is SQLite
+        chunk_users: Users predicted per vectorized batch
+        run_id: Checkpoint name; rerunning with the same id resumes
+        restart: Ignore any existing checkpoint for this run
+        analyzer: PredictiveAnalyzer to use
+        progress: Show a progress bar
+    
+    Returns:
+        Summary with run id, users scanned and alerts raised
+    """
+    analysis_date = date.today().isoformat()
+    run_id = run_id or f"risk-scan-{analysis_date}"
+    analyzer = analyzer or PredictiveAnalyzer()
+    model_version = f"predictive-{analyzer.model_version()}"
+    
+    if voice_biometrics_path is None and os.path.splitext(mood_logs_path)[1].lower() in SQLITE_EXTENSIONS:
+        voice_biometrics_path = mood_logs_path
+    
+    writer = open_writer(output_path, run_id, restart)
+    resumed_from = writer.last_user_id
+    alerts = 0
+    
+    mood_groups = group_by_user(read_rows(mood_logs_path, "mood_logs", MOOD_LOG_COLUMNS, resumed_from))
+    voice_groups = None
+    if voice_biometrics_path:
+        voice_groups = group_by_user(read_rows(voice_biometrics_path, "voice_biometrics", VOICE_COLUMNS, resumed_from))
+    
+    bar = None
+    if progress and TQDM_AVAILABLE:
+        bar = tqdm(total=count_users(mood_logs_path, "mood_logs", resumed_from), unit="user", desc=run_id)
+    
+    try:
+        for chunk in user_chunks(mood_groups, voice_groups, chunk_users):
+            predictions = analyzer.predict_batch(chunk)
+            rows = [
+                insight_row(user["user_id"], prediction, analysis_date, model_version)
+                for user, prediction in zip(chunk, predictions)
+            ]
+            writer.write(rows, chunk[-1]["user_id"], len(chunk))
+            alerts += sum(1 for row in rows if row["alert_triggered"])
+            
+            if bar is not None:
+                bar.update(len(chunk))
+            elif progress:
+                print(f"{run_id}: {writer.users_scanned} users scanned (last: {writer.last_user_id})")
+    finally:
+        if bar is not None:
+            bar.close()
+        writer.close()
+    
+    return {
+        "runId": run_id,
+        "resumedFrom": resumed_from,
+        "usersScanned": writer.users_scanned,
+        "alertsTriggered": alerts,
+        "output": output_path,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Population-wide burnout risk scan")
+    parser.add_argument("--mood-logs", required=True, help="mood_logs export (CSV, Parquet or SQLite)")
+    parser.add_argument("--voice-biometrics", help="voice_biometrics export (CSV, Parquet or SQLite)")
+    parser.add_argument("--output", required=True, help="CSV file or SQLite database for predictive_insights")
+    parser.add_argument("--chunk-users", type=int, default=1000, help="Users per vectorized batch")
+    parser.add_argument("--run-id", help="Checkpoint name (default: risk-scan-<date>)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    args = parser.parse_args(argv)
+    
+    summary = run_scan(
+        mood_logs_path=args.mood_logs,
+        output_path=args.output,
+        voice_biometrics_path=args.voice_biometrics,
+        chunk_users=args.chunk_users,
+        run_id=args.run_id,
+        restart=args.restart,
+        progress=not args.quiet,
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
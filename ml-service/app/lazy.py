@@ -0,0 +1,61 @@
+"""
+Lazy Imports
+Heavy optional dependencies (torch, transformers, librosa) imported on first use
+"""
+
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Any, Iterable, Optional
+
+
+def module_available(name: str) -> bool:
+    """Whether a module is installed, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported when an attribute is first used
+    
+    `librosa = LazyModule("librosa")` at module level costs nothing until
+    code calls e.g. `librosa.load(...)`, so services that never touch audio
+    start without importing it.
+    """
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+    
+    def _load(self) -> ModuleType:
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attribute: str) -> Any:
+        module = self._module or self._load()
+        return getattr(module, attribute)
+    
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def preload(module: LazyModule, submodules: Iterable[str] = ()) -> ModuleType:
+    """
+    Import a lazy module now, e.g. in the background before the first request needs it
+    
+    Args:
+        module: Lazy module to import
+        submodules: Submodules to import as well (for packages that load them lazily)
+    """
+    loaded = module._load()
+    for submodule in submodules:
+        importlib.import_module(f"{loaded.__name__}.{submodule}")
+    return loaded
@@ -0,0 +1,315 @@
+"""
+Service Metrics
+Request counters, latency histograms and analyzer stage timings in Prometheus text format
+"""
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+
+# Upper bounds (seconds) shared by request and stage histograms
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Per-request receiver of stage durations, set while a profiled request runs
+stage_collector: contextvars.ContextVar[Optional[Callable[[Tuple[str, str], float], None]]] = (
+    contextvars.ContextVar("stage_collector", default=None)
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (counts per bucket, cumulated on render)"""
+    
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _StageTimer:
+    """Times one analyzer stage into its histogram"""
+    
+    __slots__ = ("registry", "key", "start")
+    
+    def __init__(self, registry: "MetricsRegistry", key: Tuple[str, str]):
+        self.registry = registry
+        self.key = key
+    
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        seconds = time.perf_counter() - self.start
+        if self.registry.stage_timing:
+            self.registry.observe_stage(self.key, seconds)
+        if self.registry.profiling:
+            collector = stage_collector.get()
+            if collector is not None:
+                collector(self.key, seconds)
+
+
+class _NoStage:
+    """Shared do-nothing timer returned while stage timing is disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "_NoStage":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NO_STAGE = _NoStage()
+
+
+class MetricsRegistry:
+    """
+    In-process metrics for the ML service
+    
+    Request metrics are recorded by MetricsMiddleware. Analyzers wrap their
+    stages in `with metrics.stage("voice", "pitch"):`; with stage timing
+    disabled (and no profiled request running) that is a shared no-op
+    context manager, so instrumented code pays two attribute checks and an
+    empty with-block per stage.
+    Gauges such as queue depths are read from callbacks at render time.
+    """
+    
+    def __init__(self, stage_timing: bool = True):
+        self.stage_timing = stage_timing
+        # Set by app.profiling.configure when per-request profiling is enabled
+        self.profiling = False
+        
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._errors: Dict[str, int] = {}
+        self._latency: Dict[str, Histogram] = {}
+        self._stages: Dict[Tuple[str, str], Histogram] = {}
+        self._model_loads: Dict[Tuple[str, str], float] = {}
+        self._gauges: Dict[str, Tuple[str, str, Tuple[str, ...], Callable[[], Any]]] = {}
+        self.in_flight = 0
+        self.started_at = time.time()
+    
+    def stage(self, component: str, name: str):
+        """Context manager timing one stage of an analyzer"""
+        if self.stage_timing or (self.profiling and stage_collector.get() is not None):
+            return _StageTimer(self, (component, name))
+        return _NO_STAGE
+    
+    def observe_stage(self, key: Tuple[str, str], seconds: float) -> None:
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram()
+            histogram.observe(seconds)
+    
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+    
+    def request_finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._errors[route] = self._errors.get(route, 0) + 1
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = Histogram()
+            histogram.observe(seconds)
+    
+    def record_model_load(self, model: str, version: str, seconds: float) -> None:
+        """Remember how long a model took to load"""
+        with self._lock:
+            self._model_loads[(model, version)] = seconds
+    
+    def add_gauge(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], Any],
+        labels: Tuple[str, ...] = (),
+        kind: str = "gauge"
+    ) -> None:
+        """
+        Register a metric whose value is read when metrics are rendered
+        
+        Args:
+            name: Metric name
+            help_text: HELP line
+            read: Returns the value, or with labels a {label values tuple: value} dict
+            labels: Label names
+            kind: Prometheus type ("gauge", or "counter" for totals kept elsewhere)
+        """
+        self._gauges[name] = (help_text, kind, labels, read)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = dict(self._requests)
+            errors = dict(self._errors)
+            latency = {k: _copy(h) for k, h in self._latency.items()}
+            stages = {k: _copy(h) for k, h in self._stages.items()}
+            model_loads = dict(self._model_loads)
+            in_flight = self.in_flight
+        
+        lines: List[str] = []
+        
+        lines += _header("ml_http_requests_total", "counter", "HTTP requests by route and status")
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f"ml_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+        
+        lines += _header("ml_http_request_errors_total", "counter", "HTTP requests answered with a 5xx status")
+        for route, count in sorted(errors.items()):
+            lines.append(f"ml_http_request_errors_total{_labels(route=route)} {count}")
+        
+        lines += _header("ml_http_request_duration_seconds", "histogram", "HTTP request latency")
+        for route, histogram in sorted(latency.items()):
+            lines += _histogram_lines("ml_http_request_duration_seconds", histogram, route=route)
+        
+        lines += _header("ml_stage_duration_seconds", "histogram", "Analyzer stage latency")
+        for (component, stage), histogram in sorted(stages.items()):
+            lines += _histogram_lines("ml_stage_duration_seconds", histogram, component=component, stage=stage)
+        
+        lines += _header("ml_http_requests_in_flight", "gauge", "HTTP requests being processed")
+        lines.append(f"ml_http_requests_in_flight {in_flight}")
+        
+        lines += _header("ml_model_load_seconds", "gauge", "Time taken to load each model")
+        for (model, version), seconds in sorted(model_loads.items()):
+            lines.append(f"ml_model_load_seconds{_labels(model=model, version=version)} {seconds:.6f}")
+        
+        for name, (help_text, kind, labels, read) in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                value = None
+            if value is None:
+                continue
+            lines += _header(name, kind, help_text)
+            if labels:
+                for label_values, sample in sorted(value.items()):
+                    lines.append(f"{name}{_labels(**dict(zip(labels, label_values)))} {sample}")
+            else:
+                lines.append(f"{name} {value}")
+        
+        rss = process_rss_bytes()
+        if rss is not None:
+            lines += _header("process_resident_memory_bytes", "gauge", "Resident memory size in bytes")
+            lines.append(f"process_resident_memory_bytes {rss}")
+        lines += _header("process_cpu_seconds_total", "counter", "User and system CPU time")
+        lines.append(f"process_cpu_seconds_total {time.process_time():.3f}")
+        lines += _header("process_start_time_seconds", "gauge", "Start time of the process")
+        lines.append(f"process_start_time_seconds {self.started_at:.3f}")
+        
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests, errors, latency and in-flight requests"""
+    
+    def __init__(self, app: Any, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        self.registry.request_started()
+        start = time.perf_counter()
+        # Request deadlines (app.deadline) are counted from here
+        scope.setdefault("state", {})["received_at"] = start
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route templates keep the label set bounded (no raw paths)
+            route = scope.get("route")
+            self.registry.request_finished(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+                time.perf_counter() - start,
+            )
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size, or the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if RESOURCE_AVAILABLE:
+        # ru_maxrss is KiB on Linux but bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return None
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    copy.count = histogram.count
+    return copy
+
+
+def _header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _labels(**labels: Any) -> str:
+    pairs = (
+        f'{key}="{_escape(str(value))}"' for key, value in labels.items()
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels: Any) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+# Process-wide registry; analyzers import it to time their stages
+metrics = MetricsRegistry()
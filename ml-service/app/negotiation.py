@@ -0,0 +1,221 @@
+"""
+Content Negotiation
+Binary request and response encodings (msgpack, npz) next to JSON, and the
+fast response path that encodes analyzer results without re-validating them
+"""
+
+import io
+import json
+import contextvars
+import numpy as np
+from typing import Any, Callable, Dict, Optional, Type
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    print("Warning: msgpack not available, binary payloads limited to npz")
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Warning: orjson not available, using the standard JSON encoder")
+
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+NPZ_TYPE = "application/x-npz"
+
+# Set per request from the Accept header, read when the response is rendered
+_response_media_type: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "response_media_type", default="application/json"
+)
+
+
+def decode_msgpack(body: bytes) -> Any:
+    """Decode a msgpack request body"""
+    if not MSGPACK_AVAILABLE:
+        raise HTTPException(status_code=415, detail="msgpack payloads are not supported by this server")
+    return msgpack.unpackb(body, raw=False)
+
+
+def decode_npz(body: bytes) -> Any:
+    """
+    Decode an npz request body into a JSON-like document
+    
+    Array names are paths into the document, separated by "/": an array
+    "moodLogs/moodScore" becomes {"moodLogs": {"moodScore": [...]}}, and
+    levels whose keys are 0..n-1 become lists ("requests/0/userId").
+    Zero-dimensional arrays become scalars.
+    """
+    document: Dict[str, Any] = {}
+    with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+        for name in archive.files:
+            node = document
+            *parents, leaf = name.split("/")
+            for part in parents:
+                node = node.setdefault(part, {})
+            node[leaf] = archive[name].tolist()
+    return _lists_from_indices(document)
+
+
+def _lists_from_indices(node: Any) -> Any:
+    """Turn dictionaries keyed "0".."n-1" into lists, recursively"""
+    if not isinstance(node, dict):
+        return node
+    node = {key: _lists_from_indices(value) for key, value in node.items()}
+    if node and set(node) == {str(i) for i in range(len(node))}:
+        return [node[str(i)] for i in range(len(node))]
+    return node
+
+
+DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    **{media_type: decode_msgpack for media_type in MSGPACK_TYPES},
+    NPZ_TYPE: decode_npz,
+}
+
+
+def preferred_media_type(accept: str) -> str:
+    """
+    Response media type for an Accept header
+    
+    msgpack is used only when it is listed before JSON; everything else,
+    including a missing header, gets JSON.
+    """
+    if not MSGPACK_AVAILABLE:
+        return "application/json"
+    for item in accept.split(","):
+        media_type = item.split(";")[0].strip().lower()
+        if media_type in MSGPACK_TYPES:
+            return MSGPACK_TYPES[0]
+        if media_type in ("application/json", "*/*", "application/*"):
+            return "application/json"
+    return "application/json"
+
+
+def _encode_default(value: Any) -> Any:
+    """Native form of values the encoders do not handle themselves"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    Encode a response document as JSON
+    
+    NumPy scalars and arrays are written directly (orjson serializes them
+    natively), so analyzers need no float() conversions for the response.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_encode_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content,
+        default=_encode_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON response that renders as msgpack when the client asked for it"""
+    
+    def render(self, content: Any) -> bytes:
+        media_type = _response_media_type.get()
+        if media_type in MSGPACK_TYPES:
+            self.media_type = media_type
+            return msgpack.packb(content, use_bin_type=True, default=_encode_default)
+        return encode_json(content)
+
+
+class ResponseShape:
+    """
+    Fast response path for a Pydantic response model
+    
+    Analyzer results are trusted: instead of building the model and letting
+    FastAPI validate and serialize it again, the result is reduced to the
+    model's fields (missing optional fields get their defaults, extra keys
+    are dropped, like response_model filtering) and encoded directly.
+    Float fields are coerced so integers render as the model would.
+    Set ResponseShape.validate to check every result against the model
+    once, e.g. in development and tests.
+    """
+    
+    validate = False
+    
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.defaults = {
+            name: None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+        }
+        self.floats = {name for name, field in model.model_fields.items() if field.annotation is float}
+    
+    def shape(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """Response document of a trusted result"""
+        if ResponseShape.validate:
+            self.model.model_validate(content)
+        document = {name: content.get(name, default) for name, default in self.defaults.items()}
+        for name in self.floats:
+            value = document[name]
+            if value is not None and not isinstance(value, float):
+                document[name] = float(value)
+        return document
+    
+    def response(self, content: Dict[str, Any], status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Rendered response for a trusted result (skips response_model validation)"""
+        return NegotiatedResponse(self.shape(content), status_code=status_code, headers=headers)
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route that accepts msgpack and npz bodies besides JSON
+    
+    Binary bodies are decoded up front and handed to FastAPI as an already
+    parsed JSON body, so endpoint signatures and Pydantic models are the
+    same for every encoding.
+    """
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        
+        async def negotiated_handler(request: Request) -> Response:
+            _response_media_type.set(preferred_media_type(request.headers.get("accept", "")))
+            
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            decoder = DECODERS.get(content_type)
+            if decoder is None:
+                return await handler(request)
+            
+            body = await request.body()
+            try:
+                document = decoder(body) if body else None
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {content_type} body: {str(e) or type(e).__name__}")
+            
+            scope = dict(request.scope)
+            scope["headers"] = [
+                (name, b"application/json" if name == b"content-type" else value)
+                for name, value in request.scope["headers"]
+            ]
+            decoded = Request(scope, request.receive)
+            decoded._body = body
+            if document is not None:
+                decoded._json = document
+            return await handler(decoded)
+        
+        return negotiated_handler
@@ -0,0 +1,295 @@
+"""
+Request Profiling
+Opt-in cProfile / tracemalloc breakdown of a single request's analyzer calls
+"""
+
+import cProfile
+import contextvars
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from .metrics import metrics, stage_collector
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+PROFILE_HEADER = "x-profile"
+
+# Profile of the request being handled, None for ordinary requests
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+# Only one cProfile profiler can be active per process
+_cpu_profiler_lock = threading.Lock()
+
+# tracemalloc is process-wide: started by the first profiled call, stopped by the last
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+# Bookkeeping allocations of the profiler itself are left out of reports
+_OWN_ALLOCATIONS = [
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+
+class ProfilingSettings:
+    """Process-wide profiling configuration (set before routes are declared)"""
+    
+    def __init__(self):
+        self.token: Optional[str] = None
+        self.dump_dir: Optional[str] = None
+        self.top: int = 15
+
+
+settings = ProfilingSettings()
+
+
+def configure(token: Optional[str], dump_dir: Optional[str] = None, top: int = 15) -> None:
+    """
+    Enable per-request profiling
+    
+    Args:
+        token: Value clients must send in the X-Profile header; None disables
+            profiling entirely (routes are then built without the wrapper)
+        dump_dir: Directory for .prof files (snakeviz, flameprof, ...)
+        top: Number of functions and allocation sites in the report
+    """
+    settings.token = token
+    settings.dump_dir = dump_dir
+    settings.top = top
+    metrics.profiling = token is not None
+    if dump_dir:
+        os.makedirs(dump_dir, exist_ok=True)
+
+
+class RequestProfile:
+    """CPU profile, allocations and stage timings collected for one request"""
+    
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.calls: List[Dict[str, Any]] = []
+        self.stages: Dict[tuple, List[float]] = {}
+        self.stats: Optional[pstats.Stats] = None
+        self.allocations: List[Dict[str, Any]] = []
+        self.dumps: List[str] = []
+        self.notes: List[str] = []
+    
+    def record_stage(self, key: tuple, seconds: float) -> None:
+        self.stages.setdefault(key, []).append(seconds)
+    
+    def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Call an analyzer under cProfile and tracemalloc"""
+        label = getattr(fn, "__qualname__", repr(fn))
+        
+        profiler = None
+        if _cpu_profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        else:
+            self.notes.append(f"{label}: CPU profiler busy with another request, timings only")
+        
+        _start_tracing()
+        before = tracemalloc.take_snapshot()
+        
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            _stop_tracing()
+            if profiler is not None:
+                _cpu_profiler_lock.release()
+            
+            self.calls.append({"call": label, "ms": round(elapsed * 1000, 3)})
+            self._add_allocations(
+                after.filter_traces(_OWN_ALLOCATIONS).compare_to(before.filter_traces(_OWN_ALLOCATIONS), "lineno")
+            )
+            if profiler is not None:
+                self._add_cpu_profile(profiler, label)
+    
+    def _add_cpu_profile(self, profiler: cProfile.Profile, label: str) -> None:
+        if self.stats is None:
+            self.stats = pstats.Stats(profiler, stream=io.StringIO())
+        else:
+            self.stats.add(profiler)
+        
+        if settings.dump_dir:
+            path = os.path.join(settings.dump_dir, f"{int(time.time())}-{self.id}-{label}.prof")
+            profiler.dump_stats(path)
+            self.dumps.append(path)
+    
+    def _add_allocations(self, differences: List[tracemalloc.StatisticDiff]) -> None:
+        for diff in differences:
+            if diff.size_diff <= 0:
+                continue
+            frame = diff.traceback[0]
+            self.allocations.append({
+                "site": f"{frame.filename}:{frame.lineno}",
+                "sizeKiB": round(diff.size_diff / 1024, 1),
+                "count": diff.count_diff,
+            })
+    
+    def report(self) -> Dict[str, Any]:
+        """Timing breakdown, hottest functions and top allocation sites"""
+        top = settings.top
+        stages = [
+            {
+                "component": component,
+                "stage": stage,
+                "ms": round(sum(times) * 1000, 3),
+                "count": len(times),
+            }
+            for (component, stage), times in self.stages.items()
+        ]
+        
+        functions = []
+        if self.stats is not None:
+            entries = sorted(self.stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            for (filename, lineno, name), (_, calls, total, cumulative, _) in entries[:top]:
+                functions.append({
+                    "function": f"{os.path.basename(filename)}:{lineno}({name})",
+                    "calls": calls,
+                    "totalMs": round(total * 1000, 3),
+                    "cumulativeMs": round(cumulative * 1000, 3),
+                })
+        
+        return {
+            "id": self.id,
+            "totalMs": round((time.perf_counter() - self.started) * 1000, 3),
+            "calls": self.calls,
+            "stages": stages,
+            "topFunctions": functions,
+            "topAllocations": sorted(self.allocations, key=lambda a: a["sizeKiB"], reverse=True)[:top],
+            "dumps": self.dumps,
+            "notes": self.notes,
+        }
+    
+    def server_timing(self) -> str:
+        """Stage durations as a Server-Timing header value"""
+        return ", ".join(
+            f"{component}-{stage};dur={sum(times) * 1000:.3f}"
+            for (component, stage), times in self.stages.items()
+        )
+
+
+def _start_tracing() -> None:
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0:
+            # Leave tracing alone if it was enabled elsewhere (PYTHONTRACEMALLOC)
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+
+
+def profiled(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call an analyzer, profiling it when the current request asked for it
+    
+    Args:
+        fn: Analyzer method (e.g. sentiment_analyzer.analyze)
+        *args, **kwargs: Arguments for fn
+    
+    Returns:
+        Whatever fn returns
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return fn(*args, **kwargs)
+    return profile.run(fn, *args, **kwargs)
+
+
+class ProfilingRoute(APIRoute):
+    """
+    Route that profiles a request when X-Profile carries the admin token
+    
+    The report is added to the response body under "profile" (bodies that are
+    not objects are wrapped as {"result": ..., "profile": ...}) and stage
+    durations are sent as a Server-Timing header. Without a configured token
+    the route handler is returned unwrapped.
+    """
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if settings.token is None:
+            return handler
+        
+        async def profiling_handler(request: Request) -> Response:
+            if request.headers.get(PROFILE_HEADER) != settings.token:
+                return await handler(request)
+            
+            profile = RequestProfile()
+            profile_token = _current_profile.set(profile)
+            collector_token = stage_collector.set(profile.record_stage)
+            try:
+                response = await handler(request)
+            finally:
+                _current_profile.reset(profile_token)
+                stage_collector.reset(collector_token)
+            
+            return attach_report(response, profile)
+        
+        return profiling_handler
+
+
+def attach_report(response: Response, profile: RequestProfile) -> Response:
+    """Add the profile report to a JSON or msgpack response"""
+    report = profile.report()
+    media_type = (response.media_type or "").split(";")[0]
+    
+    if media_type == "application/json":
+        content = json.loads(response.body)
+        body = json.dumps(_with_report(content, report)).encode("utf-8")
+    elif MSGPACK_AVAILABLE and media_type in ("application/msgpack", "application/x-msgpack"):
+        content = msgpack.unpackb(response.body, raw=False)
+        body = msgpack.packb(_with_report(content, report), use_bin_type=True)
+    else:
+        response.headers["X-Profile-Id"] = profile.id
+        body = None
+    
+    if body is not None:
+        response.body = body
+        response.headers["content-length"] = str(len(body))
+    timing = profile.server_timing()
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
+
+def _with_report(content: Any, report: Dict[str, Any]) -> Any:
+    if isinstance(content, dict):
+        return {**content, "profile": report}
+    return {"result": content, "profile": report}
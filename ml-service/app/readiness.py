@@ -0,0 +1,117 @@
+"""
+Readiness
+Load state of models and heavy modules, reported by the liveness and readiness probes
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+# pending: not requested yet, loading: in progress, ready: serving,
+# failed: load raised (fallback serving), unavailable: dependency not installed
+LOAD_STATES = ("pending", "loading", "ready", "failed", "unavailable")
+
+
+class LoadState:
+    """
+    Load progress of one model or module and the backend serving in its place
+    
+    Until the component is ready, its analyzer answers through the fallback
+    backend (e.g. rule-based sentiment), so requests never wait on a load.
+    Components without a fallback (None) make their requests wait instead.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        backend: str,
+        fallback: Optional[str],
+        available: bool = True
+    ):
+        self.name = name
+        self.source = source
+        self.backend = backend
+        self.fallback = fallback
+        self.state = "pending" if available else "unavailable"
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+    
+    @property
+    def degraded(self) -> bool:
+        """Whether the fallback is serving although the component was requested"""
+        return self.state in ("loading", "failed")
+    
+    @property
+    def active_backend(self) -> Optional[str]:
+        return self.backend if self.state == "ready" else self.fallback
+    
+    def start(self) -> bool:
+        """Mark a pending component as loading; False if it is loaded (or loading) already"""
+        with self._lock:
+            if self.state != "pending":
+                return False
+            self.state = "loading"
+            return True
+    
+    @contextmanager
+    def loading(self) -> Iterator["LoadState"]:
+        """
+        Time a load started with start(); the component becomes ready when the
+        block completes, or failed (with the error kept) when it raises
+        """
+        begin = time.perf_counter()
+        try:
+            yield self
+        except Exception as e:
+            self.seconds = time.perf_counter() - begin
+            self.fail(str(e))
+            print(f"Error loading {self.name} ({self.source}): {e}")
+        else:
+            self.seconds = time.perf_counter() - begin
+            self.state = "ready"
+    
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.state = "failed"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "source": self.source,
+            "backend": self.active_backend,
+            "loadSeconds": round(self.seconds, 3) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+
+def readiness(states: Iterable[LoadState], allow_fallback: bool = False) -> Dict[str, Any]:
+    """
+    Readiness of a set of components
+    
+    Args:
+        states: Components this deployment serves
+        allow_fallback: Report ready when a load failed and its fallback is serving
+    
+    Returns:
+        {"ready": bool, "status": ready|loading|degraded|failed, "models": {...}}
+    """
+    states = list(states)
+    if any(s.state in ("pending", "loading") for s in states):
+        status = "loading"
+    elif any(s.state == "failed" for s in states):
+        status = "degraded" if allow_fallback else "failed"
+    else:
+        status = "ready"
+    return {
+        "ready": status in ("ready", "degraded"),
+        "status": status,
+        "models": {s.name: s.to_dict() for s in states},
+    }
@@ -0,0 +1,52 @@
+"""
+Service Roles
+Deployment-selected subsets of the ML service (text, voice, predict)
+"""
+
+from typing import Iterable, Optional, Set
+
+from fastapi import FastAPI
+
+
+SERVICE_ROLES = ("text", "voice", "predict")
+
+# Route path prefixes served by each role; other routes (health, metrics, docs) are always served
+ROLE_ROUTE_PREFIXES = {
+    "text": ("/analyze/text", "/analyze/realtime", "/analyze/batch"),
+    "voice": ("/analyze/voice",),
+    "predict": ("/predict", "/models", "/cohorts"),
+}
+
+
+def parse_roles(value: Optional[str]) -> Set[str]:
+    """
+    Roles from ML_SERVICE_ROLE, e.g. "predict" or "text,voice"
+    
+    Empty or "all" selects every role.
+    """
+    if not value or value.strip().lower() == "all":
+        return set(SERVICE_ROLES)
+    roles = {role.strip().lower() for role in value.split(",") if role.strip()}
+    unknown = roles - set(SERVICE_ROLES)
+    if unknown:
+        raise ValueError(
+            f"Unknown service role(s) {', '.join(sorted(unknown))}. Allowed: all, {', '.join(SERVICE_ROLES)}"
+        )
+    return roles
+
+
+def route_role(path: str) -> Optional[str]:
+    """Role serving a route path, None for shared routes"""
+    for role, prefixes in ROLE_ROUTE_PREFIXES.items():
+        if any(path == prefix or path.startswith(prefix + "/") for prefix in prefixes):
+            return role
+    return None
+
+
+def restrict_routes(app: FastAPI, roles: Iterable[str]) -> None:
+    """Remove the routes of roles this deployment does not serve (they answer 404)"""
+    roles = set(roles)
+    app.router.routes = [
+        route for route in app.router.routes
+        if route_role(getattr(route, "path", "")) in roles | {None}
+    ]
@@ -1,6 +1,18 @@
 # ML Services
 from .voice_analysis import VoiceAnalyzer
+from .voice_streaming import VoiceStreamSession
 from .sentiment_analysis import SentimentAnalyzer
 from .predictive_analysis import PredictiveAnalyzer
+from .predictive_state import TrendStateStore
+from .anomaly_detection import StreamingAnomalyDetector
+from .result_cache import ResultCache, LatestResultCache
+from .vocal_baseline import VocalBaselineStore
+from .model_registry import ModelRegistry
+from .model_snapshots import ModelSnapshotStore
+from .cohort_index import CohortPercentileIndex
 
-__all__ = ['VoiceAnalyzer', 'SentimentAnalyzer', 'PredictiveAnalyzer']
+__all__ = [
+    'VoiceAnalyzer', 'VoiceStreamSession', 'SentimentAnalyzer', 'PredictiveAnalyzer',
+    'TrendStateStore', 'StreamingAnomalyDetector', 'ResultCache', 'LatestResultCache', 'VocalBaselineStore',
+    'ModelRegistry', 'ModelSnapshotStore', 'CohortPercentileIndex',
+]
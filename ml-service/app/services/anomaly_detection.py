@@ -0,0 +1,272 @@
+"""
+Anomaly Detection Service
+Streaming per-user EWMA z-scores and CUSUM change points for mood and voice signals
+"""
+
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from .mood_series import MoodLogs, SECONDS_PER_DAY, ingest_mood_logs, parse_timestamps
+
+
+# Monitored signals: name -> (label, direction of concern, minimum standard deviation)
+# The minimum keeps a perfectly stable history from turning any change into an infinite z-score
+ANOMALY_SIGNALS = {
+    "mood": ("Mood", -1, 0.5),
+    "mhi": ("Mental Health Index", -1, 2.0),
+    "anxiety": ("Anxiety", 1, 0.5),
+    "sleep": ("Sleep quality", -1, 0.5),
+    "flatAffect": ("Flat affect", 1, 0.02),
+    "agitation": ("Speech agitation", 1, 0.02),
+    "vocalHealth": ("Vocal health", -1, 2.0),
+}
+
+# Voice signals: name -> (camelCase key, snake_case key)
+VOICE_SIGNAL_KEYS = {
+    "flatAffect": ("flatAffectScore", "flat_affect_score"),
+    "agitation": ("agitatedSpeechScore", "agitated_speech_score"),
+    "vocalHealth": ("vocalHealthScore", "overall_vocal_health_score"),
+}
+
+
+class SignalState:
+    """
+    Exponentially weighted mean and variance of one signal, with CUSUM sums
+    
+    Until 1/count drops below alpha the weights are 1/count, so early
+    estimates are plain means instead of being biased toward the first value.
+    """
+    
+    __slots__ = ("count", "mean", "var", "cusum_up", "cusum_down")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum_up = 0.0
+        self.cusum_down = 0.0
+
+
+class StreamingAnomalyDetector:
+    """
+    Per-user streaming anomaly detection with O(1) memory and work per value
+    
+    Each value is standardized against the signal's running EWMA mean and
+    variance before being folded in. An |z| above z_threshold is an
+    excursion; a two-sided CUSUM over the (clipped) z-scores detects
+    sustained shifts that no single value reveals. States are kept in memory
+    with LRU eviction, like TrendStateStore. Voice signals are kept per
+    analysis profile because scores from different profiles are not
+    comparable (as in VocalBaselineStore).
+    
+    Events are only reported for values dated within report_days of the
+    newest value of a call, so replaying a full history (reset) rebuilds the
+    statistics without announcing change points from months ago.
+    """
+    
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        z_threshold: float = 3.0,
+        cusum_drift: float = 0.5,
+        cusum_threshold: float = 6.0,
+        warmup: int = 10,
+        max_users: int = 100000,
+        report_days: Optional[float] = 7.0,
+    ):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.cusum_drift = cusum_drift
+        self.cusum_threshold = cusum_threshold
+        self.warmup = warmup
+        self.max_users = max_users
+        self.report_days = report_days
+        
+        self._states: "OrderedDict[str, Dict[str, SignalState]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def observe(
+        self,
+        user_id: str,
+        mood_logs: Optional[MoodLogs] = None,
+        voice_biometrics: Optional[List[Dict[str, Any]]] = None,
+        profile: str = "standard",
+        reset: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Feed new entries for a user
+        
+        Mood and voice values are folded in timestamp order (createdAt);
+        undated entries follow the dated ones, in the order given.
+        
+        Args:
+            user_id: User identifier
+            mood_logs: Mood log entries recorded since the last call
+            voice_biometrics: Voice analysis results since the last call
+            profile: Voice analysis profile the results were produced with
+            reset: Discard the user's state of the signals fed in this call
+                first (full history replay)
+        
+        Returns:
+            Detected events, in the order they occurred, limited to values
+            dated within report_days of the newest one; undated values are
+            reported unless the call is a reset replay
+        """
+        # (timestamp, state key, value); NaN timestamp for undated entries
+        values: List[Tuple[float, str, float]] = []
+        fed = set()
+        if mood_logs is not None:
+            logs = ingest_mood_logs(mood_logs)
+            columns = {name: logs[name].tolist() for name in ("mood", "mhi", "anxiety", "sleep")}
+            fed.update(columns)
+            for i, timestamp in enumerate(logs["timestamp"].tolist()):
+                values.extend(
+                    (timestamp, name, column[i]) for name, column in columns.items() if column[i] == column[i]
+                )
+        
+        voice = voice_biometrics or []
+        if voice:
+            fed.update(_voice_key(name, profile) for name in VOICE_SIGNAL_KEYS)
+        voice_times = parse_timestamps([v.get("createdAt") or v.get("created_at") for v in voice])
+        for v, timestamp in zip(voice, voice_times.tolist()):
+            for name, (camel, snake) in VOICE_SIGNAL_KEYS.items():
+                value = v.get(camel, v.get(snake))
+                if value is not None:
+                    values.append((timestamp, _voice_key(name, profile), float(value)))
+        
+        # Stable sort: undated entries last, ties keep the given order
+        values.sort(key=lambda entry: entry[0] if entry[0] == entry[0] else np.inf)
+        dated = [entry[0] for entry in values if entry[0] == entry[0]]
+        cutoff = -np.inf
+        if dated and self.report_days is not None:
+            cutoff = max(dated) - self.report_days * SECONDS_PER_DAY
+        
+        with self._lock:
+            signals = self._states.get(user_id)
+            if signals is None:
+                signals = {}
+                self._states[user_id] = signals
+            elif reset:
+                for key in fed:
+                    signals.pop(key, None)
+            self._states.move_to_end(user_id)
+            while len(self._states) > self.max_users:
+                self._states.popitem(last=False)
+            
+            events = []
+            for timestamp, key, value in values:
+                state = signals.get(key)
+                if state is None:
+                    state = signals[key] = SignalState()
+                found = self._update(key.partition(":")[0], state, value)
+                if timestamp == timestamp:
+                    report = timestamp >= cutoff
+                else:
+                    report = not reset
+                if report:
+                    events.extend({**event, "timestamp": _isoformat(timestamp)} for event in found)
+            return events
+    
+    def _update(self, name: str, state: SignalState, value: float) -> List[Dict[str, Any]]:
+        """Score one value against the running statistics, then fold it in"""
+        _, _, min_std = ANOMALY_SIGNALS[name]
+        events = []
+        
+        if state.count >= self.warmup:
+            expected = state.mean
+            z = (value - expected) / max(np.sqrt(state.var), min_std)
+            
+            if abs(z) >= self.z_threshold:
+                events.append(self._event(name, "excursion", z, value, expected))
+            
+            # Clipping keeps one outlier from also registering as a shift
+            clipped = min(max(z, -self.z_threshold), self.z_threshold)
+            state.cusum_up = max(0.0, state.cusum_up + clipped - self.cusum_drift)
+            state.cusum_down = max(0.0, state.cusum_down - clipped - self.cusum_drift)
+            if state.cusum_up > self.cusum_threshold or state.cusum_down > self.cusum_threshold:
+                shift = state.cusum_up if state.cusum_up > state.cusum_down else -state.cusum_down
+                events.append(self._event(name, "change_point", shift, value, expected))
+                state.cusum_up = state.cusum_down = 0.0
+        
+        state.count += 1
+        weight = max(self.alpha, 1.0 / state.count)
+        delta = value - state.mean
+        state.mean += weight * delta
+        state.var = (1.0 - weight) * (state.var + weight * delta * delta)
+        
+        return events
+    
+    def _event(self, name: str, kind: str, score: float, value: float, expected: float) -> Dict[str, Any]:
+        _, concern, _ = ANOMALY_SIGNALS[name]
+        direction = 1 if score > 0 else -1
+        return {
+            "signal": name,
+            "kind": kind,
+            "direction": "up" if direction > 0 else "down",
+            "concerning": direction == concern,
+            "score": round(float(score), 2),
+            "value": round(value, 4),
+            "expected": round(float(expected), 4),
+        }
+    
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+def _voice_key(name: str, profile: str) -> str:
+    return f"{name}:{profile}"
+
+
+def _isoformat(timestamp: float) -> Optional[str]:
+    if timestamp != timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def anomaly_insights(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Proactive insights for detected events, at most one per signal
+    
+    The latest event of each signal wins, and only concerning directions are
+    reported.
+    
+    Args:
+        events: Events returned by StreamingAnomalyDetector.observe
+    
+    Returns:
+        Insights in the proactiveInsights format
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        latest[event["signal"]] = event
+    
+    insights = []
+    for name, event in latest.items():
+        if not event["concerning"]:
+            continue
+        
+        label, _, _ = ANOMALY_SIGNALS[name]
+        change = "risen" if event["direction"] == "up" else "dropped"
+        if event["kind"] == "excursion":
+            insights.append({
+                "type": "signal_excursion",
+                "severity": "high" if abs(event["score"]) >= 5 else "medium",
+                "message": f"{label} has {change} sharply compared with your recent pattern.",
+                "recommendation": "Take a moment to check in with yourself, and reach out to someone you trust if this persists.",
+                "triggerValue": event["score"],
+                "signal": name,
+            })
+        else:
+            insights.append({
+                "type": "signal_shift",
+                "severity": "medium",
+                "message": f"{label} has {change} steadily over your recent entries.",
+                "recommendation": "Look at what has changed in your routine lately and consider discussing it with a professional.",
+                "triggerValue": event["score"],
+                "signal": name,
+            })
+    
+    return insights
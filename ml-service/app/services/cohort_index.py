@@ -0,0 +1,189 @@
+"""
+Cohort Index Service
+Sorted population score arrays for O(log n) percentile lookups
+"""
+
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional, Iterable
+
+# Scores indexed per cohort (names as sent by the backend)
+COHORT_METRICS = ["burnoutRisk", "mentalHealthIndex", "flatAffect", "agitation"]
+
+# Every user belongs to this cohort in addition to their own
+ALL_COHORT = "all"
+
+
+class CohortPercentileIndex:
+    """
+    Periodically rebuilt percentile index of population scores
+    
+    Each build sorts one array per cohort and metric and swaps the whole
+    index in at once, so lookups never see a partial build. A percentile is
+    two binary searches (values below, values equal) on the sorted array.
+    Cohorts smaller than min_cohort_size return no percentiles.
+    """
+    
+    def __init__(self, min_cohort_size: int = 20):
+        self.min_cohort_size = min_cohort_size
+        
+        self._lock = threading.Lock()
+        self._arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        self.built_at: Optional[float] = None
+        self.source: Optional[str] = None
+    
+    def build(self, records: Iterable[Dict[str, Any]], source: str = "records") -> Dict[str, Any]:
+        """
+        Replace the index with scores from a set of users
+        
+        Args:
+            records: One dictionary per user with an optional "cohort" and
+                any of the COHORT_METRICS scores
+            source: Description of where the records came from
+        
+        Returns:
+            Index statistics after the build
+        """
+        columns: Dict[str, Dict[str, List[float]]] = {}
+        for record in records:
+            cohorts = {ALL_COHORT}
+            if record.get("cohort"):
+                cohorts.add(str(record["cohort"]))
+            for cohort in cohorts:
+                values = columns.setdefault(cohort, {metric: [] for metric in COHORT_METRICS})
+                for metric in COHORT_METRICS:
+                    if record.get(metric) is not None:
+                        values[metric].append(record[metric])
+        
+        arrays = {
+            cohort: {
+                metric: np.sort(np.array(values, dtype=np.float64))
+                for metric, values in metrics.items()
+            }
+            for cohort, metrics in columns.items()
+        }
+        
+        with self._lock:
+            self._arrays = arrays
+            self.built_at = time.time()
+            self.source = source
+        return self.stats()
+    
+    def percentiles(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Optional[float]]]:
+        """
+        Percentile ranks for many patients in one call
+        
+        The rank is the share of the cohort scoring below the value, with
+        ties counted half, on a 0-100 scale.
+        
+        Args:
+            queries: Dictionaries with an optional "cohort" and a "scores"
+                dictionary keyed by COHORT_METRICS
+        
+        Returns:
+            One dictionary of metric -> percentile (None when unavailable)
+            per query, in order
+        """
+        with self._lock:
+            arrays = self._arrays
+        
+        results: List[Dict[str, Optional[float]]] = [
+            {metric: None for metric in COHORT_METRICS} for _ in queries
+        ]
+        
+        # Group lookups per cohort and metric so each group is one vectorized search
+        groups: Dict[tuple, List[int]] = {}
+        for i, query in enumerate(queries):
+            cohort = query.get("cohort") or ALL_COHORT
+            for metric, value in (query.get("scores") or {}).items():
+                if metric in COHORT_METRICS and value is not None:
+                    groups.setdefault((cohort, metric), []).append(i)
+        
+        for (cohort, metric), rows in groups.items():
+            population = arrays.get(cohort, {}).get(metric)
+            if population is None or len(population) < self.min_cohort_size:
+                continue
+            
+            values = np.array([queries[i]["scores"][metric] for i in rows], dtype=np.float64)
+            below = np.searchsorted(population, values, side="left")
+            at_or_below = np.searchsorted(population, values, side="right")
+            ranks = (below + at_or_below) / 2 / len(population) * 100
+            
+            for i, rank in zip(rows, ranks.tolist()):
+                results[i][metric] = round(rank, 1)
+        
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cohort sizes and build time"""
+        with self._lock:
+            arrays = self._arrays
+            return {
+                "builtAt": self.built_at,
+                "source": self.source,
+                "minCohortSize": self.min_cohort_size,
+                "cohorts": {
+                    cohort: {metric: len(values) for metric, values in metrics.items()}
+                    for cohort, metrics in arrays.items()
+                },
+            }
+
+
+# Voice scores are averaged over each user's most recent recordings (backend: doctor.ts)
+VOICE_AVERAGE_RECORDINGS = 10
+
+
+def load_cohort_records(path: str, cohort_column: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Latest per-user scores from a SQLite copy of the schema
+    
+    Burnout risk comes from each user's latest predictive_insights row, the
+    Mental Health Index from users, and flat affect / agitation are averages
+    over the user's VOICE_AVERAGE_RECORDINGS latest voice_biometrics rows,
+    the same aggregate the backend sends for a patient.
+    
+    Args:
+        path: SQLite database file
+        cohort_column: Optional users column that defines the cohort
+    
+    Returns:
+        Records for CohortPercentileIndex.build
+    """
+    cohort_select = f"u.{cohort_column}" if cohort_column else "NULL"
+    query = f"""
+        SELECT u.id, {cohort_select}, p.burnout_risk_score, u.mental_health_index,
+               v.flat_affect, v.agitation
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id, burnout_risk_score,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS position
+            FROM predictive_insights
+        ) p ON p.user_id = u.id AND p.position = 1
+        LEFT JOIN (
+            SELECT user_id, AVG(flat_affect_score) AS flat_affect, AVG(agitated_speech_score) AS agitation
+            FROM (
+                SELECT user_id, flat_affect_score, agitated_speech_score,
+                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS position
+                FROM voice_biometrics
+            )
+            WHERE position <= {VOICE_AVERAGE_RECORDINGS}
+            GROUP BY user_id
+        ) v ON v.user_id = u.id
+    """
+    
+    connection = sqlite3.connect(path)
+    try:
+        return [
+            {
+                "cohort": cohort,
+                "burnoutRisk": burnout,
+                "mentalHealthIndex": mhi,
+                "flatAffect": flat_affect,
+                "agitation": agitation,
+            }
+            for _, cohort, burnout, mhi, flat_affect, agitation in connection.execute(query)
+        ]
+    finally:
+        connection.close()
@@ -0,0 +1,355 @@
+"""
+Model Registry Service
+Versioned trained predictors with memory-mapped loading, hot swap and shadow scoring
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from ..lazy import LazyModule, module_available
+from ..metrics import metrics
+
+# joblib is imported when a model is first saved or loaded
+JOBLIB_AVAILABLE = module_available("joblib")
+joblib = LazyModule("joblib")
+if not JOBLIB_AVAILABLE:
+    print("Warning: joblib not available, trained models disabled")
+
+
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+ACTIVE_FILE = "ACTIVE"
+
+# Model names and versions become path components under the registry root
+LABEL_PATTERN = re.compile(r"[\w.-]+")
+
+
+class LoadedModel:
+    """A trained estimator together with its registry version and metadata"""
+    
+    def __init__(self, name: str, version: str, estimator: Any, metadata: Dict[str, Any]):
+        self.name = name
+        self.version = version
+        self.estimator = estimator
+        self.metadata = metadata
+        self.loaded_at = time.time()
+    
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return np.asarray(self.estimator.predict(features), dtype=np.float64)
+
+
+class ShadowStats:
+    """Latency and agreement of a shadow model against the active one"""
+    
+    def __init__(self, version: str, tolerance: float):
+        self.version = version
+        self.tolerance = tolerance
+        self.calls = 0
+        self.rows = 0
+        self.agreed = 0
+        self.abs_diff_sum = 0.0
+        self.active_seconds = 0.0
+        self.shadow_seconds = 0.0
+        self.errors = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "calls": self.calls,
+            "rows": self.rows,
+            "agreement": round(self.agreed / self.rows, 4) if self.rows else None,
+            "meanAbsDiff": round(self.abs_diff_sum / self.rows, 4) if self.rows else None,
+            "activeMs": round(self.active_seconds * 1000 / self.calls, 3) if self.calls else None,
+            "shadowMs": round(self.shadow_seconds * 1000 / self.calls, 3) if self.calls else None,
+            "errors": self.errors,
+            "tolerance": self.tolerance,
+        }
+
+
+class ModelRegistry:
+    """
+    Versioned joblib artifacts under <root>/<name>/<version>/
+    
+    Models are loaded with mmap_mode="r", so the numpy arrays inside an
+    uncompressed artifact are mapped from the page cache and shared by all
+    worker processes. Activating a version loads it completely before the
+    active reference is swapped, so requests never see a half-loaded model.
+    The active version is also written to <root>/<name>/ACTIVE, which other
+    workers pick up on their next lookup.
+    
+    A shadow version can be scored next to the active one; its output is
+    only compared (latency and agreement), never returned.
+    """
+    
+    def __init__(
+        self,
+        root: str,
+        schemas: Optional[Dict[str, List[str]]] = None,
+        poll_interval: float = 5.0,
+        shadow_tolerance: float = 0.5,
+    ):
+        self.root = root
+        self.schemas = schemas or {}
+        self.poll_interval = poll_interval
+        self.shadow_tolerance = shadow_tolerance
+        
+        self._lock = threading.Lock()
+        self._active: Dict[str, Optional[LoadedModel]] = {}
+        self._shadow: Dict[str, LoadedModel] = {}
+        self._shadow_stats: Dict[str, ShadowStats] = {}
+        self._pointer_checked: Dict[str, float] = {}
+        self._pointer_mtime: Dict[str, float] = {}
+    
+    def versions(self, name: str) -> List[str]:
+        """Published versions of a model, oldest first"""
+        directory = os.path.join(self.root, _check_label("name", name))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            v for v in os.listdir(directory)
+            if not v.startswith(".") and os.path.isfile(os.path.join(directory, v, MODEL_FILE))
+        )
+    
+    def publish(
+        self,
+        name: str,
+        version: str,
+        estimator: Any,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Store a trained estimator as a new version
+        
+        The artifact is written uncompressed so it can be memory-mapped.
+        
+        Args:
+            name: Model name (e.g. "burnout")
+            version: Version label, unique per model
+            estimator: Fitted estimator with a predict() method
+            metadata: Optional training details (features, metrics, ...)
+        
+        Returns:
+            Directory of the published version
+        
+        Raises:
+            ValueError: Invalid name or version, or the version exists
+        """
+        self._require_joblib()
+        directory = os.path.join(self.root, _check_label("name", name), _check_label("version", version))
+        if os.path.exists(directory):
+            raise ValueError(f"Model '{name}' version '{version}' already exists")
+        
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(directory), prefix=".staging-")
+        joblib.dump(estimator, os.path.join(staging, MODEL_FILE), compress=0)
+        with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump({**(metadata or {}), "version": version, "publishedAt": time.time()}, f)
+        
+        os.replace(staging, directory)
+        return directory
+    
+    def activate(self, name: str, version: Optional[str]) -> Dict[str, Any]:
+        """
+        Hot swap the active version of a model
+        
+        Args:
+            name: Model name
+            version: Version to serve, or None to fall back to the heuristics
+        
+        Returns:
+            Status of the model
+        """
+        model = self._load(name, version) if version is not None else None
+        with self._lock:
+            self._active[name] = model
+            if name in self._shadow and model is not None and self._shadow[name].version == model.version:
+                # Promoting the shadow version ends the comparison
+                del self._shadow[name]
+        self._write_pointer(name, version)
+        return self.status(name)
+    
+    def set_shadow(self, name: str, version: Optional[str]) -> Dict[str, Any]:
+        """
+        Start (or with None, stop) scoring a version in shadow mode
+        
+        Args:
+            name: Model name
+            version: Version to compare against the active one
+        
+        Returns:
+            Status of the model
+        """
+        model = self._load(name, version) if version is not None else None
+        with self._lock:
+            if model is None:
+                self._shadow.pop(name, None)
+            else:
+                self._shadow[name] = model
+                self._shadow_stats[name] = ShadowStats(version, self.shadow_tolerance)
+        return self.status(name)
+    
+    def has_active(self, name: str) -> bool:
+        """Whether a trained model currently serves this name"""
+        return self._get_active(name) is not None
+    
+    def active_version(self, name: str) -> Optional[str]:
+        """Version currently serving this name, None for the heuristics"""
+        active = self._get_active(name)
+        return active.version if active else None
+    
+    def predict(self, name: str, features: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Score feature rows with the active model (and the shadow, if any)
+        
+        Args:
+            name: Model name
+            features: 2-D array, one row per prediction
+        
+        Returns:
+            Active model output, or None when no model is active
+        """
+        active = self._get_active(name)
+        if active is None:
+            return None
+        
+        start = time.perf_counter()
+        output = active.predict(features)
+        active_seconds = time.perf_counter() - start
+        
+        with self._lock:
+            shadow = self._shadow.get(name)
+            stats = self._shadow_stats.get(name)
+        if shadow is None:
+            return output
+        
+        start = time.perf_counter()
+        try:
+            shadow_output = shadow.predict(features)
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            return output
+        shadow_seconds = time.perf_counter() - start
+        
+        diff = np.abs(shadow_output - output)
+        with self._lock:
+            stats.calls += 1
+            stats.rows += len(output)
+            stats.agreed += int(np.count_nonzero(diff <= stats.tolerance))
+            stats.abs_diff_sum += float(diff.sum())
+            stats.active_seconds += active_seconds
+            stats.shadow_seconds += shadow_seconds
+        return output
+    
+    def status(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Active and shadow versions with shadow comparison metrics"""
+        names = [name] if name else sorted(
+            set(self._active) | set(self.schemas) | set(self._listed_models())
+        )
+        report = {}
+        for n in names:
+            active = self._get_active(n)
+            with self._lock:
+                shadow = self._shadow.get(n)
+                stats = self._shadow_stats.get(n)
+            report[n] = {
+                "active": active.version if active else None,
+                "shadow": shadow.version if shadow else None,
+                "shadowStats": stats.to_dict() if stats else None,
+                "versions": self.versions(n),
+            }
+        return report
+    
+    def _load(self, name: str, version: str) -> LoadedModel:
+        """Load and validate one version"""
+        self._require_joblib()
+        if version not in self.versions(name):
+            raise ValueError(f"Model '{name}' has no version '{version}'")
+        directory = os.path.join(self.root, name, version)
+        path = os.path.join(directory, MODEL_FILE)
+        
+        metadata = {}
+        try:
+            with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        start = time.perf_counter()
+        estimator = joblib.load(path, mmap_mode="r")
+        metrics.record_model_load(name, version, time.perf_counter() - start)
+        if not hasattr(estimator, "predict"):
+            raise ValueError(f"Model '{name}' version '{version}' has no predict()")
+        
+        schema = self.schemas.get(name)
+        if schema is not None:
+            n_features = getattr(estimator, "n_features_in_", None)
+            if n_features is not None and n_features != len(schema):
+                raise ValueError(
+                    f"Model '{name}' version '{version}' expects {n_features} features, not {len(schema)}"
+                )
+            if metadata.get("features") not in (None, schema):
+                raise ValueError(f"Model '{name}' version '{version}' was trained on different features")
+        
+        return LoadedModel(name, version, estimator, metadata)
+    
+    def _get_active(self, name: str) -> Optional[LoadedModel]:
+        """Active model, following version changes made by other workers"""
+        now = time.monotonic()
+        if now - self._pointer_checked.get(name, -np.inf) >= self.poll_interval:
+            self._pointer_checked[name] = now
+            self._follow_pointer(name)
+        with self._lock:
+            return self._active.get(name)
+    
+    def _follow_pointer(self, name: str) -> None:
+        path = os.path.join(self.root, name, ACTIVE_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+        if self._pointer_mtime.get(name) == mtime:
+            return
+        self._pointer_mtime[name] = mtime
+        
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                version = f.read().strip() or None
+            current = self._active.get(name)
+            if (current.version if current else None) != version:
+                model = self._load(name, version) if version else None
+                with self._lock:
+                    self._active[name] = model
+        except Exception as e:
+            print(f"Model registry: could not follow active version of '{name}': {e}")
+    
+    def _write_pointer(self, name: str, version: Optional[str]) -> None:
+        directory = os.path.join(self.root, _check_label("name", name))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version or "")
+        os.replace(temp_path, os.path.join(directory, ACTIVE_FILE))
+        self._pointer_mtime[name] = os.stat(os.path.join(directory, ACTIVE_FILE)).st_mtime
+    
+    def _listed_models(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return [n for n in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, n))]
+    
+    def _require_joblib(self) -> None:
+        if not JOBLIB_AVAILABLE:
+            raise RuntimeError("joblib is required for trained models")
+
+
+def _check_label(kind: str, value: str) -> str:
+    """A model name or version that stays one directory level under the root"""
+    if not isinstance(value, str) or not LABEL_PATTERN.fullmatch(value) or set(value) == {"."}:
+        raise ValueError(f"Invalid model {kind} '{value}'")
+    return value
@@ -0,0 +1,165 @@
+"""
+Model Snapshots Service
+Pinned offline copies of the transformer models with memory-mapped safetensors weights
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from ..lazy import module_available
+
+# Lets from_pretrained build the model on the meta device and adopt the mapped tensors
+ACCELERATE_AVAILABLE = module_available("accelerate")
+
+
+MANIFEST_FILE = "MANIFEST.json"
+WEIGHTS_FILE = "model.safetensors"
+
+
+class ModelSnapshotStore:
+    """
+    Local transformer models under <root>/<model>--<commit>/ pinned by a manifest
+    
+    prepare() is the only step that needs the network: it resolves a hub
+    revision to its commit, and stores config, tokenizer and weights as
+    model.safetensors together with file checksums. Loading never contacts
+    the hub (local_files_only). safetensors files are memory-mapped rather
+    than unpickled, and with accelerate installed the model parameters are
+    the mapped tensors themselves, so startup skips the deserialize-and-copy
+    and all processes on a host serving the same snapshot share its pages
+    through the page cache.
+    
+    Re-preparing a model writes a new directory and swaps the manifest entry,
+    so running processes keep mapping the files they loaded.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+    
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Prepared models by hub id (revision, directory, file checksums)"""
+        try:
+            with open(os.path.join(self.root, MANIFEST_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def path(self, model_id: str) -> Optional[str]:
+        """Directory of a prepared model, None if the store has no snapshot of it"""
+        entry = self.manifest().get(model_id)
+        if entry is None:
+            return None
+        directory = os.path.join(self.root, entry["path"])
+        return directory if os.path.isfile(os.path.join(directory, WEIGHTS_FILE)) else None
+    
+    def prepare(self, model_id: str, revision: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Download a sequence classification model and store it as a snapshot
+        
+        Args:
+            model_id: Hub model id
+            revision: Branch, tag or commit to pin (default: the main branch)
+        
+        Returns:
+            Manifest entry of the snapshot
+        """
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        
+        model = AutoModelForSequenceClassification.from_pretrained(model_id, revision=revision)
+        tokenizer = AutoTokenizer.from_pretrained(model_id, revision=revision)
+        commit = getattr(model.config, "_commit_hash", None) or revision or "main"
+        
+        name = f"{model_id.replace('/', '--')}--{commit[:12]}"
+        directory = os.path.join(self.root, name)
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.root, prefix=".staging-")
+        try:
+            model.save_pretrained(staging, safe_serialization=True)
+            tokenizer.save_pretrained(staging)
+            files = {f: _sha256(os.path.join(staging, f)) for f in sorted(os.listdir(staging))}
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+            os.replace(staging, directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        entry = {
+            "revision": commit,
+            "path": name,
+            "files": files,
+            "preparedAt": time.time(),
+        }
+        with self._lock:
+            manifest = self.manifest()
+            manifest[model_id] = entry
+            self._write_manifest(manifest)
+        return entry
+    
+    def verify(self, model_id: str) -> List[str]:
+        """
+        Check a snapshot against its manifest checksums (reads every file)
+        
+        Returns:
+            Missing or changed files; empty when the snapshot is intact
+        """
+        entry = self.manifest().get(model_id)
+        if entry is None:
+            return [MANIFEST_FILE]
+        directory = os.path.join(self.root, entry["path"])
+        problems = []
+        for name, digest in entry["files"].items():
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or _sha256(path) != digest:
+                problems.append(name)
+        return problems
+    
+    def load_pipeline(self, task: str, model_id: str, **kwargs) -> Any:
+        """
+        transformers pipeline for a prepared model, loaded offline from its snapshot
+        
+        Args:
+            task: Pipeline task (e.g. "sentiment-analysis")
+            model_id: Hub id the model was prepared under
+            **kwargs: Further pipeline() arguments (device, top_k, ...)
+        
+        Raises:
+            FileNotFoundError: The model has not been prepared in this store
+        """
+        directory = self.path(model_id)
+        if directory is None:
+            raise FileNotFoundError(
+                f"No snapshot of {model_id} in {self.root}; run python -m app.jobs.prepare_models"
+            )
+        
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+        
+        model = AutoModelForSequenceClassification.from_pretrained(
+            directory,
+            local_files_only=True,
+            use_safetensors=True,
+            low_cpu_mem_usage=ACCELERATE_AVAILABLE,
+        )
+        tokenizer = AutoTokenizer.from_pretrained(directory, local_files_only=True)
+        return pipeline(task, model=model, tokenizer=tokenizer, **kwargs)
+    
+    def _write_manifest(self, manifest: Dict[str, Dict[str, Any]]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, os.path.join(self.root, MANIFEST_FILE))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,218 @@
+"""
+Mood Series Ingestion
+Single-pass conversion of mood logs into a structured NumPy array
+"""
+
+import warnings
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
+
+
+# Column -> (camelCase key, snake_case key, value used when a series is empty)
+MOOD_COLUMNS = {
+    "mood": ("moodScore", "mood_score", 5.0),
+    "mhi": ("mentalHealthIndex", "mental_health_index", 50.0),
+    "anxiety": ("anxietyLevel", "anxiety_level", 5.0),
+    "sleep": ("sleepQuality", "sleep_quality", 5.0),
+}
+
+TIMESTAMP_KEYS = ("createdAt", "created_at")
+
+SECONDS_PER_DAY = 86400
+
+# One row per log; NaN marks a missing value
+MOOD_LOG_DTYPE = np.dtype(
+    [("timestamp", "<f8")] + [(name, "<f8") for name in MOOD_COLUMNS]
+)
+
+MoodLogs = Union[List[Dict[str, Any]], Dict[str, List[Any]], np.ndarray]
+
+
+class MoodLogsError(ValueError):
+    """Mood logs that cannot be converted (unequal columns, non-numeric values)"""
+
+
+def ingest_mood_logs(mood_logs: MoodLogs) -> np.ndarray:
+    """
+    Convert mood logs into a structured array in one pass
+    
+    Accepts a list of log dictionaries, a columnar dictionary of lists
+    (e.g. {"moodScore": [...], "anxietyLevel": [...]}) or an array that
+    was already ingested. As with the per-field extraction this replaces,
+    a falsy camelCase value falls back to the snake_case key.
+    
+    Args:
+        mood_logs: Mood logs in any of the accepted layouts
+    
+    Returns:
+        Structured array with MOOD_LOG_DTYPE, one row per log
+    
+    Raises:
+        MoodLogsError: The logs are malformed (client input)
+    """
+    if isinstance(mood_logs, np.ndarray):
+        return mood_logs
+    try:
+        if isinstance(mood_logs, dict):
+            return _ingest_columns(mood_logs)
+        return _ingest_rows(mood_logs)
+    except (ValueError, TypeError) as e:
+        raise MoodLogsError(f"Invalid mood logs: {e}") from e
+
+
+def _ingest_rows(mood_logs: List[Dict[str, Any]]) -> np.ndarray:
+    """Build the structured array from a list of log dictionaries"""
+    # Keys are spelled out (see MOOD_COLUMNS) to keep the per-log work to
+    # plain lookups and appends; None becomes NaN in the array conversion
+    mood, mhi, anxiety, sleep, raw_timestamps = [], [], [], [], []
+    for log in mood_logs:
+        get = log.get
+        mood.append(get("moodScore") or get("mood_score"))
+        mhi.append(get("mentalHealthIndex") or get("mental_health_index"))
+        anxiety.append(get("anxietyLevel") or get("anxiety_level"))
+        sleep.append(get("sleepQuality") or get("sleep_quality"))
+        raw_timestamps.append(get("createdAt") or get("created_at"))
+    
+    logs = np.empty(len(raw_timestamps), dtype=MOOD_LOG_DTYPE)
+    for name, values in (("mood", mood), ("mhi", mhi), ("anxiety", anxiety), ("sleep", sleep)):
+        logs[name] = np.array(values, dtype=np.float64)
+    logs["timestamp"] = parse_timestamps(raw_timestamps)
+    return logs
+
+
+def mood_series(logs: np.ndarray, column: str) -> np.ndarray:
+    """
+    Present values of one column, in log order
+    
+    Args:
+        logs: Array from ingest_mood_logs
+        column: Name from MOOD_COLUMNS
+    
+    Returns:
+        1-D float array, or the column default when no value is present
+    """
+    values = logs[column]
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([MOOD_COLUMNS[column][2]])
+    return values
+
+
+def daily_buckets(
+    logs: np.ndarray,
+    history_days: int,
+    end: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Aggregate timestamped logs into daily (UTC) means
+    
+    Only the last history_days days up to end (default: the latest log)
+    are grouped, so everything downstream works on at most history_days
+    rows. Logs without a timestamp are skipped.
+    
+    Args:
+        logs: Array from ingest_mood_logs
+        history_days: Number of days kept, counting the end day
+        end: Optional reference time in epoch seconds
+    
+    Returns:
+        Dictionary with "day" (offsets from the end day, <= 0), "count"
+        (logs per day) and one column of daily means per metric, NaN on
+        days without a value for that metric
+    """
+    timestamps = logs["timestamp"]
+    dated = ~np.isnan(timestamps)
+    days = np.full(len(logs), np.iinfo(np.int64).min)
+    days[dated] = np.floor(timestamps[dated] / SECONDS_PER_DAY).astype(np.int64)
+    
+    if not dated.any():
+        end_day = 0
+        keep = dated
+    else:
+        end_day = int(days[dated].max()) if end is None else int(np.floor(end / SECONDS_PER_DAY))
+        keep = dated & (days > end_day - history_days) & (days <= end_day)
+    
+    unique_days, inverse = np.unique(days[keep], return_inverse=True)
+    buckets = {
+        "day": unique_days - end_day,
+        "count": np.bincount(inverse, minlength=len(unique_days)),
+    }
+    for name in MOOD_COLUMNS:
+        values = logs[name][keep]
+        present = ~np.isnan(values)
+        sums = np.bincount(inverse[present], weights=values[present], minlength=len(unique_days))
+        counts = np.bincount(inverse[present], minlength=len(unique_days))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            buckets[name] = np.where(counts > 0, sums / counts, np.nan)
+    
+    return buckets
+
+
+def _ingest_columns(columns: Dict[str, List[Any]]) -> np.ndarray:
+    """Build the structured array from a columnar payload"""
+    known = [key for camel, snake, _ in MOOD_COLUMNS.values() for key in (camel, snake)]
+    lengths = {
+        len(columns[key]) for key in known + list(TIMESTAMP_KEYS)
+        if columns.get(key) is not None
+    }
+    if len(lengths) > 1:
+        raise ValueError("Columnar mood logs must have columns of equal length")
+    n = lengths.pop() if lengths else 0
+    
+    def column(key: str) -> np.ndarray:
+        values = columns.get(key)
+        if values is None:
+            return np.full(n, np.nan)
+        return np.array(values, dtype=np.float64)
+    
+    logs = np.empty(n, dtype=MOOD_LOG_DTYPE)
+    for name, (camel, snake, _) in MOOD_COLUMNS.items():
+        primary = column(camel)
+        # 0 and missing camelCase values fall back, as in the dict layout
+        logs[name] = np.where(np.nan_to_num(primary) != 0, primary, column(snake))
+    
+    timestamps = columns.get(TIMESTAMP_KEYS[0]) or columns.get(TIMESTAMP_KEYS[1])
+    logs["timestamp"] = np.nan if timestamps is None else parse_timestamps(timestamps)
+    
+    return logs
+
+
+def parse_timestamps(values: List[Any]) -> np.ndarray:
+    """
+    Epoch seconds for a list of timestamps
+    
+    Naive or UTC ISO strings (the common case) are parsed in one vectorized
+    call; anything else falls back to per-value parsing.
+    """
+    present = [v for v in values if v is not None]
+    if not present:
+        return np.full(len(values), np.nan)
+    if all(isinstance(v, str) for v in present):
+        try:
+            with warnings.catch_warnings():
+                # Strings with a UTC offset are parsed individually below
+                warnings.simplefilter("error")
+                stamps = np.array(
+                    [v[:-1] if v and v.endswith("Z") else v or None for v in values],
+                    dtype="datetime64[us]",
+                )
+            return (stamps - np.datetime64(0, "us")) / np.timedelta64(1, "s")
+        except (ValueError, Warning):
+            pass
+    return np.array([_parse_timestamp(v) for v in values], dtype=np.float64)
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Epoch seconds from an ISO string or a number, NaN when missing"""
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return np.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -4,9 +4,21 @@ Mental health trend prediction and proactive wellness alerts
 """
 
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .mood_series import MOOD_COLUMNS, MoodLogs, daily_buckets, ingest_mood_logs, mood_series
+from .predictive_state import UserTrendState
+from .model_registry import ModelRegistry
+from ..metrics import metrics
+
+
+# Feature row of the trained burnout model (see ModelRegistry), one per user
+BURNOUT_FEATURES = [
+    "moodMean", "moodStd", "moodTrend", "anxietyMean", "anxietyTrend",
+    "sleepMean", "mhiMean", "mhiTrend", "flatAffect", "logCount",
+]
+
 
 class PredictiveAnalyzer:
     """
@@ -24,7 +36,22 @@ class PredictiveAnalyzer:
     - Rule-based insights for actionable recommendations
     """
     
-    def __init__(self):
+    # Bumped whenever prediction output changes for the same input
+    VERSION = "1.0.0"
+    
+    def __init__(
+        self,
+        window_days: Tuple[int, ...] = (7, 14, 30),
+        history_days: Optional[int] = None,
+        model_registry: Optional[ModelRegistry] = None
+    ):
+        # Fixed trend windows for timestamped logs, and how many days of logs are kept
+        self.window_days = tuple(sorted(window_days))
+        self.history_days = history_days or max(self.window_days)
+        
+        # Trained models replace the heuristic burnout score while one is active
+        self.model_registry = model_registry
+        
         # Alert thresholds
         self.decline_threshold = 0.20  # 20% decline triggers alert
         self.burnout_threshold = 0.7   # High burnout risk threshold
@@ -41,7 +68,7 @@ class PredictiveAnalyzer:
     
     def predict(
         self,
-        mood_logs: List[Dict[str, Any]],
+        mood_logs: MoodLogs,
         voice_biometrics: Optional[List[Dict[str, Any]]] = None,
         behavioral_data: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
@@ -49,39 +76,56 @@ class PredictiveAnalyzer:
         Generate predictions and insights from user data
         
         Args:
-            mood_logs: List of mood log entries
+            mood_logs: Mood log entries, columnar mood logs or an ingested array
             voice_biometrics: Optional list of voice analysis results
             behavioral_data: Optional list of behavioral data (sleep, activity)
-            
+        
         Returns:
             Dictionary containing predictions and insights
         """
-        # Extract time series data
-        mood_series = self._extract_mood_series(mood_logs)
-        mhi_series = self._extract_mhi_series(mood_logs)
-        anxiety_series = self._extract_anxiety_series(mood_logs)
-        sleep_series = self._extract_sleep_series(mood_logs)
-        
-        # Calculate burnout risk
-        burnout_risk = self._calculate_burnout_risk(
-            mood_series, anxiety_series, sleep_series, voice_biometrics
-        )
-        
-        # Predict anxiety trend
-        anxiety_prediction = self._predict_anxiety_trend(anxiety_series)
-        
-        # Predict mood trend
-        mood_prediction = self._predict_mood_trend(mood_series, mhi_series)
-        
-        # Generate proactive insights
-        proactive_insights = self._generate_proactive_insights(
-            mhi_series, mood_series, anxiety_series, sleep_series, burnout_risk
-        )
-        
-        # Calculate confidence based on data availability
-        confidence = self._calculate_confidence(
-            len(mood_logs), voice_biometrics, behavioral_data
-        )
+        with metrics.stage("predictive", "ingest"):
+            # Extract time series data in a single pass over the logs
+            logs = ingest_mood_logs(mood_logs)
+            mood_series = self._extract_series(logs, "mood")
+            mhi_series = self._extract_series(logs, "mhi")
+            anxiety_series = self._extract_series(logs, "anxiety")
+            sleep_series = self._extract_series(logs, "sleep")
+        
+        with metrics.stage("predictive", "trend"):
+            # Calculate burnout risk
+            burnout_risk = self._calculate_burnout_risk(
+                mood_series, anxiety_series, sleep_series, voice_biometrics
+            )
+            if self.model_registry is not None and self.model_registry.has_active("burnout"):
+                flat_affect = [
+                    v.get("flatAffectScore", 0) or v.get("flat_affect_score", 0)
+                    for v in voice_biometrics or []
+                ]
+                burnout_risk = float(self._apply_burnout_model(
+                    np.array([burnout_risk]),
+                    self._series_stats([mood_series]),
+                    self._series_stats([mhi_series]),
+                    self._series_stats([anxiety_series]),
+                    self._series_stats([sleep_series]),
+                    np.array([np.mean(flat_affect) if flat_affect else 0.0]),
+                    np.array([len(logs)]),
+                )[0])
+            
+            # Predict anxiety trend
+            anxiety_prediction = self._predict_anxiety_trend(anxiety_series)
+            
+            # Predict mood trend
+            mood_prediction = self._predict_mood_trend(mood_series, mhi_series)
+            
+            # Generate proactive insights
+            proactive_insights = self._generate_proactive_insights(
+                mhi_series, mood_series, anxiety_series, sleep_series, burnout_risk
+            )
+            
+            # Calculate confidence based on data availability
+            confidence = self._calculate_confidence(
+                len(logs), voice_biometrics, behavioral_data
+            )
         
         return {
             "burnoutRiskScore": round(burnout_risk, 2),
@@ -91,41 +135,363 @@ class PredictiveAnalyzer:
             "confidence": round(confidence, 4),
         }
     
-    def _extract_mood_series(self, mood_logs: List[Dict[str, Any]]) -> np.ndarray:
-        """Extract mood scores as time series"""
-        scores = []
-        for log in mood_logs:
-            score = log.get("moodScore") or log.get("mood_score")
-            if score is not None:
-                scores.append(float(score))
-        return np.array(scores) if scores else np.array([5.0])
+    def predict_batch(self, users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Generate predictions for many users at once
+        
+        Each series is grouped by length and stacked into dense matrices, so
+        trends, means and spreads are row-wise array reductions with the same
+        summation order as predict(). Burnout risk, forecasts and confidence
+        are then computed for all users with element-wise array operations.
+        Results match predict() per user.
+        
+        Args:
+            users: List of dictionaries with mood_logs and optional
+                voice_biometrics / behavioral_data
+        
+        Returns:
+            List of prediction dictionaries in the same order
+        """
+        if not users:
+            return []
+        
+        with metrics.stage("predictive", "ingest"):
+            logs = [ingest_mood_logs(u["mood_logs"]) for u in users]
+        
+        with metrics.stage("predictive", "series_stats"):
+            mood = self._series_stats([self._extract_series(user_logs, "mood") for user_logs in logs])
+            mhi = self._series_stats([self._extract_series(user_logs, "mhi") for user_logs in logs])
+            anxiety = self._series_stats([self._extract_series(user_logs, "anxiety") for user_logs in logs])
+            sleep = self._series_stats([self._extract_series(user_logs, "sleep") for user_logs in logs])
+        
+        voice_lists = [u.get("voice_biometrics") or [] for u in users]
+        has_voice = np.array([len(v) > 0 for v in voice_lists])
+        flat_affect = self._series_stats([
+            np.array([
+                v.get("flatAffectScore", 0) or v.get("flat_affect_score", 0)
+                for v in voices
+            ] or [0.0], dtype=np.float64)
+            for voices in voice_lists
+        ])
+        has_behavioral = np.array([len(u.get("behavioral_data") or []) > 0 for u in users])
+        log_counts = np.array([len(user_logs) for user_logs in logs])
+        
+        with metrics.stage("predictive", "trend"):
+            return self._predict_from_stats(
+                mood, mhi, anxiety, sleep, flat_affect["mean"], has_voice, has_behavioral, log_counts
+            )
+    
+    def predict_from_state(self, state: UserTrendState) -> Dict[str, Any]:
+        """
+        Generate a prediction from a user's running statistics
+        
+        The state already holds every sum the prediction needs, so the cost
+        does not grow with the length of the user's history. Results match
+        predict() on the full history up to floating-point rounding.
+        
+        Args:
+            state: UserTrendState updated with the user's logs in order
+        
+        Returns:
+            Dictionary containing predictions and insights
+        """
+        def as_arrays(stats: Dict[str, float]) -> Dict[str, np.ndarray]:
+            return {name: np.array([value]) for name, value in stats.items()}
+        
+        series = {name: as_arrays(s.stats()) for name, s in state.series.items()}
+        flat_affect = state.flat_affect_sum / state.voice_count if state.voice_count else 0.0
+        
+        with metrics.stage("predictive", "trend"):
+            return self._predict_from_stats(
+                series["mood"],
+                series["mhi"],
+                series["anxiety"],
+                series["sleep"],
+                np.array([flat_affect]),
+                np.array([state.voice_count > 0]),
+                np.array([state.has_behavioral]),
+                np.array([state.log_count]),
+            )[0]
+    
+    def predict_windowed(
+        self,
+        mood_logs: MoodLogs,
+        voice_biometrics: Optional[List[Dict[str, Any]]] = None,
+        behavioral_data: Optional[List[Dict[str, Any]]] = None,
+        window_days: int = 14,
+        end: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate predictions from daily aggregates over a fixed time window
+        
+        Logs are bucketed into days by their timestamp, so several logs on one
+        day count once and gaps between days are respected by the trends
+        (units per day). Only the last history_days days are aggregated,
+        which bounds the work by the window rather than the lifetime log
+        count. Trends for every configured window are reported alongside.
+        Logs without any timestamps fall back to predict().
+        
+        Args:
+            mood_logs: Mood log entries, columnar mood logs or an ingested array
+            voice_biometrics: Optional list of voice analysis results
+            behavioral_data: Optional list of behavioral data (sleep, activity)
+            window_days: Trend window in days, one of self.window_days
+            end: Optional end of the window in epoch seconds (default: latest log)
+        
+        Returns:
+            Dictionary containing predictions, insights and per-window trends
+        """
+        if window_days not in self.window_days:
+            raise ValueError(
+                f"Unsupported window of {window_days} days. Allowed: {', '.join(map(str, self.window_days))}"
+            )
+        
+        logs = ingest_mood_logs(mood_logs)
+        if np.isnan(logs["timestamp"]).all():
+            return self.predict(logs, voice_biometrics, behavioral_data)
+        
+        buckets = daily_buckets(logs, self.history_days, end)
+        in_window = buckets["day"] > -window_days
+        stats = {
+            name: self._window_stats(buckets["day"][in_window], buckets[name][in_window], default)
+            for name, (_, _, default) in MOOD_COLUMNS.items()
+        }
+        
+        flat_affect_scores = [
+            v.get("flatAffectScore", 0) or v.get("flat_affect_score", 0)
+            for v in voice_biometrics or []
+        ]
+        
+        result = self._predict_from_stats(
+            stats["mood"],
+            stats["mhi"],
+            stats["anxiety"],
+            stats["sleep"],
+            np.array([np.mean(flat_affect_scores) if flat_affect_scores else 0.0]),
+            np.array([len(flat_affect_scores) > 0]),
+            np.array([bool(behavioral_data)]),
+            np.array([int(buckets["count"][in_window].sum())]),
+        )[0]
+        
+        result["windowDays"] = window_days
+        result["windowTrends"] = {
+            str(days): self._window_trends(buckets, days) for days in self.window_days
+        }
+        return result
+    
+    def _window_stats(self, days: np.ndarray, values: np.ndarray, default: float) -> Dict[str, np.ndarray]:
+        """
+        Statistics of one metric's daily means, in the layout of _series_stats
+        
+        The trend is the least-squares slope against the day offsets, so
+        days without logs do not compress the time axis.
+        """
+        present = ~np.isnan(values)
+        x = days[present].astype(np.float64)
+        y = values[present]
+        if len(y) == 0:
+            x, y = np.zeros(1), np.array([default])
+        n = len(y)
+        
+        denominator = n * np.sum(x * x) - np.sum(x) ** 2
+        trend = (n * np.sum(x * y) - np.sum(x) * np.sum(y)) / denominator if denominator else 0.0
+        
+        recent = older = 0.0
+        if n >= 3:
+            recent = np.sum(y[-3:]) / 3
+            older = np.sum(y[:-3]) / (n - 3) if n > 3 else y[0]
+        
+        stats = {
+            "length": n, "mean": np.mean(y), "std": np.std(y), "trend": trend,
+            "first": y[0], "last": y[-1], "recent": recent, "older": older,
+        }
+        return {name: np.array([value]) for name, value in stats.items()}
+    
+    def _window_trends(self, buckets: Dict[str, np.ndarray], window_days: int) -> Dict[str, Any]:
+        """Per-day trend of every metric over one window (None below two days of data)"""
+        in_window = buckets["day"] > -window_days
+        trends: Dict[str, Any] = {"days": int(np.count_nonzero(buckets["count"][in_window]))}
+        for name, (_, _, default) in MOOD_COLUMNS.items():
+            stats = self._window_stats(buckets["day"][in_window], buckets[name][in_window], default)
+            trends[name] = round(float(stats["trend"][0]), 4) if stats["length"][0] >= 2 else None
+        return trends
+    
+    def _predict_from_stats(
+        self,
+        mood: Dict[str, np.ndarray],
+        mhi: Dict[str, np.ndarray],
+        anxiety: Dict[str, np.ndarray],
+        sleep: Dict[str, np.ndarray],
+        flat_affect: np.ndarray,
+        has_voice: np.ndarray,
+        has_behavioral: np.ndarray,
+        log_counts: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """
+        Assemble predictions from per-series statistics (see _series_stats)
+        
+        Every argument holds one entry per user
+        """
+        # Burnout risk (same factor order as _calculate_burnout_risk)
+        risk = (10 - mood["mean"]) / 10 * 3
+        risk = risk + anxiety["mean"] / 10 * 3
+        risk = risk + (10 - sleep["mean"]) / 10 * 2
+        declining = (mood["length"] >= 3) & (mood["trend"] < 0)
+        risk = np.where(declining, risk + np.abs(mood["trend"]) * 2, risk)
+        risk = np.where(has_voice, risk + flat_affect * 2, risk)
+        burnout = np.minimum(10, np.maximum(0, risk))
+        burnout = self._apply_burnout_model(burnout, mood, mhi, anxiety, sleep, flat_affect, log_counts)
+        
+        # 7-day forecasts
+        steps = np.arange(1, 8)
+        anxiety_forecast = np.clip(anxiety["last"][:, None] + anxiety["trend"][:, None] * steps, 0, 10)
+        mood_forecast = np.clip(mood["last"][:, None] + mood["trend"][:, None] * steps, 1, 10)
+        mhi_forecast = np.clip(mhi["last"][:, None] + mhi["trend"][:, None] * steps, 0, 100)
+        
+        # Confidence
+        anxiety_confidence = self._batch_prediction_confidence(anxiety)
+        mood_confidence = self._batch_prediction_confidence(mood)
+        confidence = np.minimum(0.7, log_counts / 14)
+        confidence = np.where(has_voice, confidence + 0.1, confidence)
+        confidence = np.where(has_behavioral, confidence + 0.1, confidence)
+        confidence = np.minimum(0.95, confidence)
+        
+        # Each forecast row is converted to Python floats in one call instead of
+        # per element; converting whole matrices up front would hold three
+        # extra copies of every row for the whole batch
+        results = []
+        for i in range(len(log_counts)):
+            if anxiety["length"][i] < 2:
+                anxiety_prediction = {
+                    "trend": "stable",
+                    "predictedValues": [float(anxiety["first"][i])] * 7,
+                    "confidence": 0.3,
+                }
+            else:
+                anxiety_prediction = {
+                    "trend": self._anxiety_trend_label(float(anxiety["trend"][i])),
+                    "predictedValues": [round(v, 2) for v in anxiety_forecast[i].tolist()],
+                    "confidence": round(anxiety_confidence[i], 4),
+                }
+            
+            if mood["length"][i] < 2:
+                mood_prediction = {
+                    "trend": "stable",
+                    "predictedMood": [float(mood["first"][i])] * 7,
+                    "predictedMHI": [float(mhi["first"][i])] * 7,
+                    "confidence": 0.3,
+                }
+            else:
+                mood_prediction = {
+                    "trend": self._mood_trend_label(float(mood["trend"][i]), float(mhi["trend"][i])),
+                    "predictedMood": [round(v, 2) for v in mood_forecast[i].tolist()],
+                    "predictedMHI": [round(v, 2) for v in mhi_forecast[i].tolist()],
+                    "confidence": round(mood_confidence[i], 4),
+                }
+            
+            proactive_insights = self._build_proactive_insights(
+                mhi_recent=mhi["recent"][i] if mhi["length"][i] >= 3 else None,
+                mhi_older=mhi["older"][i],
+                anxiety_recent=anxiety["recent"][i] if anxiety["length"][i] >= 3 else None,
+                sleep_recent=sleep["recent"][i] if sleep["length"][i] >= 3 else None,
+                mood_trend=float(mood["trend"][i]) if mood["length"][i] >= 5 else None,
+                burnout_risk=burnout[i],
+            )
+            
+            results.append({
+                "burnoutRiskScore": round(burnout[i], 2),
+                "anxietyTrendPrediction": anxiety_prediction,
+                "moodTrendPrediction": mood_prediction,
+                "proactiveInsights": proactive_insights,
+                "confidence": round(confidence[i], 4),
+            })
+        
+        return results
+    
+    def model_version(self) -> str:
+        """Version of the prediction logic, including any active trained model"""
+        if self.model_registry is None:
+            return self.VERSION
+        active = self.model_registry.active_version("burnout")
+        return f"{self.VERSION}+burnout-{active}" if active else self.VERSION
     
-    def _extract_mhi_series(self, mood_logs: List[Dict[str, Any]]) -> np.ndarray:
-        """Extract Mental Health Index as time series"""
-        scores = []
-        for log in mood_logs:
-            score = log.get("mentalHealthIndex") or log.get("mental_health_index")
-            if score is not None:
-                scores.append(float(score))
-        return np.array(scores) if scores else np.array([50.0])
+    def _apply_burnout_model(
+        self,
+        burnout: np.ndarray,
+        mood: Dict[str, np.ndarray],
+        mhi: Dict[str, np.ndarray],
+        anxiety: Dict[str, np.ndarray],
+        sleep: Dict[str, np.ndarray],
+        flat_affect: np.ndarray,
+        log_counts: np.ndarray
+    ) -> np.ndarray:
+        """Burnout scores from the active trained model, or the heuristic scores unchanged"""
+        if self.model_registry is None:
+            return burnout
+        
+        features = np.column_stack([
+            mood["mean"], mood["std"], mood["trend"], anxiety["mean"], anxiety["trend"],
+            sleep["mean"], mhi["mean"], mhi["trend"], flat_affect, log_counts,
+        ]).astype(np.float64)
+        scored = self.model_registry.predict("burnout", features)
+        if scored is None:
+            return burnout
+        return np.clip(scored, 0, 10)
     
-    def _extract_anxiety_series(self, mood_logs: List[Dict[str, Any]]) -> np.ndarray:
-        """Extract anxiety levels as time series"""
-        scores = []
-        for log in mood_logs:
-            score = log.get("anxietyLevel") or log.get("anxiety_level")
-            if score is not None:
-                scores.append(float(score))
-        return np.array(scores) if scores else np.array([5.0])
+    def _series_stats(self, series_list: List[np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Per-series statistics for many series at once
+        
+        Series of equal length are stacked into a dense matrix and reduced
+        row-wise. Zero padding to a common length would change numpy's
+        summation order and with it the last bits of every sum.
+        """
+        lengths = np.array([len(series) for series in series_list])
+        stats = {
+            name: np.zeros(len(series_list))
+            for name in ("mean", "std", "trend", "first", "last", "recent", "older")
+        }
+        stats["length"] = lengths
+        
+        for n in np.unique(lengths).tolist():
+            rows = np.flatnonzero(lengths == n)
+            matrix = np.stack([series_list[i] for i in rows])
+            
+            mean = matrix.sum(axis=1) / n
+            stats["mean"][rows] = mean
+            stats["std"][rows] = np.sqrt(((matrix - mean[:, None]) ** 2).sum(axis=1) / n)
+            stats["first"][rows] = matrix[:, 0]
+            stats["last"][rows] = matrix[:, -1]
+            
+            # Linear regression slope, as in _calculate_trend
+            sum_x = n * (n - 1) // 2
+            sum_x2 = (n - 1) * n * (2 * n - 1) // 6
+            denominator = n * sum_x2 - sum_x ** 2
+            if denominator != 0:
+                sum_y = matrix.sum(axis=1)
+                sum_xy = (np.arange(n) * matrix).sum(axis=1)
+                stats["trend"][rows] = (n * sum_xy - sum_x * sum_y) / float(denominator)
+            
+            # Windows used by the proactive insights
+            if n >= 3:
+                stats["recent"][rows] = matrix[:, -3:].sum(axis=1) / 3
+                stats["older"][rows] = matrix[:, :-3].sum(axis=1) / (n - 3) if n > 3 else matrix[:, 0]
+        
+        return stats
     
-    def _extract_sleep_series(self, mood_logs: List[Dict[str, Any]]) -> np.ndarray:
-        """Extract sleep quality as time series"""
-        scores = []
-        for log in mood_logs:
-            score = log.get("sleepQuality") or log.get("sleep_quality")
-            if score is not None:
-                scores.append(float(score))
-        return np.array(scores) if scores else np.array([5.0])
+    def _batch_prediction_confidence(self, stats: Dict[str, np.ndarray]) -> np.ndarray:
+        """Prediction confidence for many series (see _calculate_prediction_confidence)"""
+        lengths, mean, std = stats["length"], stats["mean"], stats["std"]
+        data_factor = np.minimum(1.0, lengths / 14)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance_factor = np.where(mean > 0, np.maximum(0.3, 1 - std / mean), 0.5)
+        
+        confidence = np.minimum(0.95, np.maximum(0.3, data_factor * 0.6 + variance_factor * 0.4))
+        return np.where(lengths < 3, 0.3, confidence)
+    
+    def _extract_series(self, logs: np.ndarray, column: str) -> np.ndarray:
+        """Extract one metric (mood, mhi, anxiety, sleep) from ingested logs as time series"""
+        return mood_series(logs, column)
     
     def _calculate_burnout_risk(
         self,
@@ -193,12 +559,7 @@ class PredictiveAnalyzer:
         trend = self._calculate_trend(anxiety_series)
         
         # Determine trend direction
-        if trend > 0.5:
-            trend_label = "increasing"
-        elif trend < -0.5:
-            trend_label = "decreasing"
-        else:
-            trend_label = "stable"
+        trend_label = self._anxiety_trend_label(trend)
         
         # Simple linear prediction
         last_value = anxiety_series[-1]
@@ -236,13 +597,7 @@ class PredictiveAnalyzer:
         mhi_trend = self._calculate_trend(mhi_series)
         
         # Determine overall trend
-        avg_trend = (mood_trend + mhi_trend / 10) / 2
-        if avg_trend > 0.3:
-            trend_label = "improving"
-        elif avg_trend < -0.3:
-            trend_label = "declining"
-        else:
-            trend_label = "stable"
+        trend_label = self._mood_trend_label(mood_trend, mhi_trend)
         
         # Predict mood values
         last_mood = mood_series[-1]
@@ -269,6 +624,23 @@ class PredictiveAnalyzer:
             "confidence": round(confidence, 4),
         }
     
+    def _anxiety_trend_label(self, trend: float) -> str:
+        """Label the direction of an anxiety trend"""
+        if trend > 0.5:
+            return "increasing"
+        elif trend < -0.5:
+            return "decreasing"
+        return "stable"
+    
+    def _mood_trend_label(self, mood_trend: float, mhi_trend: float) -> str:
+        """Label the combined direction of mood and MHI trends"""
+        avg_trend = (mood_trend + mhi_trend / 10) / 2
+        if avg_trend > 0.3:
+            return "improving"
+        elif avg_trend < -0.3:
+            return "declining"
+        return "stable"
+    
     def _generate_proactive_insights(
         self,
         mhi_series: np.ndarray,
@@ -278,24 +650,48 @@ class PredictiveAnalyzer:
         burnout_risk: float
     ) -> List[Dict[str, Any]]:
         """Generate proactive wellness insights"""
+        mhi_recent = mhi_older = None
+        if len(mhi_series) >= 3:
+            mhi_recent = np.mean(mhi_series[-3:])
+            mhi_older = np.mean(mhi_series[:-3]) if len(mhi_series) > 3 else mhi_series[0]
+        
+        return self._build_proactive_insights(
+            mhi_recent=mhi_recent,
+            mhi_older=mhi_older,
+            anxiety_recent=np.mean(anxiety_series[-3:]) if len(anxiety_series) >= 3 else None,
+            sleep_recent=np.mean(sleep_series[-3:]) if len(sleep_series) >= 3 else None,
+            mood_trend=self._calculate_trend(mood_series) if len(mood_series) >= 5 else None,
+            burnout_risk=burnout_risk,
+        )
+    
+    def _build_proactive_insights(
+        self,
+        mhi_recent: Optional[float],
+        mhi_older: Optional[float],
+        anxiety_recent: Optional[float],
+        sleep_recent: Optional[float],
+        mood_trend: Optional[float],
+        burnout_risk: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Build proactive wellness insights from windowed aggregates
+        
+        Aggregates are None when there is not enough history for them
+        """
         insights = []
         
         # Check for 20% MHI decline
-        if len(mhi_series) >= 3:
-            recent_avg = np.mean(mhi_series[-3:])
-            older_avg = np.mean(mhi_series[:-3]) if len(mhi_series) > 3 else mhi_series[0]
+        if mhi_recent is not None and mhi_older > 0:
+            decline = (mhi_older - mhi_recent) / mhi_older
             
-            if older_avg > 0:
-                decline = (older_avg - recent_avg) / older_avg
-                
-                if decline >= self.decline_threshold:
-                    insights.append({
-                        "type": "mhi_decline",
-                        "severity": "high",
-                        "message": f"Your Mental Health Index has declined by {round(decline * 100)}% over the past few days. Consider reaching out to a mental health professional.",
-                        "recommendation": "Schedule a check-in with your therapist or counselor.",
-                        "triggerValue": round(decline * 100, 1),
-                    })
+            if decline >= self.decline_threshold:
+                insights.append({
+                    "type": "mhi_decline",
+                    "severity": "high",
+                    "message": f"Your Mental Health Index has declined by {round(decline * 100)}% over the past few days. Consider reaching out to a mental health professional.",
+                    "recommendation": "Schedule a check-in with your therapist or counselor.",
+                    "triggerValue": round(decline * 100, 1),
+                })
         
         # High burnout risk alert
         if burnout_risk >= 7:
@@ -316,40 +712,34 @@ class PredictiveAnalyzer:
             })
         
         # Anxiety trend alert
-        if len(anxiety_series) >= 3:
-            recent_anxiety = np.mean(anxiety_series[-3:])
-            if recent_anxiety >= self.anxiety_threshold:
-                insights.append({
-                    "type": "anxiety_elevated",
-                    "severity": "high" if recent_anxiety >= 8 else "medium",
-                    "message": f"Your anxiety levels have been elevated (avg: {round(recent_anxiety, 1)}/10).",
-                    "recommendation": "Try breathing exercises, meditation, or speak with a professional.",
-                    "triggerValue": round(recent_anxiety, 1),
-                })
+        if anxiety_recent is not None and anxiety_recent >= self.anxiety_threshold:
+            insights.append({
+                "type": "anxiety_elevated",
+                "severity": "high" if anxiety_recent >= 8 else "medium",
+                "message": f"Your anxiety levels have been elevated (avg: {round(anxiety_recent, 1)}/10).",
+                "recommendation": "Try breathing exercises, meditation, or speak with a professional.",
+                "triggerValue": round(anxiety_recent, 1),
+            })
         
         # Sleep quality alert
-        if len(sleep_series) >= 3:
-            recent_sleep = np.mean(sleep_series[-3:])
-            if recent_sleep < 5:
-                insights.append({
-                    "type": "sleep_quality",
-                    "severity": "medium",
-                    "message": f"Your sleep quality has been below average (avg: {round(recent_sleep, 1)}/10).",
-                    "recommendation": "Establish a consistent sleep schedule and limit screen time before bed.",
-                    "triggerValue": round(recent_sleep, 1),
-                })
+        if sleep_recent is not None and sleep_recent < 5:
+            insights.append({
+                "type": "sleep_quality",
+                "severity": "medium",
+                "message": f"Your sleep quality has been below average (avg: {round(sleep_recent, 1)}/10).",
+                "recommendation": "Establish a consistent sleep schedule and limit screen time before bed.",
+                "triggerValue": round(sleep_recent, 1),
+            })
         
         # Positive trend recognition
-        if len(mood_series) >= 5:
-            trend = self._calculate_trend(mood_series)
-            if trend > 0.5:
-                insights.append({
-                    "type": "positive_trend",
-                    "severity": "low",
-                    "message": "Great progress! Your mood has been improving consistently.",
-                    "recommendation": "Keep up the positive habits that are working for you.",
-                    "triggerValue": round(trend, 2),
-                })
+        if mood_trend is not None and mood_trend > 0.5:
+            insights.append({
+                "type": "positive_trend",
+                "severity": "low",
+                "message": "Great progress! Your mood has been improving consistently.",
+                "recommendation": "Keep up the positive habits that are working for you.",
+                "triggerValue": round(mood_trend, 2),
+            })
         
         return insights
     
@@ -360,18 +750,19 @@ class PredictiveAnalyzer:
         
         x = np.arange(len(series))
         
-        # Simple linear regression
+        # Simple linear regression (index sums in Python ints so long
+        # histories cannot overflow)
         n = len(series)
-        sum_x = np.sum(x)
+        sum_x = n * (n - 1) // 2
         sum_y = np.sum(series)
         sum_xy = np.sum(x * series)
-        sum_x2 = np.sum(x ** 2)
+        sum_x2 = (n - 1) * n * (2 * n - 1) // 6
         
         denominator = n * sum_x2 - sum_x ** 2
         if denominator == 0:
             return 0.0
         
-        slope = (n * sum_xy - sum_x * sum_y) / denominator
+        slope = (n * sum_xy - sum_x * sum_y) / float(denominator)
         
         return float(slope)
     
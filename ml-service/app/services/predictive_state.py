@@ -0,0 +1,170 @@
+"""
+Predictive State Service
+Per-user sufficient statistics for incremental trend prediction
+"""
+
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
+
+from .mood_series import MOOD_COLUMNS, MoodLogs, ingest_mood_logs
+
+
+class SeriesState:
+    """
+    Running statistics of one metric series
+    
+    Holds exactly what PredictiveAnalyzer needs from a series: regression
+    sums for the trend, Welford mean/M2 for the spread, the first and last
+    values, the last three values and the sum of everything before them.
+    Every update is O(1).
+    """
+    
+    def __init__(self, default: float):
+        self.default = default
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.first = None
+        self.last = None
+        self.tail = deque(maxlen=3)
+        self.head_sum = 0.0
+    
+    def push(self, value: float) -> None:
+        """Append one observation"""
+        if len(self.tail) == self.tail.maxlen:
+            self.head_sum += self.tail[0]
+        self.tail.append(value)
+        
+        self.sum_y += value
+        self.sum_xy += self.n * value
+        self.n += 1
+        
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        
+        if self.first is None:
+            self.first = value
+        self.last = value
+    
+    def stats(self) -> Dict[str, float]:
+        """Statistics in the layout of PredictiveAnalyzer._series_stats"""
+        if self.n == 0:
+            # Empty series are treated as a single default value
+            default = self.default
+            return {
+                "length": 1, "mean": default, "std": 0.0, "trend": 0.0,
+                "first": default, "last": default, "recent": 0.0, "older": 0.0,
+            }
+        
+        n = self.n
+        sum_x = n * (n - 1) // 2
+        sum_x2 = (n - 1) * n * (2 * n - 1) // 6
+        denominator = n * sum_x2 - sum_x ** 2
+        trend = (n * self.sum_xy - sum_x * self.sum_y) / float(denominator) if denominator else 0.0
+        
+        recent = older = 0.0
+        if n >= 3:
+            recent = sum(self.tail) / 3
+            older = self.head_sum / (n - 3) if n > 3 else self.first
+        
+        return {
+            "length": n,
+            "mean": self.sum_y / n,
+            "std": float(np.sqrt(self.m2 / n)),
+            "trend": trend,
+            "first": self.first,
+            "last": self.last,
+            "recent": recent,
+            "older": older,
+        }
+
+
+class UserTrendState:
+    """Sufficient statistics of one user's prediction inputs"""
+    
+    def __init__(self):
+        self.series = {
+            name: SeriesState(default) for name, (_, _, default) in MOOD_COLUMNS.items()
+        }
+        self.log_count = 0
+        self.voice_count = 0
+        self.flat_affect_sum = 0.0
+        self.has_behavioral = False
+    
+    def update(
+        self,
+        mood_logs: Optional[MoodLogs] = None,
+        voice_biometrics: Optional[List[Dict[str, Any]]] = None,
+        behavioral_data: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Fold new entries into the state, in chronological order
+        
+        Args:
+            mood_logs: Mood log entries recorded since the last update
+            voice_biometrics: Voice analysis results since the last update
+            behavioral_data: Behavioral data since the last update
+        """
+        if mood_logs is not None:
+            logs = ingest_mood_logs(mood_logs)
+            self.log_count += len(logs)
+            for name, series in self.series.items():
+                for value in logs[name].tolist():
+                    if value == value:  # skip NaN (missing)
+                        series.push(value)
+        
+        for v in voice_biometrics or []:
+            self.voice_count += 1
+            self.flat_affect_sum += v.get("flatAffectScore", 0) or v.get("flat_affect_score", 0)
+        
+        if behavioral_data:
+            self.has_behavioral = True
+
+
+class TrendStateStore:
+    """
+    In-memory per-user trend states with LRU eviction
+    
+    State is only created by a reset. An unknown, evicted or restarted user
+    (or one whose state lives in another worker) has none, and the caller
+    must resend the full history once with reset.
+    """
+    
+    def __init__(self, max_users: int = 100000):
+        self.max_users = max_users
+        self._states: "OrderedDict[str, UserTrendState]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id: str, reset: bool = False) -> Optional[UserTrendState]:
+        """
+        Fetch the state of a user, or start a new one with reset
+        
+        Args:
+            user_id: User identifier
+            reset: Discard any existing state and start an empty one
+        
+        Returns:
+            The user's state, None without reset when the user has none
+        """
+        with self._lock:
+            if reset:
+                state = UserTrendState()
+                self._states[user_id] = state
+            else:
+                state = self._states.get(user_id)
+                if state is None:
+                    return None
+            self._states.move_to_end(user_id)
+            
+            while len(self._states) > self.max_users:
+                self._states.popitem(last=False)
+            
+            return state
+    
+    def __len__(self) -> int:
+        return len(self._states)
@@ -0,0 +1,260 @@
+"""
+Result Cache Service
+Content-addressed and per-user caches for analysis results
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def fingerprint(content: bytes, *parts: Any) -> str:
+    """
+    Build a cache key from raw content plus the settings that shape the result
+    
+    Args:
+        content: Raw input bytes (e.g. an uploaded recording)
+        parts: JSON-serializable values such as analyzer version and settings
+    
+    Returns:
+        Hex digest identifying the content/settings combination
+    """
+    digest = hashlib.sha256(content)
+    digest.update(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of analysis results
+    
+    Entries live in memory and, when a directory is given, in an on-disk
+    store that several worker processes can share. Disk entries are written
+    atomically so a reader never sees a partial file.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 256,
+        disk_dir: Optional[str] = None,
+        max_disk_entries: int = 4096,
+    ):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+        
+        Args:
+            key: Cache key from fingerprint()
+        
+        Returns:
+            Cached result, or None on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        
+        value = self._read_disk(key)
+        
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+    
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store a result in memory and, if configured, on disk
+        
+        Args:
+            key: Cache key from fingerprint()
+            value: JSON-serializable result
+        """
+        with self._lock:
+            self._store(key, value)
+        self._write_disk(key, value)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and size metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "diskStore": self.disk_dir,
+            }
+    
+    def _store(self, key: str, value: Dict[str, Any]) -> None:
+        """Insert into the in-memory LRU (caller holds the lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an entry from the shared disk store"""
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_disk(self, key: str, value: Dict[str, Any]) -> None:
+        """Atomically write an entry to the shared disk store"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Result cache write error: {e}")
+            return
+        
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 64 == 0
+        if prune:
+            self._prune_disk()
+    
+    def _prune_disk(self) -> None:
+        """Drop the least recently written disk entries beyond the size bound"""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+        
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+        
+        files.sort()
+        for _, path in files[:excess]:
+            try:
+                os.remove(path)
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                continue
+
+
+class LatestResultCache:
+    """
+    Latest result per subject (e.g. user), valid while its inputs are unchanged
+    
+    Each subject holds one entry tagged with a fingerprint of the inputs it
+    was computed from. A lookup with a different fingerprint invalidates the
+    entry, so new data is picked up without explicit purges. Subjects are
+    evicted least recently used first.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # subject -> (fingerprint, result)
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+    
+    def get(self, subject: str, input_fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the subject's result for these inputs
+        
+        Args:
+            subject: Key such as a user ID
+            input_fingerprint: fingerprint() of the inputs
+        
+        Returns:
+            Cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            if entry[0] != input_fingerprint:
+                del self._entries[subject]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, subject: str, input_fingerprint: str, value: Dict[str, Any]) -> None:
+        """
+        Store the subject's latest result, replacing any older one
+        
+        Args:
+            subject: Key such as a user ID
+            input_fingerprint: fingerprint() of the inputs
+            value: Result computed from those inputs
+        """
+        with self._lock:
+            self._entries[subject] = (input_fingerprint, value)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and size metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -4,16 +4,18 @@ Text-based sentiment and emotion detection for mental health assessment
 """
 
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import numpy as np
 
-# Try to import transformers, fall back to rule-based if not available
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+from ..deadline import ServiceTimeEstimate, fits
+from ..lazy import module_available
+from ..metrics import metrics
+from ..readiness import LoadState
+from .model_snapshots import ModelSnapshotStore
+
+# transformers/torch are imported only when models are loaded; fall back to rule-based if not available
+TRANSFORMERS_AVAILABLE = module_available("transformers") and module_available("torch")
+if not TRANSFORMERS_AVAILABLE:
     print("Warning: transformers not available, using rule-based sentiment analysis")
 
 
@@ -30,30 +32,29 @@ class SentimentAnalyzer:
     - Mental health insights
     """
     
-    def __init__(self):
+    SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+    EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+    
+    def __init__(self, load_models: bool = True, snapshot_dir: Optional[str] = None):
         self.sentiment_model = None
         self.emotion_model = None
         
-        if TRANSFORMERS_AVAILABLE:
-            try:
-                # Load sentiment analysis model
-                self.sentiment_model = pipeline(
-                    "sentiment-analysis",
-                    model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                    device=-1  # CPU
-                )
-                
-                # Load emotion detection model
-                self.emotion_model = pipeline(
-                    "text-classification",
-                    model="j-hartmann/emotion-english-distilroberta-base",
-                    top_k=None,
-                    device=-1
-                )
-            except Exception as e:
-                print(f"Error loading models: {e}")
-                self.sentiment_model = None
-                self.emotion_model = None
+        # With a snapshot store, models load offline from memory-mapped local copies
+        self.snapshots = ModelSnapshotStore(snapshot_dir) if snapshot_dir else None
+        
+        # Inference time per model, to skip models that cannot meet a deadline
+        self.model_time = {"sentiment": ServiceTimeEstimate(), "emotion": ServiceTimeEstimate()}
+        
+        # Load state per model; the rule-based analysis serves until a model is ready
+        self.model_states = {
+            "sentiment": LoadState("sentiment", self.SENTIMENT_MODEL, "transformers", "rules", TRANSFORMERS_AVAILABLE),
+            "emotion": LoadState("emotion", self.EMOTION_MODEL, "transformers", "rules", TRANSFORMERS_AVAILABLE),
+        }
+        
+        # Without models (offline benchmarks) the rule-based analysis is used;
+        # the service passes False and calls load() in the background
+        if load_models:
+            self.load()
         
         # Emotion keywords for rule-based fallback
         self.emotion_keywords = {
@@ -86,13 +87,67 @@ class SentimentAnalyzer:
             "self-harm", "cutting", "hurt myself", "no reason to live"
         ]
     
-    def analyze(self, text: str) -> Dict[str, Any]:
+    def load(self) -> None:
+        """
+        Load the transformer models (blocking)
+        
+        Safe to call from a background thread while requests are served: each
+        model is swapped in once fully loaded, and until then (or if loading
+        fails) the rule-based analysis answers and results are marked degraded.
+        Models already loaded or loading are skipped. With a snapshot store
+        the models are only loaded from it; a model missing there fails
+        instead of being downloaded.
+        """
+        states = [state for state in self.model_states.values() if state.start()]
+        if not states:
+            return
+        
+        try:
+            from transformers import pipeline
+        except Exception as e:
+            for state in states:
+                state.fail(str(e))
+            print(f"Error loading models: {e}")
+            return
+        
+        state = self.model_states["sentiment"]
+        if state in states:
+            with state.loading():
+                self.sentiment_model = self._pipeline(pipeline, state, "sentiment-analysis")
+            if state.ready:
+                metrics.record_model_load("sentiment", self.SENTIMENT_MODEL, state.seconds)
+        
+        state = self.model_states["emotion"]
+        if state in states:
+            with state.loading():
+                self.emotion_model = self._pipeline(pipeline, state, "text-classification", top_k=None)
+            if state.ready:
+                metrics.record_model_load("emotion", self.EMOTION_MODEL, state.seconds)
+    
+    def _pipeline(self, pipeline: Any, state: LoadState, task: str, **kwargs) -> Any:
+        """Pipeline for a model, from the snapshot store when configured (on CPU)"""
+        if self.snapshots is None:
+            return pipeline(task, model=state.source, device=-1, **kwargs)
+        model = self.snapshots.load_pipeline(task, state.source, device=-1, **kwargs)
+        state.source = self.snapshots.path(state.source)
+        return model
+    
+    @property
+    def backend(self) -> str:
+        """Backend answering full analyses: transformers, rules, or mixed while partly loaded"""
+        backends = {state.active_backend for state in self.model_states.values()}
+        return backends.pop() if len(backends) == 1 else "mixed"
+    
+    def analyze(self, text: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Perform full sentiment and emotion analysis
         
         Args:
             text: Input text to analyze
-            
+            deadline: time.perf_counter() value by which the result is needed;
+                models expected to overrun it are replaced by the rule-based
+                analysis and the result is marked degraded
+        
         Returns:
             Dictionary containing sentiment score, emotions, key phrases, and insights
         """
@@ -101,21 +156,27 @@ class SentimentAnalyzer:
         
         # Check for crisis keywords
         is_crisis = self._check_crisis(cleaned_text)
+        degraded = False
         
         # Get sentiment
-        if self.sentiment_model:
-            sentiment_result = self._model_sentiment(cleaned_text)
-        else:
-            sentiment_result = self._rule_based_sentiment(cleaned_text)
+        with metrics.stage("sentiment", "sentiment_model"):
+            if self._use_model("sentiment", deadline):
+                sentiment_result = self._model_sentiment(cleaned_text)
+            else:
+                degraded = self.sentiment_model is not None or self.model_states["sentiment"].degraded
+                sentiment_result = self._rule_based_sentiment(cleaned_text)
         
         # Get emotions
-        if self.emotion_model:
-            emotions = self._model_emotions(cleaned_text)
-        else:
-            emotions = self._rule_based_emotions(cleaned_text)
+        with metrics.stage("sentiment", "emotion_model"):
+            if self._use_model("emotion", deadline):
+                emotions = self._model_emotions(cleaned_text)
+            else:
+                degraded = degraded or self.emotion_model is not None or self.model_states["emotion"].degraded
+                emotions = self._rule_based_emotions(cleaned_text)
         
         # Extract key phrases
-        key_phrases = self._extract_key_phrases(cleaned_text)
+        with metrics.stage("sentiment", "key_phrases"):
+            key_phrases = self._extract_key_phrases(cleaned_text)
         
         # Generate insights
         insights = self._generate_insights(sentiment_result, emotions, is_crisis)
@@ -127,30 +188,40 @@ class SentimentAnalyzer:
             "keyPhrases": key_phrases,
             "insights": insights,
             "isCrisis": is_crisis,
+            "degraded": degraded,
         }
     
-    def quick_analyze(self, text: str) -> Dict[str, Any]:
+    def quick_analyze(self, text: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Quick sentiment analysis for real-time feedback
         
         Args:
             text: Input text to analyze
-            
+            deadline: time.perf_counter() value by which the result is needed
+        
         Returns:
             Dictionary with sentiment score and label only
         """
         cleaned_text = self._clean_text(text)
         
-        if self.sentiment_model:
+        degraded = False
+        if self._use_model("sentiment", deadline):
             result = self._model_sentiment(cleaned_text)
         else:
+            degraded = self.sentiment_model is not None or self.model_states["sentiment"].degraded
             result = self._rule_based_sentiment(cleaned_text)
         
         return {
             "sentimentScore": result["score"],
             "sentiment": result["label"],
+            "degraded": degraded,
         }
     
+    def _use_model(self, name: str, deadline: Optional[float]) -> bool:
+        """Whether a loaded model is expected to answer before the deadline"""
+        model = self.sentiment_model if name == "sentiment" else self.emotion_model
+        return model is not None and fits(deadline, self.model_time[name].expected())
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Convert to lowercase
@@ -175,7 +246,8 @@ class SentimentAnalyzer:
     def _model_sentiment(self, text: str) -> Dict[str, Any]:
         """Get sentiment using transformer model"""
         try:
-            result = self.sentiment_model(text[:512])[0]  # Limit to 512 tokens
+            with self.model_time["sentiment"].running():
+                result = self.sentiment_model(text[:512])[0]  # Limit to 512 tokens
             
             # Map model output to standardized format
             label = result["label"].lower()
@@ -187,7 +259,7 @@ class SentimentAnalyzer:
                 return {"score": -score, "label": "negative"}
             else:
                 return {"score": 0, "label": "neutral"}
-                
+        
         except Exception as e:
             print(f"Model sentiment error: {e}")
             return self._rule_based_sentiment(text)
@@ -217,14 +289,15 @@ class SentimentAnalyzer:
     def _model_emotions(self, text: str) -> Dict[str, float]:
         """Get emotions using transformer model"""
         try:
-            results = self.emotion_model(text[:512])[0]
+            with self.model_time["emotion"].running():
+                results = self.emotion_model(text[:512])[0]
             
             emotions = {}
             for result in results:
                 emotions[result["label"].lower()] = round(result["score"], 4)
             
             return emotions
-            
+        
         except Exception as e:
             print(f"Model emotion error: {e}")
             return self._rule_based_emotions(text)
@@ -0,0 +1,248 @@
+"""
+Vocal Baseline Service
+Per-user running statistics of voice features for personalized scoring
+"""
+
+import hashlib
+import os
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+# Tracked features: (result section or None for top-level, field, report name)
+BASELINE_FEATURES = [
+    ("pitchFeatures", "mean", "pitchMean"),
+    ("pitchFeatures", "range", "pitchRange"),
+    ("pitchFeatures", "variability", "pitchVariability"),
+    ("jitterFeatures", "localJitter", "localJitter"),
+    ("shimmerFeatures", "localShimmer", "localShimmer"),
+    ("cadenceFeatures", "speechRate", "speechRate"),
+    ("cadenceFeatures", "tempo", "tempo"),
+    ("cadenceFeatures", "pauseRatio", "pauseRatio"),
+    ("intensityFeatures", "mean", "intensityMean"),
+    ("intensityFeatures", "dynamicRange", "dynamicRange"),
+    (None, "flatAffectScore", "flatAffectScore"),
+    (None, "agitatedSpeechScore", "agitatedSpeechScore"),
+]
+
+# One fixed-size record per user and profile: Welford count, mean and M2 per feature
+RECORD_DTYPE = np.dtype([
+    ("key", "S32"),
+    ("count", "<u4", (len(BASELINE_FEATURES),)),
+    ("mean", "<f8", (len(BASELINE_FEATURES),)),
+    ("m2", "<f8", (len(BASELINE_FEATURES),)),
+])
+
+# Deviations worth surfacing next to the population-level anomalies
+DEVIATION_MESSAGES = {
+    "flatAffectScore": ("Flat affect is well above your usual level", None),
+    "agitatedSpeechScore": ("Speech agitation is well above your usual level", None),
+    "pitchRange": ("Pitch range is well above your usual range", "Pitch range is well below your usual range"),
+    "speechRate": ("Speaking rate is well above your usual pace", "Speaking rate is well below your usual pace"),
+    "pauseRatio": ("More pauses than usual in your speech", None),
+}
+
+
+class VocalBaselineStore:
+    """
+    Per-user vocal baseline kept as running mean and variance
+    
+    Each recording updates the user's record in O(1) with Welford's method,
+    so z-scores against the user's own history need no history queries.
+    Baselines are kept per analysis profile because features from different
+    profiles are not comparable.
+    
+    With a path, records are persisted as fixed-size binary rows and updated
+    in place. Writes take an advisory file lock and unknown keys trigger a
+    re-scan of rows appended by other workers.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        min_samples: int = 5,
+        z_threshold: float = 2.5,
+    ):
+        self.path = path
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._records: List[np.ndarray] = []
+        self._fd: Optional[int] = None
+        self._scanned = 0
+        
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._refresh_index()
+            # flock is held per open file, so forked workers need their own
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._reopen)
+    
+    def _reopen(self) -> None:
+        """Open a private descriptor of the baseline file (after fork)"""
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+    
+    def score(self, user_id: str, profile: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compare an analysis result with the user's baseline
+        
+        Args:
+            user_id: User the recording belongs to
+            profile: Voice analysis profile the result was produced with
+            result: VoiceAnalyzer result
+        
+        Returns:
+            Dictionary with sample count, per-feature z-scores and deviations
+        """
+        with self._lock:
+            record = self._load(self._key(user_id, profile))
+        
+        values = self._feature_values(result)
+        z_scores = {}
+        deviations = []
+        
+        for i, (_, _, name) in enumerate(BASELINE_FEATURES):
+            count = int(record["count"][i])
+            if np.isnan(values[i]) or count < self.min_samples:
+                continue
+            
+            std = np.sqrt(record["m2"][i] / (count - 1))
+            if std <= 1e-9:
+                continue
+            
+            z = float((values[i] - record["mean"][i]) / std)
+            z_scores[name] = round(z, 2)
+            
+            if name in DEVIATION_MESSAGES and abs(z) >= self.z_threshold:
+                above, below = DEVIATION_MESSAGES[name]
+                message = above if z > 0 else below
+                if message:
+                    deviations.append(message)
+        
+        return {
+            "sampleCount": int(record["count"].max()),
+            "zScores": z_scores,
+            "deviations": deviations,
+        }
+    
+    def update(self, user_id: str, profile: str, result: Dict[str, Any]) -> None:
+        """
+        Fold a new analysis result into the user's baseline
+        
+        Args:
+            user_id: User the recording belongs to
+            profile: Voice analysis profile the result was produced with
+            result: VoiceAnalyzer result
+        """
+        key = self._key(user_id, profile)
+        values = self._feature_values(result)
+        present = ~np.isnan(values)
+        
+        with self._lock:
+            self._acquire_file_lock()
+            try:
+                record = self._load(key)
+                
+                # Welford update for every feature present in this result
+                count = record["count"].astype(np.float64)
+                count[present] += 1
+                delta = np.where(present, values - record["mean"], 0.0)
+                mean = record["mean"] + np.where(present, delta / np.maximum(count, 1), 0.0)
+                m2 = record["m2"] + np.where(present, delta * (values - mean), 0.0)
+                
+                record["count"] = count.astype(np.uint32)
+                record["mean"] = mean
+                record["m2"] = m2
+                self._save(key, record)
+            finally:
+                self._release_file_lock()
+    
+    def score_and_update(self, user_id: str, profile: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Score against the existing baseline, then include the result in it"""
+        report = self.score(user_id, profile, result)
+        self.update(user_id, profile, result)
+        return report
+    
+    def _key(self, user_id: str, profile: str) -> bytes:
+        """Fixed-width record key for a user and profile"""
+        return hashlib.blake2b(f"{user_id}:{profile}".encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+    
+    def _feature_values(self, result: Dict[str, Any]) -> np.ndarray:
+        """Pull tracked features out of a result, NaN where missing"""
+        values = np.full(len(BASELINE_FEATURES), np.nan)
+        for i, (section, field, _) in enumerate(BASELINE_FEATURES):
+            source = result.get(section) if section else result
+            if source and source.get(field) is not None:
+                values[i] = float(source[field])
+        return values
+    
+    def _load(self, key: bytes) -> np.ndarray:
+        """Read a user's record, or an empty one for new users (caller holds the lock)"""
+        if key not in self._index and self._fd is not None:
+            self._refresh_index()
+        
+        slot = self._index.get(key)
+        if slot is None:
+            record = np.zeros((), dtype=RECORD_DTYPE)
+            record["key"] = key
+            return record
+        
+        if self._fd is None:
+            return self._records[slot].copy()
+        
+        data = os.pread(self._fd, RECORD_DTYPE.itemsize, slot * RECORD_DTYPE.itemsize)
+        return np.frombuffer(data, dtype=RECORD_DTYPE)[0].copy()
+    
+    def _save(self, key: bytes, record: np.ndarray) -> None:
+        """Write a record in place, appending new users (caller holds the lock)"""
+        slot = self._index.get(key)
+        
+        if self._fd is None:
+            if slot is None:
+                self._index[key] = len(self._records)
+                self._records.append(record)
+            else:
+                self._records[slot] = record
+            return
+        
+        if slot is None:
+            self._refresh_index()
+            slot = self._scanned
+            self._index[key] = slot
+            self._scanned += 1
+        os.pwrite(self._fd, record.tobytes(), slot * RECORD_DTYPE.itemsize)
+    
+    def _refresh_index(self) -> None:
+        """Index records appended since the last scan"""
+        size = os.fstat(self._fd).st_size
+        total = size // RECORD_DTYPE.itemsize
+        if total <= self._scanned:
+            return
+        
+        offset = self._scanned * RECORD_DTYPE.itemsize
+        data = os.pread(self._fd, (total - self._scanned) * RECORD_DTYPE.itemsize, offset)
+        keys = np.frombuffer(data, dtype=RECORD_DTYPE)["key"]
+        for i, key in enumerate(keys):
+            self._index[bytes(key)] = self._scanned + i
+        self._scanned = total
+    
+    def _acquire_file_lock(self) -> None:
+        if self._fd is not None and FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+    
+    def _release_file_lock(self) -> None:
+        if self._fd is not None and FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
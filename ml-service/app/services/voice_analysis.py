@@ -4,18 +4,57 @@ Extracts vocal biometrics for mental health assessment
 """
 
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
 
-# Try to import librosa, fall back to mock if not available
-try:
-    import librosa
-    import librosa.display
-    LIBROSA_AVAILABLE = True
-except ImportError:
-    LIBROSA_AVAILABLE = False
+from ..deadline import ServiceTimeEstimate, fits
+from ..lazy import LazyModule, module_available
+from ..metrics import metrics
+
+# librosa is imported on first analysis; fall back to mock if not available
+LIBROSA_AVAILABLE = module_available("librosa")
+librosa = LazyModule("librosa")
+if not LIBROSA_AVAILABLE:
     print("Warning: librosa not available, using mock voice analysis")
 
+# librosa imports these lazily itself; preloading them takes seconds off the first request
+LIBROSA_SUBMODULES = ("core", "feature", "onset", "beat")
+
+
+class VoiceDecodeError(ValueError):
+    """Uploaded audio could not be decoded"""
+
+
+# Feature extractors in run order
+VOICE_EXTRACTORS = ["pitch", "jitter", "shimmer", "cadence", "intensity"]
+
+# Named analysis profiles selectable per request
+VOICE_PROFILES = {
+    # Coarse screening: 16 kHz, no pitch tracking
+    "fast": {
+        "sampleRate": 16000,
+        "frameLength": 1024,
+        "hopLength": 512,
+        "extractors": ["jitter", "shimmer", "cadence", "intensity"],
+    },
+    "standard": {
+        "sampleRate": 22050,
+        "frameLength": 2048,
+        "hopLength": 512,
+        "extractors": VOICE_EXTRACTORS,
+    },
+    # High resolution: full-band audio with fine framing
+    "clinical": {
+        "sampleRate": 44100,
+        "frameLength": 4096,
+        "hopLength": 256,
+        "extractors": VOICE_EXTRACTORS,
+    },
+}
+
+# Cheaper extractor subset used when the full set would miss a deadline (no pitch tracking)
+DEGRADED_EXTRACTORS = VOICE_PROFILES["fast"]["extractors"]
+
 
 class VoiceAnalyzer:
     """
@@ -33,76 +72,161 @@ class VoiceAnalyzer:
     - Agitated speech: Rapid, variable speech (anxiety indicator)
     """
     
-    def __init__(self):
-        self.sample_rate = 22050
-        self.frame_length = 2048
-        self.hop_length = 512
+    # Bump when feature extraction or scoring changes so cached results expire
+    VERSION = "1.0.0"
+    
+    def __init__(self, profile: str = "standard"):
+        if profile not in VOICE_PROFILES:
+            raise ValueError(
+                f"Unknown voice profile '{profile}'. Allowed: {', '.join(VOICE_PROFILES)}"
+            )
+        
+        settings = VOICE_PROFILES[profile]
+        self.profile = profile
+        self.sample_rate = settings["sampleRate"]
+        self.frame_length = settings["frameLength"]
+        self.hop_length = settings["hopLength"]
+        self.extractors = list(settings["extractors"])
+        
+        # Extraction time per second of audio, to meet request deadlines
+        self.extractor_time = {name: ServiceTimeEstimate() for name in VOICE_EXTRACTORS}
     
-    def analyze(self, audio_path: str) -> Dict[str, Any]:
+    def settings(self) -> Dict[str, Any]:
+        """Analyzer version and settings that determine a result"""
+        return {
+            "version": self.VERSION,
+            "profile": self.profile,
+            "sampleRate": self.sample_rate,
+            "frameLength": self.frame_length,
+            "hopLength": self.hop_length,
+            "extractors": self.extractors,
+        }
+    
+    def analyze(self, audio_path: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Analyze voice recording and extract biometric features
         
         Args:
             audio_path: Path to audio file
-            
+            deadline: time.perf_counter() value by which the result is needed
+        
         Returns:
             Dictionary containing all extracted features and scores
+            (mock data marked "mock": True when librosa is not installed)
+        
+        Raises:
+            VoiceDecodeError: The file is not decodable audio
         """
         if not LIBROSA_AVAILABLE:
             return self._mock_analysis(audio_path)
         
+        # Load audio file
         try:
-            # Load audio file
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
-            duration = librosa.get_duration(y=y, sr=sr)
-            
-            # Extract features
-            pitch_features = self._extract_pitch_features(y, sr)
-            jitter_features = self._extract_jitter_features(y, sr)
-            shimmer_features = self._extract_shimmer_features(y, sr)
-            cadence_features = self._extract_cadence_features(y, sr)
-            intensity_features = self._extract_intensity_features(y, sr)
-            
-            # Calculate mental health scores
-            flat_affect_score = self._calculate_flat_affect_score(
-                pitch_features, intensity_features
-            )
-            agitated_speech_score = self._calculate_agitated_speech_score(
-                pitch_features, cadence_features
-            )
-            
-            # Calculate overall vocal health score
-            vocal_health_score = self._calculate_vocal_health_score(
-                flat_affect_score, agitated_speech_score
-            )
-            
-            # Generate insights
-            insights = self._generate_insights(
-                flat_affect_score, agitated_speech_score, pitch_features, cadence_features
-            )
-            
-            # Detect anomalies
-            anomalies = self._detect_anomalies(
-                pitch_features, jitter_features, shimmer_features
-            )
-            
-            return {
-                "pitchFeatures": pitch_features,
-                "jitterFeatures": jitter_features,
-                "shimmerFeatures": shimmer_features,
-                "cadenceFeatures": cadence_features,
-                "intensityFeatures": intensity_features,
-                "flatAffectScore": round(flat_affect_score, 4),
-                "agitatedSpeechScore": round(agitated_speech_score, 4),
-                "vocalHealthScore": round(vocal_health_score, 2),
-                "durationSeconds": round(duration, 2),
-                "insights": insights,
-                "anomalies": anomalies,
-            }
-            
+            with metrics.stage("voice", "decode"):
+                y, sr = librosa.load(audio_path, sr=self.sample_rate)
         except Exception as e:
-            print(f"Voice analysis error: {e}")
-            return self._mock_analysis(audio_path)
+            raise VoiceDecodeError(f"Could not decode audio: {str(e) or type(e).__name__}") from e
+        if len(y) == 0:
+            raise VoiceDecodeError("Audio contains no samples")
+        
+        return self.analyze_signal(y, sr, deadline=deadline)
+    
+    def analyze_signal(self, y: np.ndarray, sr: int, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyze an already decoded mono signal
+        
+        Args:
+            y: Audio samples
+            sr: Sample rate of y
+            deadline: time.perf_counter() value by which the result is needed;
+                if the profile's extractors are expected to overrun it, the
+                cheaper DEGRADED_EXTRACTORS subset runs and the result is
+                marked degraded
+        
+        Returns:
+            Dictionary containing all extracted features and scores
+        """
+        duration = librosa.get_duration(y=y, sr=sr)
+        
+        extractors = self.extractors
+        if deadline is not None:
+            expected = sum(self.extractor_time[name].expected(duration) for name in extractors)
+            if not fits(deadline, expected):
+                extractors = [name for name in extractors if name in DEGRADED_EXTRACTORS]
+        
+        # Extract features (skipped extractors report an empty dict)
+        features = {}
+        for name, extract in (
+            ("pitch", self._extract_pitch_features),
+            ("jitter", self._extract_jitter_features),
+            ("shimmer", self._extract_shimmer_features),
+            ("cadence", self._extract_cadence_features),
+            ("intensity", self._extract_intensity_features),
+        ):
+            if name in extractors:
+                with metrics.stage("voice", name), self.extractor_time[name].running(duration):
+                    features[name] = extract(y, sr)
+            else:
+                features[name] = {}
+        
+        with metrics.stage("voice", "scoring"):
+            result = self._build_result(
+                features["pitch"], features["jitter"], features["shimmer"],
+                features["cadence"], features["intensity"], duration
+            )
+        
+        result["degraded"] = extractors != self.extractors
+        if result["degraded"]:
+            result["analysisProfile"]["extractors"] = extractors
+        return result
+    
+    def _build_result(
+        self,
+        pitch_features: Dict[str, Any],
+        jitter_features: Dict[str, Any],
+        shimmer_features: Dict[str, Any],
+        cadence_features: Dict[str, Any],
+        intensity_features: Dict[str, Any],
+        duration: float
+    ) -> Dict[str, Any]:
+        """Score extracted features and assemble the analysis result"""
+        # Calculate mental health scores
+        flat_affect_score = self._calculate_flat_affect_score(
+            pitch_features, intensity_features
+        )
+        agitated_speech_score = self._calculate_agitated_speech_score(
+            pitch_features, cadence_features
+        )
+        
+        # Calculate overall vocal health score
+        vocal_health_score = self._calculate_vocal_health_score(
+            flat_affect_score, agitated_speech_score
+        )
+        
+        # Generate insights
+        insights = self._generate_insights(
+            flat_affect_score, agitated_speech_score, pitch_features, cadence_features
+        )
+        
+        # Detect anomalies
+        anomalies = self._detect_anomalies(
+            pitch_features, jitter_features, shimmer_features
+        )
+        
+        return {
+            "pitchFeatures": pitch_features,
+            "jitterFeatures": jitter_features,
+            "shimmerFeatures": shimmer_features,
+            "cadenceFeatures": cadence_features,
+            "intensityFeatures": intensity_features,
+            "flatAffectScore": round(flat_affect_score, 4),
+            "agitatedSpeechScore": round(agitated_speech_score, 4),
+            "vocalHealthScore": round(vocal_health_score, 2),
+            "durationSeconds": round(duration, 2),
+            "insights": insights,
+            "anomalies": anomalies,
+            "analysisProfile": self.settings(),
+        }
     
     def _extract_pitch_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract pitch (F0) features"""
@@ -110,112 +234,145 @@ class VoiceAnalyzer:
             # Extract pitch using librosa
             pitches, magnitudes = librosa.piptrack(
                 y=y, sr=sr, 
+                n_fft=self.frame_length, hop_length=self.hop_length,
                 fmin=50, fmax=500,
                 threshold=0.1
             )
-            
-            # Get pitch values where magnitude is significant
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
-            
-            if len(pitch_values) == 0:
-                pitch_values = [0]
-            
-            pitch_array = np.array(pitch_values)
-            
-            return {
-                "mean": float(np.mean(pitch_array)),
-                "std": float(np.std(pitch_array)),
-                "min": float(np.min(pitch_array)),
-                "max": float(np.max(pitch_array)),
-                "range": float(np.max(pitch_array) - np.min(pitch_array)),
-                "variability": float(np.std(pitch_array) / (np.mean(pitch_array) + 1e-6)),
-            }
+            return self._summarize_pitch(self._pitch_track(pitches, magnitudes))
         except Exception as e:
             return {"mean": 0, "std": 0, "min": 0, "max": 0, "range": 0, "variability": 0}
     
+    def _pitch_track(self, pitches: np.ndarray, magnitudes: np.ndarray) -> np.ndarray:
+        """Pick the strongest voiced pitch of every frame"""
+        # Get pitch values where magnitude is significant
+        frames = np.arange(pitches.shape[1])
+        pitch = pitches[magnitudes.argmax(axis=0), frames]
+        return pitch[pitch > 0]
+    
+    def _summarize_pitch(self, pitch_values: np.ndarray) -> Dict[str, Any]:
+        """Summarize a voiced pitch track"""
+        if len(pitch_values) == 0:
+            pitch_values = [0]
+        
+        pitch_array = np.array(pitch_values)
+        
+        return {
+            "mean": float(np.mean(pitch_array)),
+            "std": float(np.std(pitch_array)),
+            "min": float(np.min(pitch_array)),
+            "max": float(np.max(pitch_array)),
+            "range": float(np.max(pitch_array) - np.min(pitch_array)),
+            "variability": float(np.std(pitch_array) / (np.mean(pitch_array) + 1e-6)),
+        }
+    
     def _extract_jitter_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract jitter (pitch perturbation) features"""
         try:
             # Calculate zero crossing rate as proxy for jitter
-            zcr = librosa.feature.zero_crossing_rate(y, frame_length=self.frame_length)
-            
-            return {
-                "mean": float(np.mean(zcr)),
-                "std": float(np.std(zcr)),
-                "localJitter": float(np.mean(np.abs(np.diff(zcr)))),
-            }
+            zcr = librosa.feature.zero_crossing_rate(
+                y, frame_length=self.frame_length, hop_length=self.hop_length
+            )
+            return self._summarize_jitter(zcr[0])
         except Exception:
             return {"mean": 0, "std": 0, "localJitter": 0}
     
+    def _summarize_jitter(self, zcr: np.ndarray) -> Dict[str, Any]:
+        """Summarize a zero crossing rate track"""
+        return {
+            "mean": float(np.mean(zcr)),
+            "std": float(np.std(zcr)),
+            "localJitter": float(np.mean(np.abs(np.diff(zcr)))),
+        }
+    
     def _extract_shimmer_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract shimmer (amplitude perturbation) features"""
         try:
             # Calculate RMS energy
-            rms = librosa.feature.rms(y=y, frame_length=self.frame_length)
-            
-            # Calculate shimmer as amplitude variation
-            shimmer = np.abs(np.diff(rms[0])) / (np.mean(rms) + 1e-6)
-            
-            return {
-                "mean": float(np.mean(shimmer)),
-                "std": float(np.std(shimmer)),
-                "localShimmer": float(np.mean(shimmer)),
-            }
+            rms = librosa.feature.rms(
+                y=y, frame_length=self.frame_length, hop_length=self.hop_length
+            )
+            return self._summarize_shimmer(rms[0])
         except Exception:
             return {"mean": 0, "std": 0, "localShimmer": 0}
     
+    def _summarize_shimmer(self, rms: np.ndarray) -> Dict[str, Any]:
+        """Summarize an RMS track as amplitude variation"""
+        # Calculate shimmer as amplitude variation
+        shimmer = np.abs(np.diff(rms)) / (np.mean(rms) + 1e-6)
+        
+        return {
+            "mean": float(np.mean(shimmer)),
+            "std": float(np.std(shimmer)),
+            "localShimmer": float(np.mean(shimmer)),
+        }
+    
     def _extract_cadence_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract speech cadence (rhythm and tempo) features"""
         try:
             # Onset detection for speech rhythm
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            tempo, beats = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr)
-            
-            # Calculate speech rate
-            duration = len(y) / sr
-            speech_rate = len(beats) / duration if duration > 0 else 0
-            
-            # Calculate rhythm regularity
-            if len(beats) > 1:
-                beat_intervals = np.diff(beats)
-                rhythm_regularity = 1 - (np.std(beat_intervals) / (np.mean(beat_intervals) + 1e-6))
-            else:
-                rhythm_regularity = 0.5
-            
-            return {
-                "tempo": float(tempo) if isinstance(tempo, (int, float)) else float(tempo[0]) if len(tempo) > 0 else 0,
-                "speechRate": float(speech_rate),
-                "rhythmRegularity": float(max(0, min(1, rhythm_regularity))),
-                "pauseRatio": float(self._calculate_pause_ratio(y, sr)),
-            }
+            onset_env = librosa.onset.onset_strength(
+                y=y, sr=sr, n_fft=self.frame_length, hop_length=self.hop_length
+            )
+            rms = librosa.feature.rms(
+                y=y, frame_length=self.frame_length, hop_length=self.hop_length
+            )[0]
+            return self._summarize_cadence(onset_env, rms, sr, len(y) / sr)
         except Exception:
             return {"tempo": 0, "speechRate": 0, "rhythmRegularity": 0.5, "pauseRatio": 0}
     
+    def _summarize_cadence(
+        self,
+        onset_env: np.ndarray,
+        rms: np.ndarray,
+        sr: int,
+        duration: float
+    ) -> Dict[str, Any]:
+        """Summarize an onset envelope into rhythm and tempo features"""
+        tempo, beats = librosa.beat.beat_track(
+            onset_envelope=onset_env, sr=sr, hop_length=self.hop_length
+        )
+        
+        # Calculate speech rate
+        speech_rate = len(beats) / duration if duration > 0 else 0
+        
+        # Calculate rhythm regularity
+        if len(beats) > 1:
+            beat_intervals = np.diff(beats)
+            rhythm_regularity = 1 - (np.std(beat_intervals) / (np.mean(beat_intervals) + 1e-6))
+        else:
+            rhythm_regularity = 0.5
+        
+        return {
+            "tempo": float(tempo) if isinstance(tempo, (int, float)) else float(tempo[0]) if len(tempo) > 0 else 0,
+            "speechRate": float(speech_rate),
+            "rhythmRegularity": float(max(0, min(1, rhythm_regularity))),
+            "pauseRatio": float(self._calculate_pause_ratio(rms)),
+        }
+    
     def _extract_intensity_features(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract intensity (volume) features"""
         try:
-            rms = librosa.feature.rms(y=y, frame_length=self.frame_length)[0]
-            
-            return {
-                "mean": float(np.mean(rms)),
-                "std": float(np.std(rms)),
-                "min": float(np.min(rms)),
-                "max": float(np.max(rms)),
-                "dynamicRange": float(np.max(rms) - np.min(rms)),
-            }
+            rms = librosa.feature.rms(
+                y=y, frame_length=self.frame_length, hop_length=self.hop_length
+            )[0]
+            return self._summarize_intensity(rms)
         except Exception:
             return {"mean": 0, "std": 0, "min": 0, "max": 0, "dynamicRange": 0}
     
-    def _calculate_pause_ratio(self, y: np.ndarray, sr: int) -> float:
+    def _summarize_intensity(self, rms: np.ndarray) -> Dict[str, Any]:
+        """Summarize an RMS track as volume features"""
+        return {
+            "mean": float(np.mean(rms)),
+            "std": float(np.std(rms)),
+            "min": float(np.min(rms)),
+            "max": float(np.max(rms)),
+            "dynamicRange": float(np.max(rms) - np.min(rms)),
+        }
+    
+    def _calculate_pause_ratio(self, rms: np.ndarray) -> float:
         """Calculate ratio of silence/pauses in speech"""
         try:
             # Use RMS to detect silence
-            rms = librosa.feature.rms(y=y, frame_length=self.frame_length)[0]
             threshold = np.mean(rms) * 0.1
             silence_frames = np.sum(rms < threshold)
             return silence_frames / len(rms)
@@ -232,17 +389,21 @@ class VoiceAnalyzer:
         
         High score indicates monotone, low-energy speech
         """
+        # Low intensity variation indicates flat affect
+        intensity_range = intensity_features.get("dynamicRange", 0)
+        intensity_score = 1 - min(1, intensity_range * 10)  # Higher dynamic range = lower flat affect
+        
+        # Profiles without pitch tracking score on intensity alone
+        if not pitch_features:
+            return max(0, min(1, intensity_score))
+        
         # Low pitch variability indicates flat affect
         pitch_variability = pitch_features.get("variability", 0)
         pitch_range = pitch_features.get("range", 0)
         
-        # Low intensity variation indicates flat affect
-        intensity_range = intensity_features.get("dynamicRange", 0)
-        
         # Normalize and combine
         pitch_score = 1 - min(1, pitch_variability * 5)  # Higher variability = lower flat affect
         range_score = 1 - min(1, pitch_range / 200)  # Higher range = lower flat affect
-        intensity_score = 1 - min(1, intensity_range * 10)  # Higher dynamic range = lower flat affect
         
         # Weighted average
         flat_affect_score = (pitch_score * 0.4 + range_score * 0.3 + intensity_score * 0.3)
@@ -276,12 +437,20 @@ class VoiceAnalyzer:
         irregularity_score = 1 - rhythm_regularity  # Lower regularity = higher agitation
         
         # Weighted average
-        agitated_score = (
-            rate_score * 0.3 + 
-            tempo_score * 0.2 + 
-            variability_score * 0.25 + 
-            irregularity_score * 0.25
-        )
+        if pitch_features:
+            agitated_score = (
+                rate_score * 0.3 + 
+                tempo_score * 0.2 + 
+                variability_score * 0.25 + 
+                irregularity_score * 0.25
+            )
+        else:
+            # Without pitch tracking the cadence weights are renormalized
+            agitated_score = (
+                rate_score * 0.3 + 
+                tempo_score * 0.2 + 
+                irregularity_score * 0.25
+            ) / 0.75
         
         return max(0, min(1, agitated_score))
     
@@ -357,13 +526,13 @@ class VoiceAnalyzer:
             anomalies.append("Elevated amplitude instability detected")
         
         # Very low pitch range might indicate issues
-        if pitch_features.get("range", 0) < 20:
+        if pitch_features and pitch_features.get("range", 0) < 20:
             anomalies.append("Very limited pitch range detected")
         
         return anomalies
     
     def _mock_analysis(self, audio_path: str) -> Dict[str, Any]:
-        """Return mock analysis when librosa is not available"""
+        """Return mock analysis when librosa is not available (marked mock, never a real measurement)"""
         # Generate realistic mock data
         np.random.seed(hash(audio_path) % 2**32)
         
@@ -405,4 +574,6 @@ class VoiceAnalyzer:
             "durationSeconds": float(np.random.uniform(10, 60)),
             "insights": ["Voice analysis completed. Your vocal patterns appear within normal range."],
             "anomalies": [],
+            "analysisProfile": self.settings(),
+            "mock": True,
         }
@@ -0,0 +1,217 @@
+"""
+Streaming Voice Analysis
+Incremental vocal biometrics for audio that arrives while the user speaks
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from .voice_analysis import VoiceAnalyzer, LIBROSA_AVAILABLE, librosa
+
+
+# Raw sample formats accepted over the stream: (numpy dtype, scale to [-1, 1])
+PCM_ENCODINGS = {
+    "pcm_s16le": ("<i2", 1 / 32768.0),
+    "pcm_f32le": ("<f4", 1.0),
+}
+
+
+class VoiceStreamSession:
+    """
+    Incremental VoiceAnalyzer state for one live recording
+    
+    The expensive spectral work (pitch tracking, RMS, zero crossings and the
+    onset envelope) runs once per incoming chunk on complete frames only.
+    The session keeps just the compact per-frame tracks, so partial scores
+    and the final result are summaries over those tracks and are ready
+    as soon as the last chunk has been processed.
+    
+    Onset strength is approximated per chunk and chunked resampling is used
+    when the client rate differs, so scores can differ slightly from a
+    full-file analysis of the same recording.
+    """
+    
+    def __init__(
+        self,
+        analyzer: VoiceAnalyzer,
+        encoding: str = "pcm_s16le",
+        input_sample_rate: int = 16000,
+    ):
+        if encoding not in PCM_ENCODINGS:
+            raise ValueError(
+                f"Unsupported encoding '{encoding}'. Allowed: {', '.join(PCM_ENCODINGS)}"
+            )
+        
+        self.analyzer = analyzer
+        self.encoding = encoding
+        self.input_sample_rate = input_sample_rate
+        self.sample_rate = analyzer.sample_rate
+        self.frame_length = analyzer.frame_length
+        self.hop_length = analyzer.hop_length
+        
+        self._dtype, self._scale = PCM_ENCODINGS[encoding]
+        self._partial_bytes = b""
+        # Leading zeros reproduce the centre padding of the full-file extractors
+        self._pending = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._samples_seen = 0
+        self._last_mel_frame: Optional[np.ndarray] = None
+        self._mel_db_max = -np.inf
+        
+        # Per-frame tracks
+        self._pitch: List[np.ndarray] = []
+        self._rms: List[np.ndarray] = []
+        self._zcr: List[np.ndarray] = []
+        self._onset: List[np.ndarray] = []
+    
+    @property
+    def duration(self) -> float:
+        """Seconds of audio received so far"""
+        return self._samples_seen / self.sample_rate
+    
+    def feed(self, data: bytes) -> None:
+        """
+        Add a chunk of raw PCM audio to the session
+        
+        Args:
+            data: Little-endian samples in the session encoding
+        """
+        data = self._partial_bytes + data
+        item_size = np.dtype(self._dtype).itemsize
+        usable = len(data) - len(data) % item_size
+        self._partial_bytes = data[usable:]
+        if usable == 0:
+            return
+        
+        samples = np.frombuffer(data[:usable], dtype=self._dtype).astype(np.float32)
+        samples *= self._scale
+        
+        if LIBROSA_AVAILABLE and self.input_sample_rate != self.sample_rate:
+            samples = librosa.resample(
+                samples, orig_sr=self.input_sample_rate, target_sr=self.sample_rate
+            )
+        
+        self._samples_seen += len(samples)
+        self._pending = np.concatenate([self._pending, samples])
+        
+        if LIBROSA_AVAILABLE:
+            self._process_complete_frames()
+    
+    def partial_scores(self) -> Optional[Dict[str, Any]]:
+        """
+        Running flat affect and agitation scores for the audio so far
+        
+        Returns:
+            Dictionary with partial scores, or None until enough audio arrived
+        """
+        if not self._rms:
+            return None
+        
+        features = self._summarize()
+        return {
+            "flatAffectScore": round(self.analyzer._calculate_flat_affect_score(
+                features["pitch"], features["intensity"]
+            ), 4),
+            "agitatedSpeechScore": round(self.analyzer._calculate_agitated_speech_score(
+                features["pitch"], features["cadence"]
+            ), 4),
+            "pauseRatio": round(features["cadence"]["pauseRatio"], 4),
+            "durationSeconds": round(self.duration, 2),
+        }
+    
+    def finish(self) -> Dict[str, Any]:
+        """
+        Close the stream and return the full analysis result
+        
+        Returns:
+            Dictionary in the same shape as VoiceAnalyzer.analyze
+        """
+        if not LIBROSA_AVAILABLE:
+            return self.analyzer._mock_analysis(f"stream-{id(self)}")
+        
+        # Trailing zeros complete the frames that overlap the end of the signal
+        tail = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._pending = np.concatenate([self._pending, tail])
+        self._process_complete_frames()
+        
+        if not self._rms:
+            raise ValueError("Stream closed before enough audio was received")
+        
+        features = self._summarize()
+        features["jitter"] = self.analyzer._summarize_jitter(np.concatenate(self._zcr))
+        features["shimmer"] = self.analyzer._summarize_shimmer(features["rms"])
+        
+        # Respect the extractor subset of the analyzer's profile
+        selected = {
+            name: features[name] if name in self.analyzer.extractors else {}
+            for name in ("pitch", "jitter", "shimmer", "cadence", "intensity")
+        }
+        return self.analyzer._build_result(
+            selected["pitch"],
+            selected["jitter"],
+            selected["shimmer"],
+            selected["cadence"],
+            selected["intensity"],
+            self.duration,
+        )
+    
+    def _process_complete_frames(self) -> None:
+        """Run frame-level extractors on every complete frame in the buffer"""
+        if len(self._pending) < self.frame_length:
+            return
+        
+        n_frames = 1 + (len(self._pending) - self.frame_length) // self.hop_length
+        segment = self._pending[:self.frame_length + (n_frames - 1) * self.hop_length]
+        sr = self.sample_rate
+        
+        if "pitch" in self.analyzer.extractors:
+            pitches, magnitudes = librosa.piptrack(
+                y=segment, sr=sr, n_fft=self.frame_length, hop_length=self.hop_length,
+                fmin=50, fmax=500, threshold=0.1, center=False
+            )
+            self._pitch.append(self.analyzer._pitch_track(pitches, magnitudes))
+        
+        self._rms.append(librosa.feature.rms(
+            y=segment, frame_length=self.frame_length, hop_length=self.hop_length, center=False
+        )[0])
+        self._zcr.append(librosa.feature.zero_crossing_rate(
+            segment, frame_length=self.frame_length, hop_length=self.hop_length, center=False
+        )[0])
+        
+        # Onset strength is the positive spectral flux between mel frames, so
+        # the last frame of the previous chunk is carried over
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(
+            y=segment, sr=sr, n_fft=self.frame_length, hop_length=self.hop_length, center=False
+        ), top_db=None)
+        # The 80 dB floor is relative to the loudest frame heard so far
+        self._mel_db_max = max(self._mel_db_max, float(mel_db.max()))
+        mel_db = np.maximum(mel_db, self._mel_db_max - 80.0)
+        if self._last_mel_frame is not None:
+            mel_db = np.concatenate([self._last_mel_frame, mel_db], axis=1)
+            flux = np.maximum(0.0, np.diff(mel_db, axis=1))
+        else:
+            # Same lag and framing compensation as librosa.onset.onset_strength
+            shift = 1 + self.frame_length // (2 * self.hop_length)
+            flux = np.concatenate(
+                [np.zeros((mel_db.shape[0], shift)), np.maximum(0.0, np.diff(mel_db, axis=1))], axis=1
+            )
+        self._onset.append(flux.mean(axis=0))
+        self._last_mel_frame = mel_db[:, -1:]
+        
+        self._pending = self._pending[n_frames * self.hop_length:]
+    
+    def _summarize(self) -> Dict[str, Any]:
+        """Summarize the per-frame tracks collected so far"""
+        rms = np.concatenate(self._rms)
+        try:
+            cadence = self.analyzer._summarize_cadence(
+                np.concatenate(self._onset)[:len(rms)], rms, self.sample_rate, self.duration
+            )
+        except Exception:
+            cadence = {"tempo": 0, "speechRate": 0, "rhythmRegularity": 0.5, "pauseRatio": 0}
+        
+        return {
+            "rms": rms,
+            "pitch": self.analyzer._summarize_pitch(np.concatenate(self._pitch)) if self._pitch else {},
+            "intensity": self.analyzer._summarize_intensity(rms),
+            "cadence": cadence,
+        }
@@ -0,0 +1,314 @@
+"""
+Pre-fork Serving
+Loads the app (and its models) once, then forks workers that share the pages
+
+Usage (from ml-service/):
+    python -m app.serving                          # one worker per core, 1 thread each
+    python -m app.serving --workers 4              # threads per worker = cores / 4
+    python -m app.serving --threads-per-worker 2 --pin
+
+The parent imports main and calls its load_models() (the transformer
+weights a plain uvicorn process loads in the background after startup),
+freezes the garbage collector so those objects are never written to by
+collections, binds the listening socket and forks the workers. Workers serve the shared
+socket with uvicorn and see the weights copy-on-write instead of loading
+their own copy. The CPU budget is split between worker processes and the
+torch/BLAS threads inside each one, so workers x threads never exceeds the
+available cores. The parent restarts workers that die and forwards
+SIGTERM/SIGINT for a graceful shutdown.
+
+The parent must not run inference before forking: a torch/OpenMP thread
+pool started there does not survive fork.
+
+Each worker keeps its own in-memory state: /metrics counters, admission
+queues, caches, incremental prediction state and anomaly statistics. A
+request on the shared socket reaches an arbitrary worker, so:
+- with --metrics-port P, worker i also listens on port P + i; scrape every
+  worker there and aggregate (e.g. sum by route) in Prometheus
+- ML_WORKERS is exported to the workers, and main disables the endpoints
+  whose results depend on per-user state in one process
+  (/predict/incremental, signal anomalies) when it is above 1
+"""
+
+import argparse
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Thread pools sized from the environment when numpy/torch are first imported
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# A worker exiting sooner than this after start is restarted with a delay
+MIN_WORKER_UPTIME = 5.0
+
+
+def available_cpus() -> List[int]:
+    """Cores this process may run on (respects taskset/cgroup cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(cpus: int, workers: Optional[int] = None, threads: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Split a CPU budget into worker processes and threads per worker
+    
+    Args:
+        cpus: Cores available
+        workers: Requested worker count (None to derive it)
+        threads: Requested threads per worker (None to derive it)
+    
+    Returns:
+        (workers, threads per worker); without either request every core
+        gets a single-threaded worker, since concurrent requests use cores
+        better than intra-op parallelism on small models
+    """
+    if workers is None and threads is None:
+        return cpus, 1
+    if workers is None:
+        return max(1, cpus // threads), threads
+    if threads is None:
+        return workers, max(1, cpus // workers)
+    return workers, threads
+
+
+def worker_cores(cpus: List[int], workers: int, threads: int) -> List[List[int]]:
+    """Cores for each worker when pinning (wrapping around if oversubscribed)"""
+    return [
+        sorted({cpus[(index * threads + k) % len(cpus)] for k in range(threads)})
+        for index in range(workers)
+    ]
+
+
+def limit_threads(threads: int) -> Dict[str, str]:
+    """
+    Size BLAS/OpenMP thread pools before numpy and torch are imported
+    
+    Variables already set in the environment are left alone.
+    
+    Returns:
+        The thread variables in effect
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    # Tokenizers spawn their own pool, which does not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    return {name: os.environ[name] for name in THREAD_ENV_VARS}
+
+
+def _configure_worker_threads(threads: int) -> None:
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first inter-op work; keep the default then
+        pass
+
+
+class PreforkServer:
+    """Parent process owning the shared socket and the worker processes"""
+    
+    def __init__(
+        self,
+        app_path: str = "main:app",
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 1,
+        threads: int = 1,
+        cores: Optional[List[List[int]]] = None,
+        backlog: int = 2048,
+        log_level: str = "info",
+        metrics_port: Optional[int] = None
+    ):
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.cores = cores
+        self.backlog = backlog
+        self.log_level = log_level
+        self.metrics_port = metrics_port
+        
+        self.app = None
+        self.socket: Optional[socket.socket] = None
+        self.worker_sockets: List[socket.socket] = []
+        self.children: Dict[int, Tuple[int, float]] = {}  # pid -> (worker index, start time)
+        self.stopping = False
+    
+    def load(self) -> None:
+        """Import the app in the parent so workers inherit the loaded models"""
+        module_name, _, attribute = self.app_path.partition(":")
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.app = getattr(module, attribute or "app")
+        
+        # Load the models now rather than in each worker's background loader
+        load_models = getattr(module, "load_models", None)
+        if callable(load_models):
+            load_models()
+        
+        # Objects alive now are moved out of the collector's generations, so
+        # collections in the workers do not touch (and copy) their pages
+        gc.collect()
+        gc.freeze()
+        print(f"Loaded {self.app_path} in {time.perf_counter() - start:.1f}s ({gc.get_freeze_count()} objects frozen)")
+    
+    def bind(self) -> None:
+        self.socket = self._listen(self.port)
+        if self.metrics_port is not None:
+            # One port per worker, so a scraper sees every worker's own counters
+            self.worker_sockets = [self._listen(self.metrics_port + i) for i in range(self.workers)]
+    
+    def _listen(self, port: int) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+    
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (index, time.monotonic())
+            return
+        
+        # Worker: uvicorn installs its own shutdown handlers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            self._serve(index)
+        except BaseException as e:
+            print(f"Worker {index} failed: {e}", file=sys.stderr)
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+    
+    def _serve(self, index: int) -> None:
+        import uvicorn
+        
+        if self.cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cores[index])
+        _configure_worker_threads(self.threads)
+        
+        sockets = [self.socket]
+        if self.worker_sockets:
+            sockets.append(self.worker_sockets[index])
+        config = uvicorn.Config(self.app, log_level=self.log_level, timeout_graceful_shutdown=30)
+        uvicorn.Server(config).run(sockets=sockets)
+    
+    def stop(self, signum: int, frame: object) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def run(self) -> int:
+        """Fork the workers and supervise them until shutdown"""
+        self.load()
+        self.bind()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        for index in range(self.workers):
+            self.spawn(index)
+        print(
+            f"Serving on {self.host}:{self.port} with {self.workers} workers x {self.threads} threads"
+            + (f", pinned to {self.cores}" if self.cores else "")
+            + (f", worker metrics on ports {self.metrics_port}-{self.metrics_port + self.workers - 1}"
+               if self.metrics_port is not None else "")
+        )
+        
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index, started = self.children.pop(pid, (None, 0.0))
+            if index is None or self.stopping:
+                continue
+            
+            print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                # Do not spin on a worker that crashes at startup
+                time.sleep(MIN_WORKER_UPTIME)
+            if not self.stopping:
+                self.spawn(index)
+        
+        self.socket.close()
+        for sock in self.worker_sockets:
+            sock.close()
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the ML service with pre-forked workers")
+    parser.add_argument("--app", default="main:app", help="Application import path")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=_env_int("ML_WORKERS"), help="Worker processes (default: derived from the CPU budget)")
+    parser.add_argument("--threads-per-worker", type=int, default=_env_int("ML_THREADS_PER_WORKER"), help="torch/BLAS threads per worker (default: derived from the CPU budget)")
+    parser.add_argument("--cpus", type=int, default=_env_int("ML_CPUS"), help="CPU budget (default: cores available to this process)")
+    parser.add_argument("--pin", action="store_true", default=os.getenv("ML_PIN_WORKERS", "false").lower() in ("1", "true", "yes"), help="Pin each worker to its own cores")
+    parser.add_argument("--metrics-port", type=int, default=_env_int("ML_METRICS_PORT"), help="Worker i also listens on this port + i (scrape /metrics per worker)")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    
+    if not hasattr(os, "fork"):
+        print("Pre-fork serving needs os.fork; use uvicorn directly on this platform")
+        return 2
+    
+    cpus = available_cpus()
+    budget = min(args.cpus or len(cpus), len(cpus))
+    workers, threads = plan_workers(budget, args.workers, args.threads_per_worker)
+    if workers * threads > len(cpus):
+        print(f"Warning: {workers} workers x {threads} threads oversubscribe {len(cpus)} cores")
+    limit_threads(threads)
+    # Each worker sizes its admission slots from its share of the budget
+    os.environ["ML_WORKERS"] = str(workers)
+    os.environ["ML_CPUS"] = str(budget)
+    
+    server = PreforkServer(
+        app_path=args.app,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        threads=threads,
+        cores=worker_cores(cpus, workers, threads) if args.pin else None,
+        backlog=args.backlog,
+        log_level=args.log_level,
+        metrics_port=args.metrics_port,
+    )
+    return server.run()
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Analyzer microbenchmarks
@@ -0,0 +1,134 @@
+"""
+Benchmark Data Generators
+Deterministic synthetic audio, journal texts and mood-log histories
+"""
+
+import numpy as np
+from typing import Dict, Any, List
+
+
+# Words drawn for synthetic journal entries, weighted toward the analyzers' vocabularies
+JOURNAL_VOCABULARY = [
+    "today", "work", "morning", "evening", "family", "friends", "sleep", "walk",
+    "meeting", "deadline", "dinner", "weekend", "therapy", "exercise", "coffee",
+    "happy", "grateful", "calm", "peaceful", "hopeful", "proud", "relaxed", "better",
+    "sad", "tired", "anxious", "worried", "stressed", "overwhelmed", "lonely", "frustrated",
+    "i", "my", "the", "and", "was", "felt", "really", "very", "after", "because", "with",
+]
+
+
+def speech_like_audio(
+    seconds: float,
+    sr: int = 22050,
+    pitch_hz: float = 150.0,
+    jitter: float = 0.01,
+    syllable_rate: float = 4.0,
+    pause_ratio: float = 0.2,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Voiced speech-like signal with controllable pitch and jitter
+    
+    A harmonic source whose fundamental drifts slowly around pitch_hz and is
+    perturbed per period by jitter (relative standard deviation), shaped by a
+    syllable-rate amplitude envelope with silent pauses and a little noise.
+    
+    Args:
+        seconds: Length of the signal
+        sr: Sample rate
+        pitch_hz: Mean fundamental frequency
+        jitter: Relative period-to-period pitch perturbation
+        syllable_rate: Amplitude bursts per second
+        pause_ratio: Share of syllable slots that are silent
+        seed: Random seed
+    
+    Returns:
+        float32 samples in [-1, 1]
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    
+    # Slow intonation contour plus per-period jitter, integrated into phase
+    contour = pitch_hz * (1 + 0.1 * np.sin(2 * np.pi * 0.3 * t))
+    periods = max(1, int(seconds * pitch_hz))
+    period_noise = rng.normal(0, jitter, periods)
+    f0 = contour * (1 + np.repeat(period_noise, int(np.ceil(n / periods)))[:n])
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    
+    source = sum(np.sin(k * phase) / k for k in range(1, 6))
+    
+    # Syllable envelope with silent slots for pauses
+    slots = max(1, int(np.ceil(seconds * syllable_rate)))
+    voiced = rng.random(slots) >= pause_ratio
+    slot_index = np.minimum((t * syllable_rate).astype(int), slots - 1)
+    envelope = np.sin(np.pi * (t * syllable_rate % 1)) ** 2 * voiced[slot_index]
+    
+    signal = 0.5 * source * envelope + 0.005 * rng.normal(0, 1, n)
+    return (signal / max(1e-9, np.max(np.abs(signal)))).astype(np.float32)
+
+
+def journal_text(words: int, seed: int = 0) -> str:
+    """
+    Journal entry of a given length built from a fixed vocabulary
+    
+    Args:
+        words: Number of words
+        seed: Random seed
+    
+    Returns:
+        Text with a sentence break roughly every 12 words
+    """
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(JOURNAL_VOCABULARY, size=words)
+    sentences = [" ".join(chosen[i:i + 12]) for i in range(0, words, 12)]
+    return ". ".join(s.capitalize() for s in sentences) + "."
+
+
+def mood_log_history(entries: int, seed: int = 0, columnar: bool = False) -> Any:
+    """
+    Daily mood logs with a slow trend, weekly rhythm and noise
+    
+    Args:
+        entries: Number of logs
+        seed: Random seed
+        columnar: Return columns ({"moodScore": [...], ...}) instead of entries
+    
+    Returns:
+        Mood logs in the /predict request format
+    """
+    rng = np.random.default_rng(seed)
+    day = np.arange(entries)
+    drift = np.cumsum(rng.normal(0, 0.05, entries))
+    weekly = 0.5 * np.sin(2 * np.pi * day / 7)
+    
+    mood = np.clip(np.round(6 + drift + weekly + rng.normal(0, 1, entries)), 1, 10)
+    anxiety = np.clip(np.round(5 - drift + rng.normal(0, 1.2, entries)), 0, 10)
+    sleep = np.clip(np.round(6 + 0.5 * drift + rng.normal(0, 1.5, entries)), 1, 10)
+    mhi = np.clip(np.round(mood * 8 + (10 - anxiety) * 2 + rng.normal(0, 3, entries), 1), 0, 100)
+    created = np.datetime64("2020-01-01T20:00:00") + day.astype("timedelta64[D]")
+    created_at = np.datetime_as_string(created, unit="s").tolist()
+    
+    columns = {
+        "moodScore": mood.tolist(),
+        "mentalHealthIndex": mhi.tolist(),
+        "anxietyLevel": anxiety.tolist(),
+        "sleepQuality": sleep.tolist(),
+        "createdAt": [f"{c}Z" for c in created_at],
+    }
+    if columnar:
+        return columns
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def voice_biometrics(entries: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Voice analysis results as sent alongside mood logs"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "flatAffectScore": float(f),
+            "agitatedSpeechScore": float(a),
+            "vocalHealthScore": float(h),
+        }
+        for f, a, h in zip(rng.uniform(0.1, 0.6, entries), rng.uniform(0.1, 0.6, entries), rng.uniform(40, 90, entries))
+    ]
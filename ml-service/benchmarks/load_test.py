@@ -0,0 +1,366 @@
+"""
+Load Test Harness
+Drives the ML service with a configurable traffic mix and reports latency percentiles
+
+Usage (from ml-service/):
+    # In process, through the ASGI app (no server needed)
+    python -m benchmarks.load_test --duration 30 --concurrency 16
+    
+    # Against a local uvicorn, sampling its worker processes
+    uvicorn main:app --workers 4 &
+    python -m benchmarks.load_test --url http://localhost:8000 --pid $! --rate 200
+
+Without --rate, `concurrency` clients send back-to-back requests (closed
+loop). With --rate, requests arrive as a Poisson process at that rate and at
+most `concurrency` are outstanding (open loop). Latency is measured from the
+scheduled arrival, so time spent waiting for a free slot counts.
+
+In process, handlers share the load generator's event loop, so the numbers
+describe a single worker; use --url to measure a real deployment.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+import wave
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from .generators import journal_text, mood_log_history, speech_like_audio, voice_biometrics
+
+
+# Default share of each request type (realtime typing dominates real traffic)
+DEFAULT_MIX = "realtime=40,text=20,predict=20,voice=10,batch=5,predict_batch=5"
+
+TRAFFIC_KINDS = ("realtime", "text", "batch", "voice", "predict", "predict_batch")
+
+
+class Traffic:
+    """Pre-generated request payloads, varied per call so result caches do not hide work"""
+    
+    def __init__(self, seed: int = 0, voice_seconds: float = 5.0):
+        rng = np.random.default_rng(seed)
+        self.counter = 0
+        self.texts = [journal_text(int(n), seed=i) for i, n in enumerate(rng.integers(20, 400, 32))]
+        self.snippets = [journal_text(int(n), seed=100 + i) for i, n in enumerate(rng.integers(3, 15, 32))]
+        self.histories = [mood_log_history(int(n), seed=i) for i, n in enumerate(rng.integers(10, 365, 16))]
+        self.voices = [voice_biometrics(5, seed=i) for i in range(16)]
+        self.recordings = [
+            _wav_bytes(speech_like_audio(voice_seconds, sr=16000, pitch_hz=p, jitter=j, seed=i), 16000)
+            for i, (p, j) in enumerate(zip(rng.uniform(90, 250, 4), rng.uniform(0.005, 0.04, 4)))
+        ]
+    
+    def request(self, kind: str) -> Tuple[str, str, Dict[str, Any]]:
+        """(method, path, httpx keyword arguments) for one request of a kind"""
+        self.counter += 1
+        i = self.counter
+        
+        if kind == "realtime":
+            return "POST", "/analyze/realtime", {"json": {"text": self.snippets[i % len(self.snippets)]}}
+        if kind == "text":
+            return "POST", "/analyze/text", {"json": {"text": self.texts[i % len(self.texts)]}}
+        if kind == "batch":
+            return "POST", "/analyze/batch", {"json": [self.texts[(i + k) % len(self.texts)] for k in range(8)]}
+        if kind == "predict":
+            return "POST", "/predict", {"json": self._prediction(i)}
+        if kind == "predict_batch":
+            return "POST", "/predict/batch", {"json": {"requests": [self._prediction(i * 50 + k) for k in range(50)]}}
+        if kind == "voice":
+            # A unique trailing sample gives every upload its own cache key
+            recording = bytearray(self.recordings[i % len(self.recordings)])
+            recording[-2:] = (i % 65536).to_bytes(2, "little")
+            return "POST", "/analyze/voice", {
+                "files": {"file": (f"load-{i}.wav", bytes(recording), "audio/wav")},
+                "params": {"profile": "fast"},
+            }
+        raise ValueError(f"Unknown traffic kind '{kind}'")
+    
+    def _prediction(self, i: int) -> Dict[str, Any]:
+        return {
+            "userId": f"load-user-{i}",
+            "moodLogs": self.histories[i % len(self.histories)],
+            "voiceBiometrics": self.voices[i % len(self.voices)],
+        }
+
+
+class ResourceSampler:
+    """CPU utilisation and RSS of a set of processes over time (Linux /proc)"""
+    
+    def __init__(self, pids: List[int], interval: float = 1.0):
+        self.pids = pids
+        self.interval = interval
+        self.samples: List[Dict[str, Any]] = []
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+    
+    async def run(self, started: float) -> None:
+        previous = self._read()
+        previous_time = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            current = self._read()
+            now = time.perf_counter()
+            if current is None or previous is None:
+                continue
+            cpu = (current[0] - previous[0]) / self._ticks / (now - previous_time)
+            self.samples.append({
+                "t": round(now - started, 2),
+                "cpuPercent": round(cpu * 100, 1),
+                "rssMiB": round(current[1] * self._page / 2 ** 20, 1),
+                "processes": current[2],
+            })
+            previous, previous_time = current, now
+    
+    def _read(self) -> Optional[Tuple[int, int, int]]:
+        """(CPU ticks, resident pages, process count) over the processes and their children"""
+        ticks = pages = count = 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat", "r") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm", "r") as f:
+                    resident = int(f.read().split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            pages += resident
+            count += 1
+        return (ticks, pages, count) if count else None
+    
+    def _tree(self) -> List[int]:
+        pids, pending = [], list(self.pids)
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                        pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'realtime=40,text=20' -> normalized weights"""
+    weights = {}
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in TRAFFIC_KINDS:
+            raise ValueError(f"Unknown traffic kind '{kind}'. Allowed: {', '.join(TRAFFIC_KINDS)}")
+        weights[kind] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Traffic mix needs a positive weight")
+    return {kind: weight / total for kind, weight in weights.items() if weight > 0}
+
+
+async def run_load(
+    client: "httpx.AsyncClient",
+    traffic: Traffic,
+    mix: Dict[str, float],
+    duration: float,
+    concurrency: int,
+    rate: Optional[float] = None,
+    warmup: float = 0.0,
+    seed: int = 0
+) -> Dict[str, List[Tuple[float, float, bool]]]:
+    """
+    Send traffic for `duration` seconds
+    
+    Returns:
+        Per request kind: (completion time, latency seconds, ok) of every
+        request that started after the warm-up
+    """
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    records: Dict[str, List[Tuple[float, float, bool]]] = {kind: [] for kind in kinds}
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    
+    async def send(kind: str, scheduled: float) -> None:
+        method, path, kwargs = traffic.request(kind)
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        finished = time.perf_counter()
+        if scheduled >= measure_from:
+            records[kind].append((finished - started, finished - scheduled, ok))
+    
+    if rate is None:
+        async def closed_loop_client() -> None:
+            while time.perf_counter() < deadline:
+                await send(rng.choices(kinds, weights)[0], time.perf_counter())
+                # In process, a request may complete without ever suspending
+                await asyncio.sleep(0)
+        
+        await asyncio.gather(*(closed_loop_client() for _ in range(concurrency)))
+        return records
+    
+    slots = asyncio.Semaphore(concurrency)
+    tasks = []
+    
+    async def open_loop_request(kind: str, scheduled: float) -> None:
+        async with slots:
+            await send(kind, scheduled)
+    
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        scheduled += rng.expovariate(rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(open_loop_request(rng.choices(kinds, weights)[0], scheduled)))
+    await asyncio.gather(*tasks)
+    return records
+
+
+def summarize(records: Dict[str, List[Tuple[float, float, bool]]], duration: float) -> Dict[str, Dict[str, Any]]:
+    """Throughput, latency percentiles and error rate per request kind (and overall)"""
+    summary = {}
+    everything = [r for rows in records.values() for r in rows]
+    for kind, rows in list(records.items()) + [("all", everything)]:
+        if not rows:
+            continue
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        errors = sum(1 for _, _, ok in rows if not ok)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[kind] = {
+            "requests": len(rows),
+            "throughput": round(len(rows) / duration, 2),
+            "p50Ms": round(float(p50), 2),
+            "p95Ms": round(float(p95), 2),
+            "p99Ms": round(float(p99), 2),
+            "maxMs": round(float(latencies.max()), 2),
+            "errorRate": round(errors / len(rows), 4),
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]], samples: List[Dict[str, Any]]) -> None:
+    print(f"{'endpoint':<14} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind, s in summary.items():
+        print(
+            f"{kind:<14} {s['requests']:>8} {s['throughput']:>8.1f} {s['p50Ms']:>9.1f} "
+            f"{s['p95Ms']:>9.1f} {s['p99Ms']:>9.1f} {s['errorRate']:>7.1%}"
+        )
+    if samples:
+        cpu = [s["cpuPercent"] for s in samples]
+        rss = [s["rssMiB"] for s in samples]
+        print(
+            f"CPU {np.mean(cpu):.0f}% avg / {max(cpu):.0f}% peak, "
+            f"RSS {rss[-1]:.0f} MiB final / {max(rss):.0f} MiB peak "
+            f"over {samples[-1]['processes']} process(es)"
+        )
+
+
+def _wav_bytes(samples: np.ndarray, sr: int) -> bytes:
+    """16-bit mono WAV file contents"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    mix = args.mix
+    traffic = Traffic(seed=args.seed, voice_seconds=args.voice_seconds)
+    
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        pids = args.pid or []
+    else:
+        # Imported here so a remote run does not load the models locally
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from main import app
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=args.timeout
+        )
+        pids = [os.getpid()]
+    
+    sampler = ResourceSampler(pids, interval=args.sample_interval) if pids and os.path.isdir("/proc") else None
+    sampler_task = asyncio.create_task(sampler.run(time.perf_counter())) if sampler else None
+    
+    try:
+        async with client:
+            records = await run_load(
+                client, traffic, mix,
+                duration=args.duration,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                warmup=args.warmup,
+                seed=args.seed,
+            )
+    finally:
+        if sampler_task:
+            sampler_task.cancel()
+    
+    summary = summarize(records, args.duration)
+    samples = sampler.samples if sampler else []
+    print_summary(summary, samples)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "target": args.url or "in-process",
+                "mix": mix,
+                "concurrency": args.concurrency,
+                "rate": args.rate,
+                "duration": args.duration,
+                "summary": summary,
+                "resources": samples,
+            }, f, indent=2)
+    
+    failed = summary.get("all", {}).get("errorRate", 0) > args.max_error_rate
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the ML service")
+    parser.add_argument("--url", default=None, help="Service URL; omit to drive the ASGI app in process")
+    parser.add_argument("--pid", type=int, action="append", help="Server process to sample (repeatable; children included)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Traffic weights (default {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the measurement")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients (closed loop) or outstanding requests (open loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Arrivals per second (open loop)")
+    parser.add_argument("--voice-seconds", type=float, default=5.0, help="Length of uploaded recordings")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between CPU/RSS samples")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Exit 1 above this error rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the summary and resource timeline as JSON")
+    args = parser.parse_args(argv)
+    
+    try:
+        args.mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if not HTTPX_AVAILABLE:
+        print("httpx is required for load testing (pip install httpx)")
+        return 2
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
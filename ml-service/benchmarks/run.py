@@ -0,0 +1,308 @@
+"""
+Analyzer Microbenchmarks
+Per-stage time and peak memory of the three analyzers, compared with a saved baseline
+
+Usage (from ml-service/):
+    python -m benchmarks.run                   # compare with benchmarks/baseline.json
+    python -m benchmarks.run --quick           # smaller inputs only
+    python -m benchmarks.run --filter voice    # cases whose name contains "voice"
+    python -m benchmarks.run --save-baseline   # record the current numbers as the baseline
+
+Runs offline on CPU: transformer models are only used with --with-models and
+locally cached weights, otherwise the rule-based sentiment path is measured.
+Exits with status 1 when a case is slower (or uses more memory) than its
+baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Never reach out for model weights while benchmarking
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import numpy as np
+
+from app.services.mood_series import ingest_mood_logs
+from app.services.predictive_analysis import PredictiveAnalyzer
+from app.services.sentiment_analysis import SentimentAnalyzer
+from app.services.voice_analysis import VoiceAnalyzer, LIBROSA_AVAILABLE
+
+from .generators import journal_text, mood_log_history, speech_like_audio, voice_biometrics
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Allowed slowdown / memory growth relative to the baseline (1.3 = 30% worse)
+DEFAULT_THRESHOLDS = {"time": 1.3, "memory": 1.2}
+
+
+class Benchmark:
+    """One measured call; setup runs once, outside the measurement"""
+    
+    def __init__(self, name: str, setup: Callable[[], Callable[[], Any]], quick: bool = True):
+        self.name = name
+        self.setup = setup
+        self.quick = quick
+
+
+def build_benchmarks(with_models: bool = False) -> List[Benchmark]:
+    """All benchmark cases; quick=False marks the large inputs skipped by --quick"""
+    benchmarks: List[Benchmark] = []
+    
+    # Voice analysis stages on synthetic speech
+    if LIBROSA_AVAILABLE:
+        voice = VoiceAnalyzer(profile="standard")
+        sr = voice.sample_rate
+        
+        for seconds, quick in ((5, True), (30, False)):
+            def audio(seconds=seconds):
+                return speech_like_audio(seconds, sr=sr, pitch_hz=160, jitter=0.01, seed=seconds)
+            
+            for stage, method in (
+                ("pitch", voice._extract_pitch_features),
+                ("jitter", voice._extract_jitter_features),
+                ("shimmer", voice._extract_shimmer_features),
+                ("cadence", voice._extract_cadence_features),
+                ("intensity", voice._extract_intensity_features),
+            ):
+                benchmarks.append(Benchmark(
+                    f"voice.{stage}[{seconds}s]",
+                    lambda method=method, audio=audio: (lambda y=audio(): method(y, sr)),
+                    quick,
+                ))
+            benchmarks.append(Benchmark(
+                f"voice.analyze_signal[{seconds}s]",
+                lambda audio=audio: (lambda y=audio(): voice.analyze_signal(y, sr)),
+                quick,
+            ))
+        
+        benchmarks.append(Benchmark(
+            "voice.analyze_signal[5s,jitter=0.05]",
+            lambda: (lambda y=speech_like_audio(5, sr=sr, pitch_hz=220, jitter=0.05, seed=7): voice.analyze_signal(y, sr)),
+        ))
+    
+    # Sentiment analysis on journal entries of increasing length
+    sentiment = SentimentAnalyzer(load_models=with_models)
+    for words, quick in ((20, True), (200, True), (2000, False)):
+        text = sentiment._clean_text(journal_text(words, seed=words))
+        benchmarks.append(Benchmark(
+            f"sentiment.key_phrases[{words}w]",
+            lambda text=text: (lambda: sentiment._extract_key_phrases(text)),
+            quick,
+        ))
+        benchmarks.append(Benchmark(
+            f"sentiment.analyze[{words}w]",
+            lambda text=text: (lambda: sentiment.analyze(text)),
+            quick,
+        ))
+    
+    # Predictive analysis on mood-log histories from 10 to 100k entries
+    predictive = PredictiveAnalyzer()
+    for entries, quick in ((10, True), (1000, True), (100000, False)):
+        def history(entries=entries):
+            return mood_log_history(entries, seed=entries)
+        
+        benchmarks.append(Benchmark(
+            f"predictive.calculate_trend[{entries}]",
+            lambda history=history: (
+                lambda y=np.array([log["moodScore"] for log in history()]): predictive._calculate_trend(y)
+            ),
+            quick,
+        ))
+        benchmarks.append(Benchmark(
+            f"predictive.ingest[{entries}]",
+            lambda history=history: (lambda logs=history(): ingest_mood_logs(logs)),
+            quick,
+        ))
+        benchmarks.append(Benchmark(
+            f"predictive.predict[{entries}]",
+            lambda history=history, entries=entries: (
+                lambda logs=history(), voice=voice_biometrics(min(entries, 30)):
+                    predictive.predict(logs, voice_biometrics=voice)
+            ),
+            quick,
+        ))
+    
+    benchmarks.append(Benchmark(
+        "predictive.predict_windowed[1000]",
+        lambda: (lambda logs=mood_log_history(1000, seed=1): predictive.predict_windowed(logs, window_days=14)),
+    ))
+    benchmarks.append(Benchmark(
+        "predictive.predict_batch[1000x30]",
+        lambda: (lambda users=[
+            {"mood_logs": mood_log_history(30, seed=i)} for i in range(1000)
+        ]: predictive.predict_batch(users)),
+    ))
+    
+    return benchmarks
+
+
+def measure(fn: Callable[[], Any], repeats: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time a call and its peak traced memory
+    
+    Loops are sized so one timed batch takes at least min_time; the median
+    and best per-call times over `repeats` batches are reported. Peak memory
+    is measured in a separate traced call so tracing does not skew timings.
+    """
+    fn()  # warm-up (imports, caches, lazy initialization)
+    
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed) + 1)
+    
+    per_call = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops)
+    
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        "medianMs": round(statistics.median(per_call) * 1000, 4),
+        "minMs": round(min(per_call) * 1000, 4),
+        "peakKiB": round(peak / 1024, 1),
+        "loops": loops,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Optional[Dict[str, Any]],
+    thresholds: Dict[str, float]
+) -> List[Dict[str, Any]]:
+    """Ratios against the baseline and whether each case regressed"""
+    cases = (baseline or {}).get("cases", {})
+    rows = []
+    for name, result in results.items():
+        base = cases.get(name)
+        row = {"name": name, **result, "timeRatio": None, "memoryRatio": None, "status": "new"}
+        if base:
+            limits = {**thresholds, **base.get("thresholds", {})}
+            row["timeRatio"] = round(result["medianMs"] / max(base["medianMs"], 1e-6), 2)
+            row["memoryRatio"] = round(result["peakKiB"] / max(base["peakKiB"], 1.0), 2)
+            regressed = row["timeRatio"] > limits["time"] or (
+                # Small allocations fluctuate; only flag memory growth above 64 KiB
+                row["memoryRatio"] > limits["memory"] and result["peakKiB"] - base["peakKiB"] > 64
+            )
+            row["status"] = "REGRESSED" if regressed else "ok"
+        rows.append(row)
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]) -> None:
+    width = max(len(r["name"]) for r in rows)
+    print(f"{'case':<{width}}  {'median ms':>10}  {'x base':>7}  {'peak KiB':>10}  {'x base':>7}  status")
+    for r in rows:
+        time_ratio = f"{r['timeRatio']:.2f}" if r["timeRatio"] is not None else "-"
+        memory_ratio = f"{r['memoryRatio']:.2f}" if r["memoryRatio"] is not None else "-"
+        print(
+            f"{r['name']:<{width}}  {r['medianMs']:>10.3f}  {time_ratio:>7}  "
+            f"{r['peakKiB']:>10.1f}  {memory_ratio:>7}  {r['status']}"
+        )
+
+
+def environment() -> Dict[str, Any]:
+    """Machine details stored with a baseline (timings only compare on similar hosts)"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "librosa": LIBROSA_AVAILABLE,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ML service analyzers")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest inputs")
+    parser.add_argument("--filter", default=None, help="Only cases whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=None, help="Allowed time ratio (default 1.3)")
+    parser.add_argument("--memory-threshold", type=float, default=None, help="Allowed memory ratio (default 1.2)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed batches per case")
+    parser.add_argument("--with-models", action="store_true", help="Use locally cached transformer weights")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+    
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    thresholds = {**DEFAULT_THRESHOLDS, **(baseline or {}).get("thresholds", {})}
+    if args.time_threshold is not None:
+        thresholds["time"] = args.time_threshold
+    if args.memory_threshold is not None:
+        thresholds["memory"] = args.memory_threshold
+    
+    if not LIBROSA_AVAILABLE:
+        print("librosa not available: voice benchmarks skipped")
+    
+    results: Dict[str, Dict[str, float]] = {}
+    for benchmark in build_benchmarks(with_models=args.with_models):
+        if args.quick and not benchmark.quick:
+            continue
+        if args.filter and args.filter not in benchmark.name:
+            continue
+        results[benchmark.name] = measure(benchmark.setup(), repeats=args.repeats)
+        print(f"  {benchmark.name}: {results[benchmark.name]['medianMs']:.3f} ms", file=sys.stderr)
+    
+    if not results:
+        print("No benchmarks selected")
+        return 0
+    
+    rows = compare(results, None if args.save_baseline else baseline, thresholds)
+    print_report(rows)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "thresholds": thresholds, "results": rows}, f, indent=2)
+    
+    if args.save_baseline:
+        # Merge, so a filtered or quick run only replaces the cases it measured
+        cases = {**(baseline or {}).get("cases", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "recordedAt": datetime.utcnow().isoformat(timespec="seconds"),
+                "environment": environment(),
+                "thresholds": thresholds,
+                "cases": dict(sorted(cases.items())),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    
+    regressions = [r["name"] for r in rows if r["status"] == "REGRESSED"]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
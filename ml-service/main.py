@@ -3,27 +3,76 @@ MindfulMe ML Service
 FastAPI-based service for voice and text analysis
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 import uvicorn
 import os
 from datetime import datetime
 import tempfile
+import asyncio
+import threading
 import numpy as np
+import anyio
+
+from app.negotiation import NegotiatedResponse, NegotiatedRoute, ResponseShape, encode_json
+from app.admission import AdmissionController, AdmissionMiddleware, default_slots, parse_limits
+from app.deadline import request_deadline
+from app.lazy import preload
+from app.readiness import LoadState, readiness
+from app.roles import parse_roles, restrict_routes
+from app.metrics import MetricsMiddleware, metrics
+from app import profiling
+from app.profiling import ProfilingRoute, profiled
 
 # Import analysis services
-from app.services.voice_analysis import VoiceAnalyzer
+from app.services.voice_analysis import VoiceAnalyzer, VoiceDecodeError, VOICE_PROFILES, LIBROSA_AVAILABLE, LIBROSA_SUBMODULES, librosa
+from app.services.voice_streaming import VoiceStreamSession
+from app.services.result_cache import ResultCache, LatestResultCache, fingerprint
+from app.services.vocal_baseline import VocalBaselineStore
 from app.services.sentiment_analysis import SentimentAnalyzer
-from app.services.predictive_analysis import PredictiveAnalyzer
+from app.services.predictive_analysis import PredictiveAnalyzer, BURNOUT_FEATURES
+from app.services.model_registry import ModelRegistry
+from app.services.mood_series import MoodLogsError, ingest_mood_logs
+from app.services.predictive_state import TrendStateStore
+from app.services.anomaly_detection import StreamingAnomalyDetector, anomaly_insights
+from app.services.cohort_index import CohortPercentileIndex, load_cohort_records
 
 # Initialize FastAPI app
 app = FastAPI(
     title="MindfulMe ML Service",
     description="Voice and Text Analysis API for Mental Health Platform",
     version="1.0.0",
+    default_response_class=NegotiatedResponse,
+)
+
+# Per-request profiling for admins sending X-Profile: <PROFILE_TOKEN>
+profiling.configure(
+    token=os.getenv("PROFILE_TOKEN") or None,
+    dump_dir=os.getenv("PROFILE_DUMP_DIR") or None,
+)
+
+
+class ServiceRoute(ProfilingRoute, NegotiatedRoute):
+    """Opt-in profiling around content negotiation"""
+
+
+# JSON by default; msgpack/npz request bodies and msgpack responses on request
+app.router.route_class = ServiceRoute
+
+# Per-class concurrency limits and bounded priority queues (innermost, so 503s get CORS headers)
+admission_limits = parse_limits(os.getenv("ADMISSION_LIMITS"))
+admission_reserve = int(os.getenv("ADMISSION_RESERVE", 1))
+admission = AdmissionController(
+    slots=int(os.getenv("ADMISSION_SLOTS") or default_slots(admission_reserve, len(admission_limits))),
+    limits=admission_limits,
+    reserve=admission_reserve,
 )
+if os.getenv("ADMISSION_CONTROL", "true").lower() not in ("0", "false", "no"):
+    app.add_middleware(AdmissionMiddleware, controller=admission)
 
 # CORS middleware
 app.add_middleware(
@@ -34,10 +83,158 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize analyzers
-voice_analyzer = VoiceAnalyzer()
-sentiment_analyzer = SentimentAnalyzer()
-predictive_analyzer = PredictiveAnalyzer()
+# Request counts, errors and latency per route (outermost, so it sees every response)
+metrics.stage_timing = os.getenv("METRICS_STAGE_TIMING", "true").lower() not in ("0", "false", "no")
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# Roles served by this deployment (text, voice, predict); only their analyzers are built
+service_roles = parse_roles(os.getenv("ML_SERVICE_ROLE"))
+
+# Initialize analyzers (one voice analyzer per analysis profile)
+voice_analyzers = (
+    {name: VoiceAnalyzer(profile=name) for name in VOICE_PROFILES} if "voice" in service_roles else {}
+)
+voice_analyzer = voice_analyzers.get(os.getenv("VOICE_DEFAULT_PROFILE", "standard"))
+
+# Models load in the background after startup (see load_models); until then
+# text analysis is rule-based and voice requests wait for the librosa import
+sentiment_analyzer = (
+    SentimentAnalyzer(load_models=False, snapshot_dir=os.getenv("MODEL_SNAPSHOT_DIR") or None)
+    if "text" in service_roles else None
+)
+librosa_state = (
+    LoadState("librosa", "librosa", "librosa", None if LIBROSA_AVAILABLE else "mock", LIBROSA_AVAILABLE)
+    if "voice" in service_roles else None
+)
+
+# Report ready when a model failed to load and its fallback is serving
+READY_ON_FALLBACK = os.getenv("READY_ON_FALLBACK", "false").lower() in ("1", "true", "yes")
+
+# Versioned trained predictors; heuristics are used until a version is activated
+model_registry = None
+predictive_analyzer = None
+if "predict" in service_roles:
+    model_registry = ModelRegistry(
+        root=os.getenv("MODEL_REGISTRY_DIR", "models"),
+        schemas={"burnout": BURNOUT_FEATURES},
+    )
+    predictive_analyzer = PredictiveAnalyzer(
+        history_days=int(os.getenv("PREDICT_HISTORY_DAYS", 0)) or None,
+        model_registry=model_registry,
+    )
+
+# Voice results keyed by upload content, shared across workers when a directory is set
+voice_cache = ResultCache(
+    max_entries=int(os.getenv("VOICE_CACHE_SIZE", 256)),
+    disk_dir=os.getenv("VOICE_CACHE_DIR") or None,
+)
+
+# Per-user running voice feature statistics
+baseline_store = VocalBaselineStore(
+    path=(os.getenv("VOICE_BASELINE_PATH") or None) if "voice" in service_roles else None
+)
+
+# Latest /predict result per user, reused while the submitted history is unchanged
+prediction_cache = LatestResultCache(max_entries=int(os.getenv("PREDICT_CACHE_SIZE", 1024)))
+
+# Per-user running prediction statistics for incremental updates
+trend_states = TrendStateStore(max_users=int(os.getenv("PREDICT_STATE_MAX_USERS", 100000)))
+
+# Per-user EWMA statistics of mood and voice signals for streaming anomaly detection
+anomaly_detector = StreamingAnomalyDetector(
+    alpha=float(os.getenv("ANOMALY_ALPHA", 0.05)),
+    z_threshold=float(os.getenv("ANOMALY_Z_THRESHOLD", 3.0)),
+    max_users=int(os.getenv("PREDICT_STATE_MAX_USERS", 100000)),
+    report_days=float(os.getenv("ANOMALY_REPORT_DAYS", 7)),
+)
+
+# Each worker process holds its own copy of the per-user state above and a user's
+# requests reach arbitrary workers, so the endpoints built on it need a single worker
+STATEFUL_ENDPOINTS = int(os.getenv("ML_WORKERS") or 1) <= 1
+
+# Sorted population scores per cohort for clinician percentile context
+cohort_index = CohortPercentileIndex(min_cohort_size=int(os.getenv("COHORT_MIN_SIZE", 20)))
+COHORT_SOURCE = os.getenv("COHORT_SOURCE") or None
+COHORT_COLUMN = os.getenv("COHORT_COLUMN") or None
+COHORT_REBUILD_SECONDS = float(os.getenv("COHORT_REBUILD_SECONDS", 3600))
+
+
+def threadpool_statistics():
+    """Worker threads in use and calls waiting for one (sync endpoints and to_thread work)"""
+    return anyio.to_thread.current_default_thread_limiter().statistics()
+
+
+metrics.add_gauge(
+    "ml_threadpool_busy", "Worker threads running blocking work",
+    lambda: threadpool_statistics().borrowed_tokens,
+)
+metrics.add_gauge(
+    "ml_threadpool_queue_depth", "Blocking calls waiting for a worker thread",
+    lambda: threadpool_statistics().tasks_waiting,
+)
+metrics.add_gauge("ml_trend_states", "Users with incremental prediction state", lambda: len(trend_states))
+metrics.add_gauge("ml_admission_slots", "Requests allowed to run at once across priority classes", lambda: admission.slots)
+metrics.add_gauge(
+    "ml_admission_active", "Admitted requests running per priority class",
+    lambda: {(c.name,): c.active for c in admission.classes.values()}, labels=("class",),
+)
+metrics.add_gauge(
+    "ml_admission_queued", "Requests waiting for admission per priority class",
+    lambda: {(c.name,): len(c.waiting) for c in admission.classes.values()}, labels=("class",),
+)
+metrics.add_gauge(
+    "ml_admission_concurrency_limit", "Concurrency limit per priority class",
+    lambda: {(c.name,): c.concurrency for c in admission.classes.values()}, labels=("class",),
+)
+metrics.add_gauge(
+    "ml_admission_queue_limit", "Queue size per priority class",
+    lambda: {(c.name,): c.queue_size for c in admission.classes.values()}, labels=("class",),
+)
+metrics.add_gauge(
+    "ml_admission_rejected_total", "Requests rejected with 503 per priority class and reason",
+    lambda: {
+        (c.name, reason): count
+        for c in admission.classes.values() for reason, count in c.rejected.items()
+    },
+    labels=("class", "reason"), kind="counter",
+)
+
+
+def model_states() -> List[LoadState]:
+    """Load state of the models and modules this deployment serves"""
+    states = []
+    if sentiment_analyzer is not None:
+        states.extend(sentiment_analyzer.model_states.values())
+    if librosa_state is not None:
+        states.append(librosa_state)
+    return states
+
+
+def load_models() -> None:
+    """
+    Load models and heavy modules (blocking)
+    
+    Runs in a background thread started at startup, so the server accepts
+    connections (and answers liveness probes) while weights load. app.serving
+    calls it in the parent before forking instead, so workers share the loaded
+    weights and start ready. Components loaded already are skipped.
+    """
+    if sentiment_analyzer is not None:
+        sentiment_analyzer.load()
+    if librosa_state is not None and librosa_state.start():
+        with librosa_state.loading():
+            preload(librosa, LIBROSA_SUBMODULES)
+
+
+metrics.add_gauge(
+    "ml_model_ready", "Whether a model is loaded and serving (0 while loading or on fallback)",
+    lambda: {(s.name,): int(s.ready) for s in model_states()}, labels=("model",),
+)
+
+
+async def run_analysis(fn, *args, **kwargs):
+    """Run an analyzer call on a worker thread (profiled on request), keeping the event loop free"""
+    return await run_in_threadpool(profiled, fn, *args, **kwargs)
 
 
 # Request/Response Models
@@ -51,6 +248,7 @@ class TextAnalysisResponse(BaseModel):
     emotions: Dict[str, float]
     keyPhrases: List[str]
     insights: List[str]
+    degraded: bool = False
 
 
 class VoiceAnalysisResponse(BaseModel):
@@ -65,13 +263,23 @@ class VoiceAnalysisResponse(BaseModel):
     durationSeconds: float
     insights: List[str]
     anomalies: List[str]
+    analysisProfile: Optional[Dict[str, Any]] = None
+    baseline: Optional[Dict[str, Any]] = None
+    signalAnomalies: Optional[List[Dict[str, Any]]] = None
+    degraded: bool = False
+    mock: bool = False
+
+
+# Mood logs as a list of entries or as columns, e.g. {"moodScore": [...], "anxietyLevel": [...]}
+MoodLogsPayload = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
 
 
 class PredictionRequest(BaseModel):
     userId: str
-    moodLogs: List[Dict[str, Any]]
+    moodLogs: MoodLogsPayload
     voiceBiometrics: Optional[List[Dict[str, Any]]] = None
     behavioralData: Optional[List[Dict[str, Any]]] = None
+    windowDays: Optional[int] = None
 
 
 class PredictionResponse(BaseModel):
@@ -80,6 +288,57 @@ class PredictionResponse(BaseModel):
     moodTrendPrediction: Dict[str, Any]
     proactiveInsights: List[Dict[str, Any]]
     confidence: float
+    windowDays: Optional[int] = None
+    windowTrends: Optional[Dict[str, Any]] = None
+    signalAnomalies: Optional[List[Dict[str, Any]]] = None
+
+
+class IncrementalPredictionRequest(BaseModel):
+    userId: str
+    moodLogs: MoodLogsPayload = []
+    voiceBiometrics: Optional[List[Dict[str, Any]]] = None
+    behavioralData: Optional[List[Dict[str, Any]]] = None
+    reset: bool = False
+
+
+class BatchPredictionRequest(BaseModel):
+    requests: List[PredictionRequest]
+
+
+class BatchPredictionResult(BaseModel):
+    userId: str
+    prediction: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionResult]
+
+
+class ModelVersionRequest(BaseModel):
+    version: Optional[str] = None
+
+
+class CohortRecord(BaseModel):
+    cohort: Optional[str] = None
+    burnoutRisk: Optional[float] = None
+    mentalHealthIndex: Optional[float] = None
+    flatAffect: Optional[float] = None
+    agitation: Optional[float] = None
+
+
+class CohortIndexRequest(BaseModel):
+    records: List[CohortRecord]
+
+
+class PercentileQuery(BaseModel):
+    patientId: str
+    cohort: Optional[str] = None
+    scores: Dict[str, Optional[float]]
+
+
+class PercentileRequest(BaseModel):
+    patients: List[PercentileQuery]
 
 
 class HealthResponse(BaseModel):
@@ -89,36 +348,180 @@ class HealthResponse(BaseModel):
     services: Dict[str, str]
 
 
+class ReadinessResponse(BaseModel):
+    status: str
+    timestamp: str
+    backends: Dict[str, Optional[str]]
+    models: Dict[str, Dict[str, Any]]
+
+
+# Analyzer results are encoded without re-validation; RESPONSE_VALIDATION=true checks them once
+ResponseShape.validate = os.getenv("RESPONSE_VALIDATION", "false").lower() in ("1", "true", "yes")
+text_response = ResponseShape(TextAnalysisResponse)
+voice_response = ResponseShape(VoiceAnalysisResponse)
+prediction_response = ResponseShape(PredictionResponse)
+
+
+def get_voice_analyzer(profile: Optional[str]) -> VoiceAnalyzer:
+    """Resolve a requested voice analysis profile"""
+    if profile is None:
+        return voice_analyzer
+    if profile not in voice_analyzers:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid profile. Allowed: {', '.join(voice_analyzers)}"
+        )
+    return voice_analyzers[profile]
+
+
+def apply_vocal_baseline(
+    result: Dict[str, Any],
+    user_id: str,
+    profile: str,
+    update: bool = True
+) -> Dict[str, Any]:
+    """Add z-scores against the user's baseline and personal deviations"""
+    if update:
+        report = baseline_store.score_and_update(user_id, profile, result)
+    else:
+        report = baseline_store.score(user_id, profile, result)
+    
+    return {
+        **result,
+        "anomalies": result["anomalies"] + report["deviations"],
+        "baseline": report,
+    }
+
+
+def apply_signal_anomalies(result: Dict[str, Any], user_id: str, profile: str) -> Dict[str, Any]:
+    """
+    Add excursions and shifts of the voice scores against the user's recent
+    recordings of the same profile
+    
+    This is the only path that feeds voice scores into the anomaly detector;
+    /predict/incremental feeds mood logs only, so a stored recording is never
+    counted twice.
+    """
+    if not STATEFUL_ENDPOINTS:
+        return result
+    events = anomaly_detector.observe(user_id, voice_biometrics=[result], profile=profile)
+    return {
+        **result,
+        "anomalies": result["anomalies"] + [i["message"] for i in anomaly_insights(events)],
+        "signalAnomalies": events,
+    }
+
+
+def rebuild_cohort_index() -> Dict[str, Any]:
+    """Rebuild the cohort index from COHORT_SOURCE"""
+    records = load_cohort_records(COHORT_SOURCE, cohort_column=COHORT_COLUMN)
+    return cohort_index.build(records, source=COHORT_SOURCE)
+
+
+async def rebuild_cohort_index_periodically():
+    """Keep the cohort index fresh without blocking requests"""
+    while True:
+        try:
+            await asyncio.to_thread(rebuild_cohort_index)
+        except Exception as e:
+            print(f"Cohort index rebuild failed: {e}")
+        await asyncio.sleep(COHORT_REBUILD_SECONDS)
+
+
+@app.on_event("startup")
+async def start_model_loading():
+    # Daemon thread: shutdown does not wait for a load in progress
+    app.state.model_loader = threading.Thread(target=load_models, name="model-loader", daemon=True)
+    app.state.model_loader.start()
+
+
+@app.on_event("startup")
+async def start_cohort_index():
+    if COHORT_SOURCE and "predict" in service_roles:
+        app.state.cohort_task = asyncio.create_task(rebuild_cohort_index_periodically())
+
+
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (service states: ready, loading, degraded or disabled)"""
+    def service_state(role: str, states: List[LoadState]) -> str:
+        if role not in service_roles:
+            return "disabled"
+        return readiness(states, allow_fallback=True)["status"]
+    
     return HealthResponse(
         status="healthy",
         timestamp=datetime.utcnow().isoformat(),
         version="1.0.0",
         services={
-            "voice_analysis": "ready",
-            "sentiment_analysis": "ready",
-            "predictive_analysis": "ready",
+            "voice_analysis": service_state("voice", [librosa_state] if librosa_state else []),
+            "sentiment_analysis": service_state(
+                "text", list(sentiment_analyzer.model_states.values()) if sentiment_analyzer else []
+            ),
+            "predictive_analysis": service_state("predict", []),
         }
     )
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and its event loop responsive, whatever the models do"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+
+
+@app.get("/health/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """
+    Readiness probe: 200 once every model this deployment serves has loaded,
+    503 while loading or after a load failed (unless READY_ON_FALLBACK is set)
+    
+    Reports per model its state, load duration, error and the backend
+    currently answering (e.g. transformers, or rules while loading).
+    """
+    report = readiness(model_states(), allow_fallback=READY_ON_FALLBACK)
+    return NegotiatedResponse(
+        {
+            "status": report["status"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "backends": {
+                "sentiment_analysis": sentiment_analyzer.backend if sentiment_analyzer else None,
+                "voice_analysis": librosa_state.active_backend if librosa_state else None,
+            },
+            "models": report["models"],
+        },
+        status_code=200 if report["ready"] else 503,
+    )
+
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Request counts, errors and latency per route, analyzer stage timings,
+    queue depth, in-flight requests, model load times and process memory
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Text Analysis endpoint
 @app.post("/analyze/text", response_model=TextAnalysisResponse)
-async def analyze_text(request: TextAnalysisRequest):
+async def analyze_text(request: TextAnalysisRequest, http_request: Request):
     """
     Analyze text for sentiment and emotional content
     
     Uses RoBERTa-based sentiment analysis and emotion detection
+    With an X-Deadline-Ms budget, models expected to miss it are replaced by
+    the rule-based analysis and the response is marked degraded; so are
+    responses served while the models are still loading (or failed to load)
     """
+    deadline = request_deadline(http_request)
     try:
         if not request.text or len(request.text.strip()) == 0:
             raise HTTPException(status_code=400, detail="Text content is required")
         
-        result = sentiment_analyzer.analyze(request.text)
-        return TextAnalysisResponse(**result)
+        result = await run_analysis(sentiment_analyzer.analyze, request.text, deadline=deadline)
+        return text_response.response(result)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -126,14 +529,29 @@ async def analyze_text(request: TextAnalysisRequest):
 
 # Voice Analysis endpoint
 @app.post("/analyze/voice", response_model=VoiceAnalysisResponse)
-async def analyze_voice(file: UploadFile = File(...)):
+async def analyze_voice(
+    http_request: Request,
+    file: UploadFile = File(...),
+    profile: Optional[str] = None,
+    userId: Optional[str] = None,
+):
     """
     Analyze voice recording for vocal biometrics
     
     Extracts pitch, jitter, shimmer, cadence, and intensity features
     Detects flat affect and agitated speech patterns
+    The optional profile (fast, standard, clinical) selects sample rate,
+    framing and extractors; it is recorded in the result
+    With a userId the result is also scored against the user's own baseline
+    With an X-Deadline-Ms budget the analyzer may skip pitch tracking to meet
+    it; such degraded results are neither cached nor added to the baseline
+    Undecodable uploads are rejected with 400; mock results (librosa not
+    installed) are marked, never cached and never scored against baselines
     """
     try:
+        analyzer = get_voice_analyzer(profile)
+        deadline = request_deadline(http_request)
+        
         # Validate file type
         allowed_types = ["audio/wav", "audio/mpeg", "audio/mp3", "audio/webm", "audio/ogg"]
         if file.content_type not in allowed_types:
@@ -142,20 +560,39 @@ async def analyze_voice(file: UploadFile = File(...)):
                 detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}"
             )
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+        content = await file.read()
         
-        try:
-            # Analyze voice
-            result = voice_analyzer.analyze(temp_path)
-            return VoiceAnalysisResponse(**result)
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        # Retried uploads of the same recording are served from the cache
+        cache_key = fingerprint(content, analyzer.settings())
+        result = voice_cache.get(cache_key)
+        is_retry = result is not None
+        
+        if result is None:
+            # Save to temporary file
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
+                temp_file.write(content)
+                temp_path = temp_file.name
+            
+            try:
+                # Analyze voice
+                result = await run_analysis(analyzer.analyze, temp_path, deadline=deadline)
+                if not result.get("degraded") and not result.get("mock"):
+                    voice_cache.set(cache_key, result)
+            except VoiceDecodeError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            finally:
+                # Clean up temp file
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        
+        if userId and not result.get("mock"):
+            # A retried upload must not be counted twice in the baseline
+            update = not is_retry and not result.get("degraded")
+            result = apply_vocal_baseline(result, userId, analyzer.profile, update=update)
+            if update:
+                result = apply_signal_anomalies(result, userId, analyzer.profile)
+        
+        return voice_response.response(result)
     
     except HTTPException:
         raise
@@ -163,43 +600,383 @@ async def analyze_voice(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Voice analysis failed: {str(e)}")
 
 
+# Voice result cache metrics
+@app.get("/analyze/voice/cache")
+async def voice_cache_stats():
+    """Hit rate and size of the voice result cache"""
+    return voice_cache.stats()
+
+
+# Streaming Voice Analysis endpoint
+@app.websocket("/analyze/voice/stream")
+async def analyze_voice_stream(
+    websocket: WebSocket,
+    encoding: str = "pcm_s16le",
+    sampleRate: int = 16000,
+    partialInterval: float = 3.0,
+    profile: Optional[str] = None,
+    userId: Optional[str] = None,
+):
+    """
+    Analyze a voice recording while it is being captured
+    
+    Binary messages carry raw PCM audio (pcm_s16le or pcm_f32le, mono).
+    Partial flat affect and agitation scores are pushed every
+    partialInterval seconds of audio. Sending the text message "end"
+    returns the final VoiceAnalysisResponse and closes the socket.
+    """
+    await websocket.accept()
+    
+    try:
+        analyzer = get_voice_analyzer(profile)
+        session = VoiceStreamSession(analyzer, encoding=encoding, input_sample_rate=sampleRate)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1003)
+        return
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    
+    next_partial = partialInterval
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            
+            if message.get("bytes") is not None:
+                session.feed(message["bytes"])
+                if session.duration >= next_partial:
+                    next_partial = session.duration + partialInterval
+                    partial = session.partial_scores()
+                    if partial is not None:
+                        await websocket.send_json({"type": "partial", **partial})
+            elif (message.get("text") or "").strip() == "end":
+                break
+        
+        result = session.finish()
+        if userId and not result.get("mock"):
+            result = apply_vocal_baseline(result, userId, analyzer.profile)
+            result = apply_signal_anomalies(result, userId, analyzer.profile)
+        await websocket.send_text(encode_json({
+            "type": "final",
+            "result": voice_response.shape(result),
+        }).decode("utf-8"))
+        await websocket.close()
+    
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Voice analysis failed: {str(e)}"})
+        await websocket.close(code=1011)
+
+
 # Predictive Analysis endpoint
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_trends(request: PredictionRequest):
     """
     Generate predictive insights based on user data
     
-    Uses LSTM/Random Forest models for trend prediction
+    Uses the active trained burnout model from the model registry, if any
     Triggers proactive wellness alerts on 20% decline
+    With windowDays, trends come from daily aggregates of timestamped logs
     """
+    if request.windowDays is not None and request.windowDays not in predictive_analyzer.window_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid windowDays. Allowed: {', '.join(map(str, predictive_analyzer.window_days))}"
+        )
+    
     try:
-        if not request.moodLogs or len(request.moodLogs) == 0:
+        mood_logs = ingest_mood_logs(request.moodLogs)
+        if len(mood_logs) == 0:
             raise HTTPException(status_code=400, detail="Mood logs are required for prediction")
         
-        result = predictive_analyzer.predict(
-            mood_logs=request.moodLogs,
+        # Dashboard refreshes resend the same history and are served from the cache
+        inputs = fingerprint(
+            mood_logs.tobytes(),
+            predictive_analyzer.model_version(),
+            request.windowDays,
+            request.voiceBiometrics,
+            request.behavioralData,
+        )
+        result = prediction_cache.get(request.userId, inputs)
+        if result is not None:
+            return prediction_response.response(result)
+        
+        if request.windowDays is not None:
+            result = await run_analysis(
+                predictive_analyzer.predict_windowed,
+                mood_logs=mood_logs,
+                voice_biometrics=request.voiceBiometrics,
+                behavioral_data=request.behavioralData,
+                window_days=request.windowDays
+            )
+        else:
+            result = await run_analysis(
+                predictive_analyzer.predict,
+                mood_logs=mood_logs,
+                voice_biometrics=request.voiceBiometrics,
+                behavioral_data=request.behavioralData
+            )
+        prediction_cache.set(request.userId, inputs, result)
+        return prediction_response.response(result)
+    
+    except HTTPException:
+        raise
+    except MoodLogsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+# Prediction cache metrics
+@app.get("/predict/cache")
+async def prediction_cache_stats():
+    """Hit rate and size of the per-user prediction cache"""
+    return prediction_cache.stats()
+
+
+# Batch Predictive Analysis endpoint
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_trends_batch(request: BatchPredictionRequest):
+    """
+    Generate predictive insights for many users in one call
+    
+    Computes the same output as /predict per user, vectorized across users
+    Users without (or with malformed) mood logs get an error entry instead of a prediction
+    Windowed requests (windowDays) are evaluated per user
+    """
+    try:
+        mood_logs, errors = [], {}
+        for i, r in enumerate(request.requests):
+            try:
+                mood_logs.append(ingest_mood_logs(r.moodLogs))
+            except MoodLogsError as e:
+                mood_logs.append(ingest_mood_logs([]))
+                errors[i] = str(e)
+        valid = [
+            i for i, logs in enumerate(mood_logs)
+            if len(logs) > 0 and request.requests[i].windowDays is None
+        ]
+        predictions = await run_analysis(predictive_analyzer.predict_batch, [
+            {
+                "mood_logs": mood_logs[i],
+                "voice_biometrics": request.requests[i].voiceBiometrics,
+                "behavioral_data": request.requests[i].behavioralData,
+            }
+            for i in valid
+        ])
+        by_index = dict(zip(valid, predictions))
+        
+        results = []
+        for i, r in enumerate(request.requests):
+            if r.windowDays is not None and len(mood_logs[i]) > 0:
+                try:
+                    by_index[i] = await run_analysis(
+                        predictive_analyzer.predict_windowed,
+                        mood_logs=mood_logs[i],
+                        voice_biometrics=r.voiceBiometrics,
+                        behavioral_data=r.behavioralData,
+                        window_days=r.windowDays
+                    )
+                except ValueError as e:
+                    results.append({"userId": r.userId, "prediction": None, "error": str(e)})
+                    continue
+            
+            if i in by_index:
+                results.append({
+                    "userId": r.userId,
+                    "prediction": prediction_response.shape(by_index[i]),
+                    "error": None,
+                })
+            else:
+                results.append({
+                    "userId": r.userId,
+                    "prediction": None,
+                    "error": errors.get(i, "Mood logs are required for prediction"),
+                })
+        
+        return NegotiatedResponse({"results": results})
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+
+# Incremental Predictive Analysis endpoint
+@app.post("/predict/incremental", response_model=PredictionResponse)
+async def predict_trends_incremental(request: IncrementalPredictionRequest):
+    """
+    Generate predictive insights from only the entries added since the last call
+    
+    The service keeps running statistics per user, so each call costs the
+    same regardless of history length. Send the full history with reset=true
+    on the first call, and whenever the service answers 409 (no state for
+    the user: unknown, evicted or restarted)
+    
+    New mood entries are also checked for excursions and shifts against the
+    user's exponentially weighted history (signalAnomalies). Voice signals
+    are tracked when recordings are analyzed with a userId, so
+    voiceBiometrics only feed the prediction here
+    
+    Answers 501 when the service runs more than one worker (ML_WORKERS)
+    """
+    if not STATEFUL_ENDPOINTS:
+        raise HTTPException(
+            status_code=501,
+            detail="Incremental prediction needs a single worker (ML_WORKERS=1); use /predict"
+        )
+    try:
+        mood_logs = ingest_mood_logs(request.moodLogs)
+        state = trend_states.get(request.userId, reset=request.reset)
+        if state is None:
+            raise HTTPException(
+                status_code=409,
+                detail="No prediction state for this user; resend the full history with reset=true"
+            )
+        state.update(
+            mood_logs=mood_logs,
             voice_biometrics=request.voiceBiometrics,
             behavioral_data=request.behavioralData
         )
-        return PredictionResponse(**result)
+        events = anomaly_detector.observe(
+            request.userId,
+            mood_logs=mood_logs,
+            reset=request.reset
+        )
+        if state.log_count == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="No mood logs recorded for this user; resend the full history with reset=true"
+            )
+        
+        result = await run_analysis(predictive_analyzer.predict_from_state, state)
+        result["proactiveInsights"] += anomaly_insights(events)
+        result["signalAnomalies"] = events
+        return prediction_response.response(result)
     
+    except HTTPException:
+        raise
+    except MoodLogsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Incremental prediction failed: {str(e)}")
+
+
+# Model registry endpoints
+@app.get("/models")
+async def list_models():
+    """Active and shadow versions of trained models, with shadow comparison metrics"""
+    return model_registry.status()
+
+
+@app.post("/models/{name}/activate")
+async def activate_model(name: str, request: ModelVersionRequest):
+    """
+    Hot swap the version serving a model without a restart
+    
+    The version is loaded in a worker thread, so requests keep being served.
+    A null version falls back to the built-in heuristics
+    """
+    try:
+        return await asyncio.to_thread(model_registry.activate, name, request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model activation failed: {str(e)}")
+
+
+@app.post("/models/{name}/shadow")
+async def shadow_model(name: str, request: ModelVersionRequest):
+    """
+    Score a candidate version next to the active one
+    
+    Shadow output is only compared (latency and agreement), never returned.
+    A null version stops shadow scoring
+    """
+    try:
+        return await asyncio.to_thread(model_registry.set_shadow, name, request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Shadow model setup failed: {str(e)}")
+
+
+# Cohort percentile endpoints
+@app.get("/cohorts")
+async def list_cohorts():
+    """Cohort sizes per metric and when the index was last built"""
+    return cohort_index.stats()
+
+
+@app.post("/cohorts/index")
+async def build_cohort_index(request: CohortIndexRequest):
+    """
+    Replace the cohort index with pushed per-user scores
+    
+    For deployments where the backend exports scores instead of the
+    service reading COHORT_SOURCE
+    """
+    try:
+        records = [record.model_dump() for record in request.records]
+        return await asyncio.to_thread(cohort_index.build, records, "push")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cohort index build failed: {str(e)}")
+
+
+@app.post("/cohorts/rebuild")
+async def rebuild_cohorts():
+    """Rebuild the cohort index from COHORT_SOURCE now"""
+    if not COHORT_SOURCE:
+        raise HTTPException(status_code=400, detail="COHORT_SOURCE is not configured")
+    try:
+        return await asyncio.to_thread(rebuild_cohort_index)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cohort index rebuild failed: {str(e)}")
+
+
+@app.post("/cohorts/percentiles")
+async def cohort_percentiles(request: PercentileRequest):
+    """
+    Percentile of each patient's scores within their cohort
+    
+    Each lookup is a binary search on the prebuilt sorted arrays. Patients
+    without a cohort are ranked against everyone; metrics whose cohort is
+    too small return null
+    """
+    try:
+        percentiles = cohort_index.percentiles(
+            [{"cohort": p.cohort, "scores": p.scores} for p in request.patients]
+        )
+        return {
+            "builtAt": cohort_index.built_at,
+            "results": [
+                {"patientId": p.patientId, "cohort": p.cohort or "all", "percentiles": result}
+                for p, result in zip(request.patients, percentiles)
+            ],
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Percentile lookup failed: {str(e)}")
 
 
 # Real-time sentiment endpoint (for live journal analysis)
 @app.post("/analyze/realtime")
-async def analyze_realtime(request: TextAnalysisRequest):
+async def analyze_realtime(request: TextAnalysisRequest, http_request: Request):
     """
     Lightweight real-time sentiment analysis for live typing
     Returns quick sentiment score without full analysis
+    With an X-Deadline-Ms budget the rule-based score is returned (degraded)
+    when the model is not expected to answer in time
     """
+    deadline = request_deadline(http_request)
     try:
         if not request.text or len(request.text.strip()) < 3:
             return {"sentimentScore": 0.5, "sentiment": "neutral"}
         
-        result = sentiment_analyzer.quick_analyze(request.text)
-        return result
+        result = await run_analysis(sentiment_analyzer.quick_analyze, request.text, deadline=deadline)
+        return NegotiatedResponse(result)
     
     except Exception as e:
         return {"sentimentScore": 0.5, "sentiment": "neutral", "error": str(e)}
@@ -215,16 +992,20 @@ async def analyze_batch(texts: List[str]):
         results = []
         for text in texts:
             if text and len(text.strip()) > 0:
-                result = sentiment_analyzer.analyze(text)
+                result = await run_analysis(sentiment_analyzer.analyze, text)
                 results.append(result)
             else:
                 results.append(None)
-        return {"results": results}
+        return NegotiatedResponse({"results": results})
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
 
 
+# Routes of roles this deployment does not serve answer 404
+restrict_routes(app, service_roles)
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",